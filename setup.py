@@ -11,10 +11,11 @@ setuptools.setup(
     version="1.1.0",
     package_dir={"": "sshic"},
     packages=setuptools.find_packages(where="sshic"),
+    py_modules=['cli', 'pipeline', 'daemon'],
     install_requires=[
+        'numpy',
         'pandas',
-        'getopt',
-        'sys'
+        'matplotlib'
     ],
     author="Loqmen Anani, Nicolas Mendiboure",
     author_email="loqmen.anani@ens-lyon.fr, nicolas.mendiboure@ens-lyon.fr",
@@ -30,7 +31,6 @@ setuptools.setup(
     test_suite='nose.collector',
     tests_require=['nose'],
     entry_points={
-        'console_scripts': ['hic_ssdna.oligos_replacement=hic_ssdna.oligos_replacement:main',
-                            'hic_ssdna.contacts_filter=hic_ssdna.contacts_filter:main'],
+        'console_scripts': ['sshic=cli:main'],
     }
 )
@@ -0,0 +1,78 @@
+"""
+Single entry point of the ssDNA Hi-C tools : sshic [--report <report.json>] <command> [arguments].
+
+Only the module of the chosen command is imported (pandas, numpy, and matplotlib when plotting, are loaded
+by it), so that 'sshic --help' or a wrong command answer right away.
+
+    sshic pipeline -s samplesheet.csv -o oligos.csv -f fragments_list.txt -c centromeres.tsv -b 1000 10000 ...
+    sshic filter --help
+
+With --report, the wall and cpu times, peak memory, bytes read and written and number of rows of the tables read
+by the command are written in the given json file (see core.instrumentation.Measure).
+"""
+
+import os
+import sys
+import importlib
+
+#   the core modules import each other by their own name (e.g. 'from utils import ...')
+CORE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'core')
+
+#   command : (module, description), the module has a main(argv) function
+COMMANDS = {
+    'filter': ('filter', "Filter the contacts to keep only the ones of the capture oligos"),
+    'coverage': ('coverage', "Compute the contacts coverage per fragment"),
+    'organize': ('fragments', "Organize the filtered contacts into contacts per probe (4C like profiles)"),
+    'stats': ('statistics', "Statistics of the contacts of each probe (cis/trans, inter/intra chromosomal, etc.)"),
+    'rebin': ('binning', "Bin the contacts of the probes at one or several resolutions"),
+    'weight': ('weight', "Weight the contacts by the capture efficiency compared to a reference"),
+    'aggregate': ('aggregated', "Aggregate the contacts around the centromeres or the telomeres"),
+    'pyramid': ('pyramid', "Build the tile pyramid of the probes profiles, for the probes viewer"),
+    'pipeline': ('pipeline', "Run the whole pipeline on the samples of a samplesheet"),
+    'daemon': ('daemon', "Run samples on demand with the reference tables kept loaded"),
+    'replace': ('oligos_replacement', "Build the genome with the oligos sequences (upstream of hicstuff)"),
+    'hicmatrix': ('hic_matrix', "Convert a Hi-C matrix into a memory mapped float32 matrix (scratch analyses)"),
+}
+
+
+def usage() -> str:
+    lines = ["usage: sshic [--report <report.json>] <command> [arguments]", "", "commands:"]
+    for name, (_, description) in COMMANDS.items():
+        lines.append(f"  {name:<12}{description}")
+    lines += ["", "sshic <command> --help for the arguments of a command"]
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
+    report_path = None
+    if argv and argv[0] == '--report':
+        if len(argv) < 2:
+            print(f"sshic: --report needs the path of the report\n\n{usage()}", file=sys.stderr)
+            return 2
+        report_path, argv = argv[1], argv[2:]
+    if not argv or argv[0] in ('-h', '--help'):
+        print(usage())
+        return 0
+    if argv[0] not in COMMANDS:
+        print(f"sshic: unknown command '{argv[0]}'\n\n{usage()}", file=sys.stderr)
+        return 2
+
+    if CORE_DIR not in sys.path:
+        sys.path.insert(0, CORE_DIR)
+    module_name, _ = COMMANDS[argv[0]]
+    module = importlib.import_module(module_name)
+    sys.argv = [f"sshic {argv[0]}"] + argv[1:]
+    if report_path is None:
+        return module.main(argv[1:])
+
+    from instrumentation import Measure, write_report
+    with Measure() as measure:
+        status = module.main(argv[1:])
+    write_report({"command": argv[0], "arguments": argv[1:], **measure.record}, report_path)
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -10,25 +10,26 @@ aggregate(binned_contacts_path, centros_coord_path, probes_to_fragments_path, wi
           exclude_probe_chr, inter_normalization, plot)
     Aggregate contacts made by probes around centromeres or telomeres.
 
-main(argv)
+main(argv=None)
     Main function that processes command line arguments and calls the aggregate function.
 """
 
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
 import os
+import sys
+import argparse
 from os.path import join 
 from typing import List, Optional
-from utils import sort_by_chr, make_groups_of_probes
+from utils import sort_by_chr, make_groups_of_probes, read_table, write_table, atomic_write, read_reference
 
 #   Set as None to avoid SettingWithCopyWarning
 pd.options.mode.chained_assignment = None
 
 
 def aggregate(
-        binned_10kb_contacts_path: str,
-        binned_1kb_contacts_path: str,
+        binned_10kb_contacts_path: str | pd.DataFrame,
+        binned_1kb_contacts_path: str | pd.DataFrame,
         centros_coord_path: str,
         oligos_path: str,
         window_size: int,
@@ -38,17 +39,18 @@ def aggregate(
         exclude_probe_chr: bool = True,
         additional_path: Optional[str] = None,
         inter_normalization: bool = True,
-        plot: bool = True
+        plot: bool = True,
+        writer=None
 ):
     """
     Aggregate contacts made by probes around centromeres or telomeres.
 
     Parameters
     ----------
-    binned_10kb_contacts_path : str
-        Path to the 10kb_binned_contacts.tsv file (generated by binning).
-    binned_1kb_contacts_path : str
-        Path to the 1kb_binned_contacts.tsv file (useful for the arm size telo aggregated).
+    binned_10kb_contacts_path : str | pd.DataFrame
+        Path to the 10kb_binned_contacts.tsv file (generated by binning), or the table itself.
+    binned_1kb_contacts_path : str | pd.DataFrame
+        Path to the 1kb_binned_contacts.tsv file (useful for the arm size telo aggregated), or the table itself.
     centros_coord_path : str
         Path to the chr_centromeres_coordinates.tsv file.
     oligos_path : str
@@ -69,7 +71,13 @@ def aggregate(
         Normalize the contacts only on contacts made on chromosomes that have not been excluded (inter).
     plot : bool, optional, default=True
         Plot for each probe its aggregated mean of contacts around centromere, with standard deviation.
+    writer : TableWriter, optional
+        Writer of the output tables (see utils.TableWriter), by default they are written right away.
 
+    Returns
+    -------
+    pd.DataFrame
+        The aggregated mean of contacts around the regions (None if 'on' is neither centromeres nor telomeres).
     """
 
     aggregated_dir = join(output_dir, on)
@@ -78,7 +86,10 @@ def aggregate(
     os.makedirs(dir_plots, exist_ok=True)
     os.makedirs(dir_tables, exist_ok=True)
 
-    df_centros: pd.DataFrame = pd.read_csv(centros_coord_path, sep='\t', index_col=None)
+    if excluded_chr_list is None:
+        excluded_chr_list = []
+
+    df_centros: pd.DataFrame = read_reference(centros_coord_path, sep='\t')
     df_arms_size: pd.DataFrame = pd.DataFrame(columns=["chr", "arm", "size", "category"])
     for _, row in df_centros.iterrows():
         chr_ = row["chr"]
@@ -88,16 +99,16 @@ def aggregate(
             df_arms_size.loc[len(df_arms_size)] = chr_, "right", right_, category_.split("_")[1]
     df_centros.drop(columns="category", inplace=True)
 
-    df_contacts_10kb: pd.DataFrame = pd.read_csv(binned_10kb_contacts_path, sep='\t')
-    df_contacts_1kb: pd.DataFrame = pd.read_csv(binned_1kb_contacts_path, sep='\t')
+    df_contacts_10kb: pd.DataFrame = read_table(binned_10kb_contacts_path, sep='\t')
+    df_contacts_1kb: pd.DataFrame = read_table(binned_1kb_contacts_path, sep='\t')
 
-    df_probes: pd.DataFrame = pd.read_csv(oligos_path, sep=',')
+    df_probes: pd.DataFrame = read_reference(oligos_path, sep=',')
     probes = df_probes['name'].to_list()
     fragments = df_probes["fragment"].astype(str).tolist()
     unique_fragments = df_probes["fragment"].astype(str).unique().tolist()
 
     if additional_path:
-        df_additional: pd.DataFrame = pd.read_csv(additional_path, sep='\t')
+        df_additional: pd.DataFrame = read_reference(additional_path, sep='\t')
         groups = df_additional['name'].to_list()
         df_contacts_10kb.drop(columns=groups, inplace=True)
         df_contacts_1kb.drop(columns=groups, inplace=True)
@@ -162,7 +173,8 @@ def aggregate(
 
         chr_arm(
             df_chr_arm=df_arms_size, df_telos=df_telos, df_contacts=df_contacts_1kb,
-            telomeres_size=30000, output_path=join(aggregated_dir, f"aggregated_by_arm_sizes_{norm_suffix}.tsv"))
+            telomeres_size=30000, output_path=join(aggregated_dir, f"aggregated_by_arm_sizes_{norm_suffix}.tsv"),
+            writer=writer)
 
     else:
         return
@@ -171,21 +183,27 @@ def aggregate(
     df_grouped['chr_bins'] = df_grouped['chr_bins'].astype('int64')
 
     df_aggregated_mean: pd.DataFrame = df_grouped.groupby(by="chr_bins", as_index=False).mean(numeric_only=True)
-    df_aggregated_mean.to_csv(join(dir_tables, f"aggregated_mean_contacts_around_{on}_{norm_suffix}.tsv"), sep="\t")
+    write_table(df_aggregated_mean, join(dir_tables, f"aggregated_mean_contacts_around_{on}_{norm_suffix}.tsv"),
+                writer, sep="\t")
     df_aggregated_std: pd.DataFrame = df_grouped.groupby(by="chr_bins", as_index=False).std(numeric_only=True)
-    df_aggregated_std.to_csv(join(dir_tables, f"aggregated_std_contacts_around_{on}_{norm_suffix}.tsv"), sep="\t")
+    write_table(df_aggregated_std, join(dir_tables, f"aggregated_std_contacts_around_{on}_{norm_suffix}.tsv"),
+                writer, sep="\t")
     df_aggregated_median: pd.DataFrame = df_grouped.groupby(by="chr_bins", as_index=False).median(numeric_only=True)
-    df_aggregated_median.to_csv(join(dir_tables, f"aggregated_median_contacts_around_{on}_{norm_suffix}.tsv"), sep="\t")
+    write_table(df_aggregated_median, join(dir_tables, f"aggregated_median_contacts_around_{on}_{norm_suffix}.tsv"),
+                writer, sep="\t")
 
     for probe, frag in zip(probes, fragments):
         if df_grouped[frag].sum() == 0:
             continue
         df_chr_centros_pivot: pd.DataFrame = df_grouped.pivot_table(
             index='chr_bins', columns='chr', values=frag, fill_value=0)
-        df_chr_centros_pivot.to_csv(
-            join(dir_tables, str(frag) + f"_contacts_around_{on}_per_chr_{norm_suffix}.tsv"), sep='\t')
+        write_table(
+            df_chr_centros_pivot, join(dir_tables, str(frag) + f"_contacts_around_{on}_per_chr_{norm_suffix}.tsv"),
+            writer, sep='\t')
 
         if plot:
+            #   loaded on first use only, the pipeline does not plot
+            import matplotlib.pyplot as plt
             mean = df_chr_centros_pivot.T.mean()
             std = df_chr_centros_pivot.T.std()
 
@@ -200,17 +218,20 @@ def aggregate(
             plt.xlabel("Bins around the centromeres (in kb), 5' to 3'")
             plt.xticks(rotation=45)
             plt.ylabel("Average frequency made and standard deviation")
-            plt.savefig(
-                join(dir_plots, f"{frag}_{on}_aggregated_freq_plot_{norm_suffix}.jpg"), dpi=96)
+            with atomic_write(join(dir_plots, f"{frag}_{on}_aggregated_freq_plot_{norm_suffix}.jpg")) as tmp_path:
+                plt.savefig(tmp_path, dpi=96)
             plt.close()
 
+    return df_aggregated_mean
+
 
 def chr_arm(
         df_chr_arm: pd.DataFrame,
         df_telos: pd.DataFrame,
         df_contacts: pd.DataFrame,
         telomeres_size: int,
-        output_path: str
+        output_path: str,
+        writer=None
 ):
 
     df_merged = pd.merge(df_contacts, df_telos, on='chr')
@@ -226,4 +247,67 @@ def chr_arm(
     df_grouped = df_merged2.groupby(by='category', as_index=False).mean(numeric_only=True)
     df_grouped.drop(columns=['chr_bins', 'genome_bins'], inplace=True)
     df_grouped = df_grouped.rename(columns={'category': 'fragments'}).T
-    df_grouped.to_csv(output_path, sep='\t', header=False)
+    write_table(df_grouped, output_path, writer, sep='\t', header=False)
+
+
+def main(argv=None):
+    """
+    Main function to parse command-line arguments and execute the aggregate function.
+
+    Parameters
+    ----------
+    argv : Optional[List[str]]
+        List of command-line arguments. Default is None.
+    """
+    if argv is None:
+        argv = sys.argv[1:]
+    if not argv:
+        print('Please enter arguments correctly')
+        exit(0)
+
+    parser = argparse.ArgumentParser(description='Aggregate the contacts of the probes around centromeres or telomeres')
+    parser.add_argument('--binned-10kb', type=str, required=True,
+                        help='Path to the 10kb binned frequencies table')
+    parser.add_argument('--binned-1kb', type=str, required=True,
+                        help='Path to the 1kb binned frequencies table')
+    parser.add_argument('-c', '--centromeres-coordinates', type=str, required=True,
+                        help='Path to the centromeres coordinates file')
+    parser.add_argument('--oligos', type=str, required=True,
+                        help='Path to the oligos_input.csv file')
+    parser.add_argument('--on', type=str, choices=['centromeres', 'telomeres'], required=True,
+                        help='Regions to aggregate around')
+    parser.add_argument('--window-size', type=int, required=True,
+                        help='window (in bp) that defines the focus region around centromeres or telomeres')
+    parser.add_argument('-o', '--output-dir', type=str, required=True,
+                        help='Path to the output directory')
+    parser.add_argument('-a', '--additional-groups', type=str, required=False,
+                        help='Path to additional groups of probes table')
+    parser.add_argument('--excluded-chr', nargs='+', type=str, required=False,
+                        help='list of chromosomes to excludes to prevent bias of contacts')
+    parser.add_argument('--exclude-probe-chr', action='store_true', required=False,
+                        help="exclude the chromosome where the probe comes from (oligo's chromosome)")
+    parser.add_argument('--absolute', action='store_true', required=False,
+                        help='do not normalize the contacts by the inter-chromosomal contacts')
+    parser.add_argument('--plot', action='store_true', required=False,
+                        help='plot the aggregated contacts of each probe')
+
+    args = parser.parse_args(argv)
+
+    aggregate(
+        binned_10kb_contacts_path=args.binned_10kb,
+        binned_1kb_contacts_path=args.binned_1kb,
+        centros_coord_path=args.centromeres_coordinates,
+        oligos_path=args.oligos,
+        window_size=args.window_size,
+        on=args.on,
+        output_dir=args.output_dir,
+        excluded_chr_list=args.excluded_chr,
+        exclude_probe_chr=args.exclude_probe_chr,
+        additional_path=args.additional_groups,
+        inter_normalization=not args.absolute,
+        plot=args.plot
+    )
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
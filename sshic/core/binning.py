@@ -1,17 +1,20 @@
 #! /usr/bin/env python3
 import os
+import sys
+import argparse
 import re
 import numpy as np
 import pandas as pd
 from typing import Optional
-from utils import sort_by_chr, make_groups_of_probes
+from utils import sort_by_chr, make_groups_of_probes, read_table, write_table, read_reference, index_table, \
+    sample_name
 
 #   Set as None to avoid SettingWithCopyWarning
 pd.options.mode.chained_assignment = None
 
 
 def build_bins_from_genome(path_to_chr_coord: str, bin_size: int):
-    df = pd.read_csv(path_to_chr_coord, sep='\t', index_col=None)
+    df = read_reference(path_to_chr_coord, sep='\t')
     chr_sizes = dict(zip(df.chr, df.length))
 
     chr_list = []
@@ -34,34 +37,40 @@ def build_bins_from_genome(path_to_chr_coord: str, bin_size: int):
 
 
 def rebin_contacts(
-        contacts_unbinned_path: str,
+        contacts_unbinned_path: str | pd.DataFrame,
         chromosomes_coord_path: str,
         oligos_path: str,
         bin_size: int,
         output_dir: str,
         additional_path: Optional[str] = None,
-
+        sample_id: Optional[str] = None,
+        writer=None
 ):
-
-    sample_filename = os.path.basename(contacts_unbinned_path)
-    sample_id = sample_filename.split("_")[0]
-    # sample_id = re.search(r"AD\d+[A-Z]*", sample_filename).group()
+    """
+    Rebin the unbinned contacts (path to the unbinned_contacts.tsv file or the table itself) at bin_size,
+    writes and returns the binned contacts and frequencies tables.
+    The sample_id is by default the beginning of the unbinned contacts file name (before the first '_',
+    required if the unbinned contacts are given as a table),
+    the tables are written through the writer if given (see utils.TableWriter).
+    """
+
+    sample_id = sample_name(contacts_unbinned_path, sample_id)
     bin_suffix = f'{bin_size // 1000}kb'
     output_path = os.path.join(output_dir, f'{sample_id}_{bin_suffix}_binned')
 
     df_binned_template = build_bins_from_genome(chromosomes_coord_path, bin_size)
 
-    df_unbinned = pd.read_csv(contacts_unbinned_path, sep='\t')
+    df_unbinned = read_table(contacts_unbinned_path, sep='\t')
     df_unbinned["end"] = df_unbinned["start"] + df_unbinned["sizes"]
     df_unbinned.drop(columns=["genome_start"], inplace=True)
     df_unbinned["start_bin"] = df_unbinned["start"] // bin_size * bin_size
     df_unbinned["end_bin"] = df_unbinned["end"] // bin_size * bin_size
 
-    df_probes: pd.DataFrame = pd.read_csv(oligos_path, sep=',')
+    df_probes: pd.DataFrame = read_reference(oligos_path, sep=',')
     probes = df_probes['name'].to_list()
     fragments = df_probes["fragment"].astype(str).tolist()
     if additional_path:
-        df_additional: pd.DataFrame = pd.read_csv(additional_path, sep='\t')
+        df_additional: pd.DataFrame = read_reference(additional_path, sep='\t')
         groups = df_additional['name'].to_list()
         df_unbinned.drop(columns=groups, inplace=True)
     else:
@@ -101,6 +110,54 @@ def rebin_contacts(
         make_groups_of_probes(df_additional, df_binned_contacts, probes_to_fragments)
         make_groups_of_probes(df_additional, df_binned_freq, probes_to_fragments)
 
-    df_binned_contacts.to_csv(f'{output_path}_contacts.tsv', sep='\t', index=False)
-    df_binned_freq.to_csv(f'{output_path}_frequencies.tsv', sep='\t', index=False)
-
+    write_table(df_binned_contacts, f'{output_path}_contacts.tsv', writer, sep='\t', index=False)
+    write_table(df_binned_freq, f'{output_path}_frequencies.tsv', writer, sep='\t', index=False)
+    index_table(df_binned_contacts, f'{output_path}_contacts.tsv', bin_size, dict(zip(probes, fragments)))
+    index_table(df_binned_freq, f'{output_path}_frequencies.tsv', bin_size, dict(zip(probes, fragments)))
+    return df_binned_contacts, df_binned_freq
+
+
+def main(argv=None):
+    """
+    Main function to parse command-line arguments and execute the rebin_contacts function.
+
+    Parameters
+    ----------
+    argv : Optional[List[str]]
+        List of command-line arguments. Default is None.
+    """
+    if argv is None:
+        argv = sys.argv[1:]
+    if not argv:
+        print('Please enter arguments correctly')
+        exit(0)
+
+    parser = argparse.ArgumentParser(description='Rebin the unbinned contacts of the probes')
+    parser.add_argument('-u', '--contacts', type=str, required=True,
+                        help='Path to the unbinned_contacts.tsv file (generated by fragments)')
+    parser.add_argument('-c', '--chr-coordinates', type=str, required=True,
+                        help='Path to the chromosomes coordinates file')
+    parser.add_argument('--oligos', type=str, required=True,
+                        help='Path to the oligos_input.csv file')
+    parser.add_argument('-b', '--binning-sizes', nargs='+', type=int, required=True,
+                        help='desired bin size(s)')
+    parser.add_argument('-o', '--output-dir', type=str, required=True,
+                        help='Path to the output directory')
+    parser.add_argument('-a', '--additional-groups', type=str, required=False,
+                        help='Path to additional groups of probes table')
+
+    args = parser.parse_args(argv)
+
+    for bin_size in args.binning_sizes:
+        rebin_contacts(
+            contacts_unbinned_path=args.contacts,
+            chromosomes_coord_path=args.chr_coordinates,
+            oligos_path=args.oligos,
+            bin_size=bin_size,
+            output_dir=args.output_dir,
+            additional_path=args.additional_groups
+        )
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
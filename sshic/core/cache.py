@@ -0,0 +1,113 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import List, Optional
+import pandas as pd
+
+#   Set as None to avoid SettingWithCopyWarning
+pd.options.mode.chained_assignment = None
+
+#   memory budget (in MB) of the process-wide cache of tables (see tables below)
+DEFAULT_BUDGET_MB = int(os.environ.get("SSHIC_TABLE_CACHE_MB", 1024))
+
+
+class TableCache:
+    def __init__(self, max_bytes: int):
+        """
+        Least recently used cache of parsed tables (pd.read_csv), keyed by path, modification time and size :
+        a table is parsed again only if its file changed. The tables are dropped, least recently used first,
+        as long as the memory they use is above max_bytes (a table bigger than max_bytes alone is not kept).
+
+        A table asked with pin=<name> is also kept, outside of max_bytes, until another table is pinned
+        under the same name : e.g. the table shown by a page is not parsed again at each page turn,
+        whatever its size.
+
+        The DataFrames returned share their data with the cached table (no copy) : they must not be modified.
+        """
+        self.max_bytes = max_bytes
+        self.tables = OrderedDict()
+        self.pinned = {}
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, path: str, columns: Optional[List[str]] = None, pin: Optional[str] = None,
+            **kwargs) -> pd.DataFrame:
+        """
+        Table at path, parsed with pd.read_csv (kwargs are given to read_csv) if not cached yet.
+        With columns, only a view of these columns is returned. With pin, the table is pinned under that name.
+        """
+        stat = os.stat(path)
+        path = os.path.abspath(path)
+        key = (path, repr(sorted(kwargs.items())))
+        version = (stat.st_mtime_ns, stat.st_size)
+
+        with self._lock:
+            df = self._lookup(key, version)
+            if df is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+        if df is None:
+            #   parsed without the lock : the other tables can be read meanwhile
+            parsed = pd.read_csv(path, **kwargs)
+            with self._lock:
+                #   the same table may have been parsed by another thread meanwhile : only one copy is kept
+                df = self._lookup(key, version)
+                if df is None:
+                    df = parsed
+                    self._store(key, version, df)
+
+        if pin is not None:
+            with self._lock:
+                self.pinned[pin] = (key, version, df)
+
+        if columns is None:
+            return df
+        #   Series of the cached table, assembled without copying their data
+        return pd.DataFrame({c: df[c] for c in columns}, copy=False)
+
+    def _lookup(self, key, version) -> Optional[pd.DataFrame]:
+        entry = self.tables.get(key)
+        if entry is not None and entry[0] == version:
+            self.tables.move_to_end(key)
+            return entry[1]
+        for pinned_key, pinned_version, df in self.pinned.values():
+            if pinned_key == key and pinned_version == version:
+                return df
+        return None
+
+    def _store(self, key, version, df: pd.DataFrame):
+        if key in self.tables:
+            self._drop(key)
+        nbytes = int(df.memory_usage(index=True, deep=True).sum())
+        if nbytes <= self.max_bytes:
+            self.tables[key] = (version, df, nbytes)
+            self.nbytes += nbytes
+            while self.nbytes > self.max_bytes:
+                self._drop(next(iter(self.tables)))
+
+    def _drop(self, key):
+        _, _, nbytes = self.tables.pop(key)
+        self.nbytes -= nbytes
+
+    def resize(self, max_bytes: int):
+        """
+        Changes the memory budget, dropping the least recently used tables if needed.
+        """
+        with self._lock:
+            self.max_bytes = max_bytes
+            while self.tables and self.nbytes > self.max_bytes:
+                self._drop(next(iter(self.tables)))
+
+    def clear(self):
+        with self._lock:
+            self.tables.clear()
+            self.pinned.clear()
+            self.nbytes = 0
+
+
+#   shared by all the pages of the web interface
+tables = TableCache(DEFAULT_BUDGET_MB * 1024 ** 2)
@@ -0,0 +1,149 @@
+import os
+import re
+import time
+import threading
+from os.path import join
+from typing import Dict, List, Tuple
+import pandas as pd
+from utils import read_tables_index, TABLES_INDEX, COORDINATES_COLUMNS
+
+#   Set as None to avoid SettingWithCopyWarning
+pd.options.mode.chained_assignment = None
+
+#   listings younger than this (in s) are used without checking their directory
+DEFAULT_MAX_AGE = 2.
+
+
+class DataCatalog:
+    def __init__(self, data_dir: str, max_age: float = DEFAULT_MAX_AGE):
+        """
+        Catalogue of the data directory of the web interface (inputs, samples and outputs : samples, PCR modes,
+        weighting directories, bin sizes and probes), so that the callbacks do not list the directories
+        (one listdir and one isdir per entry) at each interaction.
+
+        Each directory is listed once and listed again only when its modification time changes (a file or a
+        directory was added, removed or renamed in it), which costs one stat, done at most every max_age seconds.
+        The tables indexes of the outputs (see utils.index_table) are read again the same way.
+        """
+        self.data_dir = data_dir
+        self.max_age = max_age
+        #   path : (time checked, mtime_ns, [(name, is_dir), ...])
+        self.listings: Dict[str, Tuple[float, int, List[Tuple[str, bool]]]] = {}
+        #   path : (time checked, mtime_ns, index)
+        self.indexes: Dict[str, Tuple[float, int, dict]] = {}
+        self._lock = threading.Lock()
+
+    def _listing(self, directory: str) -> List[Tuple[str, bool]]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self.listings.get(directory)
+        if entry is not None and now - entry[0] < self.max_age:
+            return entry[2]
+        try:
+            mtime = os.stat(directory).st_mtime_ns
+        except OSError:
+            with self._lock:
+                self.listings.pop(directory, None)
+            return []
+        if entry is not None and entry[1] == mtime:
+            items = entry[2]
+        else:
+            with os.scandir(directory) as it:
+                items = sorted((e.name, e.is_dir()) for e in it)
+        with self._lock:
+            self.listings[directory] = (now, mtime, items)
+        return items
+
+    def files(self, *parts: str) -> List[str]:
+        """
+        Names of the files of the directory data_dir/parts..., sorted.
+        """
+        return [name for name, is_dir in self._listing(join(self.data_dir, *parts)) if not is_dir]
+
+    def dirs(self, *parts: str) -> List[str]:
+        """
+        Names of the subdirectories of the directory data_dir/parts..., sorted.
+        """
+        return [name for name, is_dir in self._listing(join(self.data_dir, *parts)) if is_dir]
+
+    def samples(self) -> List[str]:
+        """
+        Ids of the samples of the samples directory (the part of the file names before the first '_').
+        """
+        return sorted({f.split("_")[0] for f in self.files("samples")})
+
+    def sample_files(self, sample_id: str) -> List[str]:
+        return [f for f in self.files("samples") if sample_id.lower() in f.lower()]
+
+    def output_samples(self) -> List[str]:
+        return self.dirs("outputs")
+
+    def pcr_dirs(self, sample_id: str) -> List[str]:
+        return [d for d in self.dirs("outputs", sample_id) if 'pcr' in d.lower()]
+
+    def weight_dirs(self, sample_id: str, pcr: str) -> List[str]:
+        return self.dirs("outputs", sample_id, pcr)
+
+    def tables_index(self, *parts: str) -> dict:
+        """
+        Index of the tables of the output directory data_dir/parts... (see utils.read_tables_index).
+        """
+        directory = join(self.data_dir, *parts)
+        now = time.monotonic()
+        with self._lock:
+            entry = self.indexes.get(directory)
+        if entry is not None and now - entry[0] < self.max_age:
+            return entry[2]
+        try:
+            mtime = os.stat(join(directory, TABLES_INDEX)).st_mtime_ns
+        except OSError:
+            mtime = None
+        if entry is not None and entry[1] == mtime:
+            index = entry[2]
+        else:
+            index = read_tables_index(directory) if mtime is not None else {}
+        with self._lock:
+            self.indexes[directory] = (now, mtime, index)
+        return index
+
+    def bin_sizes(self, sample_id: str, pcr: str, weight: str) -> List[int]:
+        """
+        Resolutions (in bp) of the binned tables of the output directory, sorted.
+        """
+        index = self.tables_index("outputs", sample_id, pcr, weight)
+        sizes = {e['resolution'] for e in index.values() if e.get('resolution')}
+        if not index:
+            #   outputs of a version of the pipeline without index
+            for f in self.files("outputs", sample_id, pcr, weight):
+                match = re.match(rf"{re.escape(sample_id)}_(\d+)kb_binned_", f)
+                if match:
+                    sizes.add(int(match.group(1)) * 1000)
+        return sorted(sizes)
+
+    def probes(self, sample_id: str, pcr: str, weight: str) -> List[str]:
+        """
+        Probes (fragments) and groups of probes of the unbinned contacts of the output directory.
+        """
+        table_name = f"{sample_id}_unbinned_contacts.tsv"
+        entry = self.tables_index("outputs", sample_id, pcr, weight).get(table_name)
+        if entry is not None:
+            return entry['fragments'] + entry['groups']
+        #   otherwise only the header of the table is read
+        path = join(self.data_dir, "outputs", sample_id, pcr, weight, table_name)
+        columns = pd.read_csv(path, sep='\t', nrows=0).columns
+        return [c for c in columns if c not in COORDINATES_COLUMNS]
+
+
+_catalogs: Dict[str, DataCatalog] = {}
+_catalogs_lock = threading.Lock()
+
+
+def catalog(data_dir: str) -> DataCatalog:
+    """
+    Catalogue of the data directory, shared by all the callbacks of the web interface.
+    """
+    data_dir = os.path.abspath(data_dir)
+    with _catalogs_lock:
+        if data_dir not in _catalogs:
+            _catalogs[data_dir] = DataCatalog(data_dir)
+        return _catalogs[data_dir]
@@ -4,6 +4,8 @@ import sys
 import argparse
 import numpy as np
 import pandas as pd
+from typing import Optional
+from utils import write_table, read_reference, read_table
 
 #   Set as None to avoid SettingWithCopyWarning
 pd.options.mode.chained_assignment = None
@@ -13,6 +15,8 @@ def coverage(
     hic_contacts_path: str,
     fragments_path: str,
     output_dir: str,
+    sample_id: Optional[str] = None,
+    writer=None
 ):
 
     """
@@ -26,17 +30,27 @@ def coverage(
         Path to the fragments_input.txt file (generated by hicstuff).
     output_dir : str
         Path to the output directory.
+    sample_id : str, optional
+        Name of the sample, by default the beginning of the contacts file name (before the first '_').
+    writer : TableWriter, optional
+        Writer of the output tables (see utils.TableWriter), by default they are written right away.
+
+    Returns
+    -------
+    Tuple[pd.DataFrame, pd.DataFrame]
+        The contacts and frequencies coverages.
     """
 
-    sample_filename = hic_contacts_path.split("/")[-1]
-    sample_id = sample_filename.split("_")[0]
-    # sample_id = re.search(r"AD\d+[A-Z]*", sample_filename).group()
+    if sample_id is None:
+        sample_filename = hic_contacts_path.split("/")[-1]
+        sample_id = sample_filename.split("_")[0]
+        # sample_id = re.search(r"AD\d+[A-Z]*", sample_filename).group()
     output_path = os.path.join(output_dir, sample_id + f"_coverage_per_fragment")
 
-    df_fragments: pd.DataFrame = pd.read_csv(fragments_path, sep='\t')
+    df_fragments: pd.DataFrame = read_reference(fragments_path, sep='\t')
     df_fragments.rename(columns={'chrom': 'chr', 'start_pos': 'start', 'end_pos': 'end'}, inplace=True)
     df_fragments['id'] = df_fragments.index.values
-    df_hic_contacts: pd.DataFrame = pd.read_csv(
+    df_hic_contacts: pd.DataFrame = read_table(
         hic_contacts_path, header=0, sep="\t", names=['frag_a', 'frag_b', 'contacts'])
 
     df_coverage: pd.DataFrame = df_fragments[['chr', 'start', 'end']]
@@ -67,8 +81,10 @@ def coverage(
     df_frequencies_cov["contacts"] /= sum(df_frequencies_cov["contacts"])
     df_frequencies_cov.rename(columns={"contacts": "frequencies"})
 
-    df_contacts_cov.to_csv(output_path + "_contacts.bedgraph", sep='\t', index=False, header=False)
-    df_frequencies_cov.to_csv(output_path + "_frequencies.bedgraph", sep='\t', index=False, header=False)
+    write_table(df_contacts_cov, output_path + "_contacts.bedgraph", writer, sep='\t', index=False, header=False)
+    write_table(
+        df_frequencies_cov, output_path + "_frequencies.bedgraph", writer, sep='\t', index=False, header=False)
+    return df_contacts_cov, df_frequencies_cov
 
 
 def main(argv=None):
@@ -91,10 +107,8 @@ def main(argv=None):
                         help='Path to the fragments_input.txt file (generated by hicstuff)')
     parser.add_argument('-c', '--contacts', type=str, required=True,
                         help='Path to the sparse_contacts_input.txt file (generated by hicstuff)')
-    parser.add_argument('-o', 'output-dir', type=str, required=True,
+    parser.add_argument('-o', '--output-dir', type=str, required=True,
                         help='Path to the output directory')
-    parser.add_argument('--output-format', type=str, required=True,
-                        help='format for the output file coverage (tsv, csv, txt, bedgraph etc ...')
 
     args = parser.parse_args(argv)
 
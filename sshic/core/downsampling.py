@@ -0,0 +1,60 @@
+from typing import Optional, Sequence, Tuple
+import numpy as np
+
+
+def minmax_downsample(
+        x: np.ndarray,
+        y: np.ndarray,
+        n_buckets: int,
+        x_range: Optional[Sequence[float]] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Reduces a line trace to the points that can be seen at a width of n_buckets pixels :
+    the x range is cut into n_buckets columns of the same width, and only the points of lowest and
+    highest y of each column are kept (in x order), so that peaks and dips stay visible.
+    Traces of less than 2 * n_buckets points are returned as they are.
+
+    Parameters
+    ----------
+    x : np.ndarray
+        x values, sorted.
+    y : np.ndarray
+        y values (NaN are kept only in columns that have no other value).
+    n_buckets : int
+        Number of columns, usually the width in pixels of the plot.
+    x_range : Sequence[float], optional
+        [start, end] x range visible, the points outside it are dropped
+        (except the closest one on each side, for the line to reach the borders of the plot).
+
+    Returns
+    -------
+    Tuple[np.ndarray, np.ndarray]
+        x and y of the points kept.
+    """
+    x = np.asarray(x)
+    y = np.asarray(y, dtype=float)
+    if x_range is not None and len(x) > 0:
+        start = max(np.searchsorted(x, x_range[0], side='left') - 1, 0)
+        end = min(np.searchsorted(x, x_range[1], side='right') + 1, len(x))
+        x, y = x[start:end], y[start:end]
+
+    n = len(x)
+    if n <= 2 * n_buckets:
+        return x, y
+
+    x_min, x_max = float(x[0]), float(x[-1])
+    if x_max <= x_min:
+        buckets = np.zeros(n, dtype=np.int64)
+    else:
+        buckets = ((x - x_min) / (x_max - x_min) * n_buckets).astype(np.int64)
+        buckets = np.minimum(buckets, n_buckets - 1)
+
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], n] - 1
+    #   points sorted by column then by y (x is sorted, so columns keep their positions) :
+    #   the first point of each column has its lowest y, the last one its highest y
+    nan = np.isnan(y)
+    lowest = np.lexsort((np.where(nan, np.inf, y), buckets))[starts]
+    highest = np.lexsort((np.where(nan, -np.inf, y), buckets))[ends]
+    keep = np.union1d(lowest, highest)
+    return x[keep], y[keep]
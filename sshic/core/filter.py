@@ -3,7 +3,8 @@ import os
 import sys
 import argparse
 import pandas as pd
-from utils import frag2
+from typing import Optional
+from utils import frag2, write_table, read_reference, read_table, sample_name
 
 
 def oligos_correction(oligos_path: str):
@@ -21,7 +22,7 @@ def oligos_correction(oligos_path: str):
     pd.DataFrame
         The corrected oligos DataFrame.
     """
-    oligos = pd.read_csv(oligos_path, sep=",")
+    oligos = read_reference(oligos_path, sep=",")
     oligos.columns = [oligos.columns[i].lower() for i in range(len(oligos.columns))]
     oligos.sort_values(by=['chr', 'start'], inplace=True)
     oligos.reset_index(drop=True, inplace=True)
@@ -43,7 +44,7 @@ def fragments_correction(fragments_path: str):
     pd.DataFrame
         The corrected fragments DataFrame.
     """
-    fragments = pd.read_csv(fragments_path, sep='\t')
+    fragments = read_reference(fragments_path, sep='\t')
     fragments = pd.DataFrame({'frag': [k for k in range(len(fragments))],
                               'chr': fragments['chrom'],
                               'start': fragments['start_pos'],
@@ -143,7 +144,7 @@ def contacts_correction(contacts_path: str):
     pd.DataFrame
         The corrected contacts DataFrame.
     """
-    contacts = pd.read_csv(contacts_path, sep='\t', header=None)
+    contacts = read_table(contacts_path, sep='\t', header=None)
     contacts.drop([0], inplace=True)
     contacts.reset_index(drop=True, inplace=True)
     contacts.columns = ['frag_a', 'frag_b', 'contacts']
@@ -222,7 +223,9 @@ def filter_contacts(
         oligos_path: str,
         fragments_path: str,
         contacts_path: str,
-        output_dir: str
+        output_dir: str,
+        sample_id: Optional[str] = None,
+        writer=None
 ):
     """
     Filter the contacts based on the oligos and fragments data, and save the filtered contacts to a TSV file.
@@ -237,14 +240,17 @@ def filter_contacts(
         Path to the sparse_contacts input TXT file (generated by hicstuff).
     output_dir : str
         Path to the output directory.
+    sample_id : str, optional
+        Name of the sample, by default the beginning of the contacts file name (before the first '_').
+    writer : TableWriter, optional
+        Writer of the output table (see utils.TableWriter), by default it is written right away.
 
     Returns
     -------
-    None
+    pd.DataFrame
+        The filtered contacts.
     """
-    sample_filename = contacts_path.split("/")[-1]
-    sample_id = sample_filename.split("_")[0]
-    # sample_id = re.search(r"AD\d+[A-Z]*", sample_filename).group()
+    sample_id = sample_name(contacts_path, sample_id)
     os.makedirs(output_dir, exist_ok=True)
     output_path = os.path.join(output_dir, sample_id+'_filtered.tsv')
 
@@ -259,7 +265,8 @@ def filter_contacts(
     contacts_joined.drop("frag", axis=1, inplace=True)
     contacts_joined.sort_values(by=['frag_a', 'frag_b', 'start_a', 'start_b'], inplace=True)
     contacts_filtered = contacts_joined.convert_dtypes().reset_index(drop=True)
-    contacts_filtered.to_csv(output_path, sep='\t', index=False)
+    write_table(contacts_filtered, output_path, writer, sep='\t', index=False)
+    return contacts_filtered
 
 
 def main(argv=None):
@@ -1,21 +1,26 @@
 #! /usr/bin/env python3
 import re
 import os
+import sys
+import argparse
 import numpy as np
 import pandas as pd
 from typing import Optional
-from utils import frag2, sort_by_chr, make_groups_of_probes
+from utils import frag2, sort_by_chr, make_groups_of_probes, read_table, write_table, read_reference, index_table, \
+    sample_name
 
 #   Set as None to avoid SettingWithCopyWarning
 pd.options.mode.chained_assignment = None
 
 
 def organize_contacts(
-        filtered_contacts_path: str,
+        filtered_contacts_path: str | pd.DataFrame,
         oligos_path: str,
         chromosomes_coord_path: str,
         output_dir: str,
-        additional_path: Optional[str] = None
+        additional_path: Optional[str] = None,
+        sample_id: Optional[str] = None,
+        writer=None
 ):
 
     """
@@ -24,8 +29,8 @@ def organize_contacts(
 
     Parameters
     ----------
-    filtered_contacts_path : str
-        Path to the contacts_filtered_input.txt file (generated by filter).
+    filtered_contacts_path : str | pd.DataFrame
+        Path to the contacts_filtered_input.txt file (generated by filter), or the filtered contacts themselves.
     oligos_path : str
         Path to the oligos input CSV file.
     chromosomes_coord_path : str
@@ -34,23 +39,31 @@ def organize_contacts(
         Path to the output directory.
     additional_path: str
         Path to a csv file that contains groups of probes to sum, average etc ...
+    sample_id : str, optional
+        Name of the sample, by default the beginning of the filtered contacts file name (before the first '_'),
+        required if the filtered contacts are given as a table.
+    writer : TableWriter, optional
+        Writer of the output tables (see utils.TableWriter), by default they are written right away.
+
+    Returns
+    -------
+    Tuple[pd.DataFrame, pd.DataFrame]
+        The unbinned contacts and frequencies.
     """
 
-    sample_filename = filtered_contacts_path.split("/")[-1]
-    sample_id = sample_filename.split("_")[0]
-    # sample_id = re.search(r"AD\d+[A-Z]*", sample_filename).group()
+    sample_id = sample_name(filtered_contacts_path, sample_id)
     output_path = os.path.join(output_dir, sample_id)
 
-    df_chr_len: pd.DataFrame = pd.read_csv(chromosomes_coord_path, sep='\t', index_col=None)
+    df_chr_len: pd.DataFrame = read_reference(chromosomes_coord_path, sep='\t')
     df_chr_len = df_chr_len[["chr", "length"]]
     df_chr_len["length"] = df_chr_len["length"].shift().fillna(0).astype("int64")
     df_chr_len["cumsum"] = df_chr_len["length"].cumsum()
 
-    df_probes: pd.DataFrame = pd.read_csv(oligos_path, sep=',')
+    df_probes: pd.DataFrame = read_reference(oligos_path, sep=',')
     probes = df_probes['name'].to_list()
     fragments = df_probes['fragment'].astype(str).to_list()
 
-    df: pd.DataFrame = pd.read_csv(filtered_contacts_path, sep='\t')
+    df: pd.DataFrame = read_table(filtered_contacts_path, sep='\t')
     df_contacts: pd.DataFrame = pd.DataFrame(columns=['chr', 'start', 'sizes'])
     df_contacts: pd.DataFrame = df_contacts.astype(dtype={'chr': str, 'start': int, 'sizes': int})
 
@@ -96,11 +109,56 @@ def organize_contacts(
         df_frequencies[frag] /= sum(df_frequencies[frag])
 
     if additional_path:
-        df_additional: pd.DataFrame = pd.read_csv(additional_path, sep='\t')
+        df_additional: pd.DataFrame = read_reference(additional_path, sep='\t')
         probes_to_fragments = dict(zip(probes, fragments))
         make_groups_of_probes(df_additional, df_contacts, probes_to_fragments)
         make_groups_of_probes(df_additional, df_frequencies, probes_to_fragments)
 
     #   Write into .tsv file contacts as there are and in the form of frequencies :
-    df_contacts.to_csv(output_path + '_unbinned_contacts.tsv', sep='\t', index=False)
-    df_frequencies.to_csv(output_path + '_unbinned_frequencies.tsv', sep='\t', index=False)
+    write_table(df_contacts, output_path + '_unbinned_contacts.tsv', writer, sep='\t', index=False)
+    write_table(df_frequencies, output_path + '_unbinned_frequencies.tsv', writer, sep='\t', index=False)
+    index_table(df_contacts, output_path + '_unbinned_contacts.tsv', 0, dict(zip(probes, fragments)))
+    index_table(df_frequencies, output_path + '_unbinned_frequencies.tsv', 0, dict(zip(probes, fragments)))
+    return df_contacts, df_frequencies
+
+
+def main(argv=None):
+    """
+    Main function to parse command-line arguments and execute the organize_contacts function.
+
+    Parameters
+    ----------
+    argv : Optional[List[str]]
+        List of command-line arguments. Default is None.
+    """
+    if argv is None:
+        argv = sys.argv[1:]
+    if not argv:
+        print('Please enter arguments correctly')
+        exit(0)
+
+    parser = argparse.ArgumentParser(description='Organize the filtered contacts into a table of contacts per probe')
+    parser.add_argument('-i', '--filtered', type=str, required=True,
+                        help='Path to the filtered contacts file (generated by filter)')
+    parser.add_argument('--oligos', type=str, required=True,
+                        help='Path to the oligos_input.csv file')
+    parser.add_argument('-c', '--chr-coordinates', type=str, required=True,
+                        help='Path to the chromosomes coordinates file')
+    parser.add_argument('-o', '--output-dir', type=str, required=True,
+                        help='Path to the output directory')
+    parser.add_argument('-a', '--additional-groups', type=str, required=False,
+                        help='Path to additional groups of probes table')
+
+    args = parser.parse_args(argv)
+
+    organize_contacts(
+        filtered_contacts_path=args.filtered,
+        oligos_path=args.oligos,
+        chromosomes_coord_path=args.chr_coordinates,
+        output_dir=args.output_dir,
+        additional_path=args.additional_groups
+    )
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,213 @@
+import os
+import sys
+import json
+import argparse
+from typing import List, Optional, Sequence
+import numpy as np
+import pandas as pd
+from utils import atomic_write
+
+#   Set as None to avoid SettingWithCopyWarning
+pd.options.mode.chained_assignment = None
+
+
+def chromosome_blocks(fragments_path: str | pd.DataFrame) -> List[list]:
+    """
+    [chr, first fragment, last fragment + 1] of each chromosome of the fragments list (by row order),
+    i.e. the rows / columns of its block in the Hi-C matrix.
+    """
+    df_fragments = pd.read_csv(fragments_path, sep='\t') if isinstance(fragments_path, str) else fragments_path
+    chr_col = 'chr' if 'chr' in df_fragments.columns else 'chrom'
+    chromosomes = df_fragments[chr_col].to_numpy()
+    positions = np.arange(len(chromosomes))
+    return [[c, int(positions[chromosomes == c][0]), int(positions[chromosomes == c][-1]) + 1]
+            for c in pd.unique(chromosomes)]
+
+
+def _source_version(path: str) -> dict:
+    stat = os.stat(path)
+    return {"source": os.path.abspath(path), "mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+
+
+def _write_meta(output_path: str, meta: dict):
+    with atomic_write(output_path + '.json') as tmp_path, open(tmp_path, 'w') as f:
+        json.dump(meta, f)
+
+
+def convert_dense_matrix(
+        matrix_path: str,
+        fragments_path: str | pd.DataFrame,
+        output_path: str,
+        chunk_rows: int = 1000
+):
+    """
+    Converts a dense Hi-C matrix (text, space separated, one row per fragment, as written by hicstuff)
+    into a float32 .npy file that can be memory mapped (see HicMatrix), along with its description
+    (output_path + '.json' : chromosomes blocks and version of the source file).
+    The text is parsed by chunks of chunk_rows rows, the whole matrix is never held in memory.
+    """
+    blocks = chromosome_blocks(fragments_path)
+    n = blocks[-1][2]
+    with atomic_write(output_path) as tmp_path:
+        mat = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=np.float32, shape=(n, n))
+        row = 0
+        for chunk in pd.read_csv(matrix_path, sep=' ', header=None, dtype=np.float32, chunksize=chunk_rows):
+            values = chunk.to_numpy()
+            if values.shape[1] != n:
+                raise ValueError(f"{matrix_path} has {values.shape[1]} columns for {n} fragments")
+            mat[row: row + len(values)] = values
+            row += len(values)
+        if row != n:
+            raise ValueError(f"{matrix_path} has {row} rows for {n} fragments")
+        mat.flush()
+        del mat
+    _write_meta(output_path, {"blocks": blocks, **_source_version(matrix_path)})
+
+
+def convert_sparse_matrix(
+        sparse_path: str,
+        fragments_path: str | pd.DataFrame,
+        output_path: str,
+        chunk_rows: int = 10 ** 6
+):
+    """
+    Same as convert_dense_matrix, from the sparse matrix of hicstuff (header line then frag_a, frag_b, contacts,
+    tab separated, each pair once) : the contacts are added symmetrically in the float32 matrix.
+    """
+    blocks = chromosome_blocks(fragments_path)
+    n = blocks[-1][2]
+    with atomic_write(output_path) as tmp_path:
+        mat = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=np.float32, shape=(n, n))
+        for chunk in pd.read_csv(sparse_path, sep='\t', header=None, skiprows=1, chunksize=chunk_rows,
+                                 names=['frag_a', 'frag_b', 'contacts']):
+            a = chunk['frag_a'].to_numpy()
+            b = chunk['frag_b'].to_numpy()
+            contacts = chunk['contacts'].to_numpy(dtype=np.float32)
+            np.add.at(mat, (a, b), contacts)
+            off_diagonal = a != b
+            np.add.at(mat, (b[off_diagonal], a[off_diagonal]), contacts[off_diagonal])
+        mat.flush()
+        del mat
+    _write_meta(output_path, {"blocks": blocks, **_source_version(sparse_path)})
+
+
+class HicMatrix:
+    def __init__(self, path: str):
+        """
+        Hi-C matrix converted by convert_dense_matrix or convert_sparse_matrix, memory mapped (read only) :
+        only the rows and columns asked are read from the disk.
+
+            hic = open_matrix("AD157.txt", "fragments.frag.tsv")
+            df = hic.viewpoints(rows=windows_fragments, cols=probes_fragments, norm_rows=kept_fragments)
+        """
+        self.path = path
+        with open(path + '.json', 'r') as f:
+            self.meta = json.load(f)
+        self.matrix = np.load(path, mmap_mode='r')
+        self.blocks = self.meta["blocks"]
+        #   index of the chromosome of each row / column
+        self.chr_ids = np.repeat(np.arange(len(self.blocks)), [end - start for _, start, end in self.blocks])
+
+    @property
+    def chromosomes(self) -> List[str]:
+        return [c for c, _, _ in self.blocks]
+
+    def block(self, rows: Sequence[int], cols: Sequence[int], mask_intra: bool = True) -> np.ndarray:
+        """
+        Sub matrix of the rows and columns given (fragment ids), float32, with NaN for the contacts within
+        a chromosome if mask_intra.
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        cols = np.asarray(cols, dtype=np.int64)
+        sub = np.array(self.matrix[np.ix_(rows, cols)], dtype=np.float32)
+        if mask_intra:
+            sub[self.chr_ids[rows][:, None] == self.chr_ids[cols][None, :]] = np.nan
+        return sub
+
+    def viewpoints(
+            self,
+            rows: Sequence[int],
+            cols: Sequence[int],
+            norm_rows: Optional[Sequence[int]] = None,
+            mask_intra: bool = True
+    ) -> pd.DataFrame:
+        """
+        Contacts of the viewpoints cols with the fragments rows, normalized by the sum of the contacts of
+        each viewpoint with the fragments norm_rows (rows if None, intra chromosome contacts excluded if
+        mask_intra). Same as normalizing the columns of the matrix restricted to norm_rows, then keeping rows
+        and cols, but only these columns are read.
+
+        Returns a DataFrame indexed by the fragments of rows, with a column per viewpoint.
+        """
+        norm_rows = rows if norm_rows is None else norm_rows
+        #   add 1e-9 to prevent from dividing by zero
+        sums = np.nansum(self.block(norm_rows, cols, mask_intra), axis=0, dtype=np.float64) + 1e-9
+        values = self.block(rows, cols, mask_intra) / sums
+        return pd.DataFrame(values, index=pd.Index(rows), columns=pd.Index(cols))
+
+
+def open_matrix(
+        matrix_path: str,
+        fragments_path: str | pd.DataFrame,
+        sparse: bool = False,
+        cache_path: Optional[str] = None
+) -> HicMatrix:
+    """
+    Hi-C matrix (dense text, or sparse if sparse) memory mapped from its float32 conversion,
+    cache_path (matrix_path + '.f32.npy' by default), made at the first call and again if the matrix changed.
+    """
+    if cache_path is None:
+        cache_path = matrix_path + '.f32.npy'
+    try:
+        with open(cache_path + '.json', 'r') as f:
+            meta = json.load(f)
+        up_to_date = os.path.exists(cache_path) and \
+            {k: meta.get(k) for k in ("source", "mtime_ns", "size")} == _source_version(matrix_path)
+    except (OSError, ValueError):
+        up_to_date = False
+
+    if not up_to_date:
+        if sparse:
+            convert_sparse_matrix(matrix_path, fragments_path, cache_path)
+        else:
+            convert_dense_matrix(matrix_path, fragments_path, cache_path)
+    return HicMatrix(cache_path)
+
+
+def main(argv=None):
+    """
+    Main function to parse command-line arguments and execute the convert_dense_matrix
+    or convert_sparse_matrix function.
+
+    Parameters
+    ----------
+    argv : Optional[List[str]]
+        List of command-line arguments. Default is None.
+    """
+    if argv is None:
+        argv = sys.argv[1:]
+    if not argv:
+        print('Please enter arguments correctly')
+        exit(0)
+
+    parser = argparse.ArgumentParser(description='Convert a Hi-C matrix into a memory mapped float32 matrix')
+    parser.add_argument('-m', '--matrix', type=str, required=True,
+                        help='Path to the dense matrix (text, space separated) or to the sparse matrix (hicstuff)')
+    parser.add_argument('-f', '--fragments', type=str, required=True,
+                        help='Path to the fragments list (generated by hicstuff)')
+    parser.add_argument('-o', '--output', type=str, required=False, default=None,
+                        help='Path to the .npy file to write (matrix path + .f32.npy by default)')
+    parser.add_argument('--sparse', action='store_true', required=False,
+                        help='the matrix is the sparse matrix of hicstuff')
+
+    args = parser.parse_args(argv)
+
+    output = args.output if args.output is not None else args.matrix + '.f32.npy'
+    if args.sparse:
+        convert_sparse_matrix(args.matrix, args.fragments, output)
+    else:
+        convert_dense_matrix(args.matrix, args.fragments, output)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,137 @@
+import json
+import time
+from typing import Dict, List, Optional, Tuple
+from utils import atomic_write, rows_read
+
+
+def peak_rss() -> int:
+    """
+    Peak resident memory (in bytes) of the process, since its start or the last reset_peak_rss.
+    """
+    try:
+        with open('/proc/self/status', 'r') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    #   ru_maxrss is in kB on linux (but bytes on macOS), and can not be reset
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def reset_peak_rss():
+    """
+    Resets the peak resident memory of the process to the current one (linux only, no effect elsewhere).
+    """
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        pass
+
+
+def io_bytes() -> Tuple[int, int]:
+    """
+    Bytes read and written (read / write calls, from the disk or the page cache) by the current thread since
+    its start : rchar and wchar of /proc/thread-self/io on linux (of the whole process on older kernels),
+    the blocks read and written by the process from getrusage elsewhere.
+    """
+    for path in ('/proc/thread-self/io', '/proc/self/io'):
+        try:
+            with open(path, 'r') as f:
+                counters = {k: int(v) for k, v in (line.split(':') for line in f)}
+            return counters['rchar'], counters['wchar']
+        except (OSError, KeyError, ValueError):
+            continue
+    import resource
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_inblock * 512, usage.ru_oublock * 512
+
+
+class Measure:
+    def __init__(self):
+        """
+        Measures the wall time, the cpu time (of the whole process), the peak resident memory, the bytes read
+        and written (see io_bytes) and the number of rows of the tables read (see utils.rows_read)
+        by the code run in a 'with' block, in the current thread :
+
+            with Measure() as m:
+                ...
+            m.record -> {"wall_time": .., "cpu_time": .., "peak_rss": .., "bytes_in": .., "bytes_out": ..,
+                         "rows_in": ..}
+        """
+        self.record = {}
+        self._wall = self._cpu = 0.
+        self._io = (0, 0)
+        self._rows = 0
+
+    def __enter__(self):
+        reset_peak_rss()
+        self._io = io_bytes()
+        self._rows = rows_read()
+        self._wall = time.perf_counter()
+        self._cpu = time.process_time()
+        return self
+
+    def __exit__(self, *exc):
+        wall = time.perf_counter() - self._wall
+        cpu = time.process_time() - self._cpu
+        read_bytes, write_bytes = io_bytes()
+        self.record = {
+            "wall_time": wall,
+            "cpu_time": cpu,
+            "peak_rss": peak_rss(),
+            "bytes_in": read_bytes - self._io[0],
+            "bytes_out": write_bytes - self._io[1],
+            "rows_in": rows_read() - self._rows
+        }
+        return False
+
+
+def summary(stages: List[dict]) -> dict:
+    """
+    Totals of the stages records (see Scheduler.report) : times, bytes and rows are summed,
+    the peak memory is the highest one.
+    """
+    run = [s for s in stages if s["status"] == "run"]
+    total = {k: sum(s[k] for s in run) for k in
+             ("wall_time", "cpu_time", "bytes_in", "bytes_out", "rows_in", "rows_out")}
+    total["peak_rss"] = max((s["peak_rss"] for s in run), default=0)
+    total["stages_run"] = len(run)
+    total["stages_up_to_date"] = len(stages) - len(run)
+    return total
+
+
+def batch_report(reports: Dict[str, Optional[dict]], status: Dict[str, str], elapsed: Dict[str, float]) -> dict:
+    """
+    Rollup of the run reports of several samples (by sample key, None if the sample has no report) :
+    status, duration and totals of each sample, and totals of each function over all the samples.
+    """
+    samples = {}
+    functions = {}
+    for key, report in reports.items():
+        samples[key] = {"status": status.get(key), "elapsed": elapsed.get(key)}
+        if report is None:
+            continue
+        samples[key].update(sample=report["sample"], **report["total"])
+        for s in report["stages"]:
+            if s["status"] != "run":
+                continue
+            f = functions.setdefault(s["function"], {
+                "calls": 0, "wall_time": 0., "cpu_time": 0., "peak_rss": 0,
+                "bytes_in": 0, "bytes_out": 0, "rows_in": 0, "rows_out": 0})
+            f["calls"] += 1
+            f["peak_rss"] = max(f["peak_rss"], s["peak_rss"])
+            for k in ("wall_time", "cpu_time", "bytes_in", "bytes_out", "rows_in", "rows_out"):
+                f[k] += s[k]
+
+    total = {k: sum(s.get(k, 0) for s in samples.values()) for k in
+             ("wall_time", "cpu_time", "bytes_in", "bytes_out", "rows_in", "rows_out", "stages_run")}
+    total["peak_rss"] = max((s.get("peak_rss", 0) for s in samples.values()), default=0)
+    return {"samples": samples, "functions": functions, "total": total}
+
+
+def write_report(report: dict, path: str):
+    with atomic_write(path) as tmp_path, open(tmp_path, 'w') as f:
+        json.dump(report, f, indent=2)
@@ -0,0 +1,188 @@
+from typing import Tuple
+import numpy as np
+import pandas as pd
+
+#   Set as None to avoid SettingWithCopyWarning
+pd.options.mode.chained_assignment = None
+
+
+def contained_sums(
+        starts: np.ndarray,
+        ends: np.ndarray,
+        scores: np.ndarray,
+        query_starts: np.ndarray,
+        query_ends: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Number and sum of the scores of the intervals [starts, ends] contained in each query interval
+    [query_starts, query_ends] (start >= query start and end <= query end), on the same chromosome.
+
+    Sorted-sweep join instead of a mask of all the intervals per query : with the prefix sums of the intervals
+    sorted by end, the intervals contained in [qs, qe] are the ones ending before qe, minus the ones ending
+    before qs, minus the ones that overlap qs (start < qs <= end <= qe). Only the latter are compared one by one,
+    among the intervals starting less than the longest interval before qs.
+    O((N + Q) log N) for N intervals and Q queries, plus the overlaps of the query starts.
+
+    Parameters
+    ----------
+    starts, ends : np.ndarray
+        Bounds of the intervals (included), e.g. the nucleosomes.
+    scores : np.ndarray
+        Score of each interval.
+    query_starts, query_ends : np.ndarray
+        Bounds of the query intervals (included), e.g. the fragments.
+
+    Returns
+    -------
+    Tuple[np.ndarray, np.ndarray]
+        Number of intervals and sum of their scores, per query.
+    """
+    starts = np.asarray(starts)
+    ends = np.asarray(ends)
+    scores = np.asarray(scores, dtype=float)
+    query_starts = np.asarray(query_starts)
+    query_ends = np.asarray(query_ends)
+    if len(starts) == 0 or len(query_starts) == 0:
+        return np.zeros(len(query_starts), dtype=np.int64), np.zeros(len(query_starts))
+
+    #   intervals ending before a position : prefix sums along the ends
+    by_end = np.argsort(ends, kind='stable')
+    sorted_ends = ends[by_end]
+    cum_scores = np.r_[0., np.cumsum(scores[by_end])]
+    ending_before_qe = np.searchsorted(sorted_ends, query_ends, side='right')
+    ending_before_qs = np.searchsorted(sorted_ends, query_starts, side='left')
+    counts = ending_before_qe - ending_before_qs
+    sums = cum_scores[ending_before_qe] - cum_scores[ending_before_qs]
+
+    #   intervals overlapping the query start (start < qs <= end) : they start after qs - the longest interval
+    by_start = np.argsort(starts, kind='stable')
+    sorted_starts = starts[by_start]
+    max_length = int((ends - starts).max())
+    first = np.searchsorted(sorted_starts, query_starts - max_length, side='left')
+    last = np.searchsorted(sorted_starts, query_starts, side='left')
+    n_candidates = np.maximum(last - first, 0)
+    if n_candidates.sum() > 0:
+        queries = np.repeat(np.arange(len(query_starts)), n_candidates)
+        offsets = np.arange(n_candidates.sum()) - np.repeat(np.cumsum(n_candidates) - n_candidates, n_candidates)
+        candidates = by_start[np.repeat(first, n_candidates) + offsets]
+        overlap = (ends[candidates] >= query_starts[queries]) & (ends[candidates] <= query_ends[queries])
+        counts -= np.bincount(queries[overlap], minlength=len(query_starts))
+        sums -= np.bincount(queries[overlap], weights=scores[candidates[overlap]], minlength=len(query_starts))
+
+    #   queries ending before they start contain nothing
+    empty = query_ends < query_starts
+    counts[empty] = 0
+    sums[empty] = 0.
+    return counts, sums
+
+
+def contained_average(
+        starts: np.ndarray,
+        ends: np.ndarray,
+        scores: np.ndarray,
+        query_starts: np.ndarray,
+        query_ends: np.ndarray
+) -> np.ndarray:
+    """
+    Average score of the intervals contained in each query interval (see contained_sums), 0 if there is none.
+    """
+    counts, sums = contained_sums(starts, ends, scores, query_starts, query_ends)
+    averages = np.zeros(len(counts))
+    np.divide(sums, counts, out=averages, where=counts > 0)
+    return averages
+
+
+def contained_coverage(
+        starts: np.ndarray,
+        ends: np.ndarray,
+        scores: np.ndarray,
+        query_starts: np.ndarray,
+        query_ends: np.ndarray
+) -> np.ndarray:
+    """
+    Sum of the scores of the intervals contained in each query interval, divided by the length from the start
+    of the first of them to the end of the last one (score per bp), 0 if there is none.
+
+    When the intervals are not nested (e.g. the regions of a bedgraph), sorted by start they are also sorted
+    by end, and the ones contained in a query are a range of them, found with searchsorted. O((N + Q) log N).
+    Otherwise (nested intervals, or intervals starting at the same position), the sums are the ones of
+    contained_sums and the span goes from the lowest start to the highest end of the contained intervals,
+    compared one by one among the intervals starting in the query.
+    """
+    starts = np.asarray(starts)
+    ends = np.asarray(ends)
+    scores = np.asarray(scores, dtype=float)
+    query_starts = np.asarray(query_starts)
+    query_ends = np.asarray(query_ends)
+    coverage = np.zeros(len(query_starts))
+    if len(starts) == 0 or len(query_starts) == 0:
+        return coverage
+
+    by_start = np.argsort(starts, kind='stable')
+    sorted_starts = starts[by_start]
+    sorted_ends = ends[by_start]
+    if np.any(np.diff(sorted_ends) < 0):
+        return _nested_coverage(sorted_starts, sorted_ends, starts, ends, scores, query_starts, query_ends)
+    cum_scores = np.r_[0., np.cumsum(scores[by_start])]
+
+    first = np.searchsorted(sorted_starts, query_starts, side='left')
+    last = np.searchsorted(sorted_ends, query_ends, side='right')
+    found = last > first
+    sums = cum_scores[last[found]] - cum_scores[first[found]]
+    spans = sorted_ends[last[found] - 1] - sorted_starts[first[found]] + 1
+    coverage[found] = sums / spans
+    return coverage
+
+
+def _nested_coverage(
+        sorted_starts: np.ndarray,
+        sorted_ends: np.ndarray,
+        starts: np.ndarray,
+        ends: np.ndarray,
+        scores: np.ndarray,
+        query_starts: np.ndarray,
+        query_ends: np.ndarray
+) -> np.ndarray:
+    counts, sums = contained_sums(starts, ends, scores, query_starts, query_ends)
+
+    #   intervals starting in each query (qs <= start <= qe), the contained ones also end before qe
+    first = np.searchsorted(sorted_starts, query_starts, side='left')
+    last = np.searchsorted(sorted_starts, query_ends, side='right')
+    n_candidates = np.maximum(last - first, 0)
+    queries = np.repeat(np.arange(len(query_starts)), n_candidates)
+    offsets = np.arange(n_candidates.sum()) - np.repeat(np.cumsum(n_candidates) - n_candidates, n_candidates)
+    candidates = np.repeat(first, n_candidates) + offsets
+    contained = sorted_ends[candidates] <= query_ends[queries]
+
+    min_starts = np.full(len(query_starts), np.inf)
+    max_ends = np.full(len(query_starts), -np.inf)
+    np.minimum.at(min_starts, queries[contained], sorted_starts[candidates[contained]])
+    np.maximum.at(max_ends, queries[contained], sorted_ends[candidates[contained]])
+
+    coverage = np.zeros(len(query_starts))
+    found = counts > 0
+    coverage[found] = sums[found] / (max_ends[found] - min_starts[found] + 1)
+    return coverage
+
+
+def coverage_by_chromosome(
+        df_queries: pd.DataFrame,
+        df_intervals: pd.DataFrame,
+        score_col: str = 'score'
+) -> np.ndarray:
+    """
+    contained_coverage of the intervals of df_intervals (chr, start, end, score_col) in the query
+    intervals of df_queries (chr, start, end), chromosome by chromosome, in the order of df_queries.
+    """
+    coverage = np.zeros(len(df_queries))
+    query_chr = df_queries['chr'].to_numpy()
+    intervals_by_chr = {c: df for c, df in df_intervals.groupby('chr', sort=False)}
+    for chrom in pd.unique(query_chr):
+        if chrom not in intervals_by_chr:
+            continue
+        mask = query_chr == chrom
+        df_chr = intervals_by_chr[chrom]
+        coverage[mask] = contained_coverage(
+            df_chr['start'].to_numpy(), df_chr['end'].to_numpy(), df_chr[score_col].to_numpy(),
+            df_queries.loc[mask, 'start'].to_numpy(), df_queries.loc[mask, 'end'].to_numpy())
+    return coverage
@@ -0,0 +1,150 @@
+import time
+import queue
+import itertools
+import threading
+import traceback
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Dict, List, Optional, Tuple
+
+#   progress messages of the worker processes (see JobQueue)
+_progress = None
+
+
+def _init_worker(progress):
+    global _progress
+    _progress = progress
+
+
+def _run_steps(job_id: int, steps: List[Tuple[Callable, list, dict]]):
+    """
+    Runs the steps of a job one after the other (in a worker process), reporting the progress to the parent.
+    The values returned by the steps are dropped (they are written in files), not sent back.
+    """
+    _progress.put((job_id, "started", time.time()))
+    for i, (func, args, kwargs) in enumerate(steps):
+        func(*args, **kwargs)
+        _progress.put((job_id, "steps_done", i + 1))
+
+
+class JobQueue:
+    def __init__(self, max_workers: int = 2):
+        """
+        Runs jobs (lists of function calls) in a pool of background processes, and keeps a table of them :
+        status ('queued', 'running', 'done' or 'failed'), steps done, times and error, by job id.
+        Jobs of different samples run at the same time, up to max_workers jobs.
+        The functions and their arguments must be picklable (module level functions, paths, numbers, etc.).
+
+            jobs = JobQueue()
+            job_id = jobs.submit("Filter", [(filter_contacts, [oligos, fragments, contacts, output_dir], {})],
+                                 sample="AD241")
+            jobs.status(job_id) -> {"status": "running", "steps_done": 0, "steps": 1, ...}
+        """
+        self.max_workers = max_workers
+        self.table: Dict[int, dict] = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._executor = None
+        self._progress = None
+
+    def _start(self):
+        #   the pool is created at the first job, and again if one of its processes died
+        self._progress = mp.Queue()
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.max_workers, initializer=_init_worker, initargs=(self._progress, ))
+
+    def submit(
+            self,
+            name: str,
+            steps: List[Tuple[Callable, list, dict]],
+            sample: Optional[str] = None,
+            message: Optional[str] = None
+    ) -> int:
+        """
+        Queues a job of the given steps (function, args, kwargs), returns its id.
+        'message' is the text to show once the job is done.
+        """
+        with self._lock:
+            if self._executor is None:
+                self._start()
+            job_id = next(self._ids)
+            self.table[job_id] = {
+                "id": job_id, "name": name, "sample": sample, "status": "queued", "steps_done": 0,
+                "steps": len(steps), "submitted": time.time(), "started": None, "finished": None,
+                "error": None, "message": message
+            }
+            try:
+                future = self._executor.submit(_run_steps, job_id, steps)
+            except BrokenProcessPool:
+                self._start()
+                future = self._executor.submit(_run_steps, job_id, steps)
+        future.add_done_callback(lambda f: self._finish(job_id, f))
+        return job_id
+
+    def _finish(self, job_id: int, future):
+        self._update()
+        with self._lock:
+            job = self.table[job_id]
+            job["finished"] = time.time()
+            error = future.exception()
+            if error is None:
+                #   the last progress messages may come after the result
+                job["status"] = "done"
+                job["steps_done"] = job["steps"]
+            else:
+                job["status"] = "failed"
+                job["error"] = "".join(traceback.format_exception_only(type(error), error)).strip()
+                if isinstance(error, BrokenProcessPool):
+                    self._executor = None
+
+    def _update(self):
+        """
+        Reads the progress messages sent by the workers since the last call.
+        """
+        with self._lock:
+            while self._progress is not None:
+                try:
+                    job_id, event, value = self._progress.get_nowait()
+                except queue.Empty:
+                    break
+                job = self.table[job_id]
+                if event == "started":
+                    job["started"] = value
+                    if job["status"] == "queued":
+                        job["status"] = "running"
+                elif job["status"] != "done":
+                    job["steps_done"] = value
+
+    def status(self, job_id: int) -> Optional[dict]:
+        self._update()
+        with self._lock:
+            job = self.table.get(job_id)
+            return dict(job) if job is not None else None
+
+    def jobs(self, sample: Optional[str] = None) -> List[dict]:
+        self._update()
+        with self._lock:
+            return [dict(j) for j in self.table.values() if sample is None or j["sample"] == sample]
+
+    def describe(self, job_id: int) -> str:
+        """
+        One line description of the job status, e.g. 'AD241 - Binning : running (2/5 steps, 12 s)'.
+        """
+        job = self.status(job_id)
+        if job is None:
+            return f"Unknown job {job_id}"
+        name = f"{job['sample']} - {job['name']}" if job["sample"] else job["name"]
+        if job["status"] == "queued":
+            return f"{name} : queued (job {job_id})"
+        if job["status"] == "running":
+            return f"{name} : running ({job['steps_done']}/{job['steps']} steps, " \
+                   f"{time.time() - job['started']:.0f} s)"
+        duration = job["finished"] - (job["started"] or job["submitted"])
+        if job["status"] == "failed":
+            return f"{name} : failed after {duration:.0f} s ({job['error']})"
+        return f"{name} : {job['message'] or 'done'} ({duration:.0f} s)"
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
@@ -1,5 +1,10 @@
+import os
+import shutil
 import argparse
+import multiprocessing as mp
+import numpy as np
 import pandas as pd
+from utils import atomic_write
 
 pd.options.mode.chained_assignment = None
 
@@ -16,24 +21,26 @@ def startend(num_oligo, dataframe):
     return start, end
 
 
-def oligo_positions(line, dataframe):
+def oligo_index(dataframe):
+    """
+    Takes the csv file in the form of dataframe.
+    Returns a dictionary with the chromosome names (column 'chr') as keys and the lists of
+    the line numbers of the csv file that contain an oligo located on this chromosome as values.
+    """
+    if dataframe['chr'].astype(str).str.contains(' ').any():
+        print("Error: There is a space ' ' in the chomosomes names in the csv oligios file."
+              " The chromosome name has to be without space ' '.")
+    return {name: positions.tolist() for name, positions in dataframe.groupby('chr', sort=False).indices.items()}
+
+
+def oligo_positions(line, index):
     """
     Takes a line that is a chromosome-name line of a fasta file (begins with '>')
-    and the csv file in the form of dataframe.
+    and the dictionary of the oligos line numbers per chromosome (see oligo_index).
     Returns a list that contains all the line numbers of the csv file that contains
     the chromosome name in the column 'chrom'.
     """
-    L = []
-    for k in range(len(dataframe)):
-        name = dataframe['chr'][k]
-        n = len(name)  # chromosome name length
-        if ' ' in name:
-            print("Error: There is a space ' ' in the chomosomes names in the csv oligios file."
-                  " The chromosome name has to be without space ' '.")
-            break
-        if name in line and line[n + 1] in (' ', '\n'):
-            L.append(k)
-    return L
+    return index.get(line[1:].rstrip('\n').split(' ')[0], [])
 
 
 def problem_in_csv(dataframe):
@@ -47,46 +54,26 @@ def problem_in_csv(dataframe):
         return True
 
 
-def not_in_oligo(position_art, reads_size, line, startart, endart, oligos_positionsart):
+def add_chr_artificial(artificial, new_genome, line_width):
     """
-    Returns True if the position in the genome (position_art) is inside an interval that contains an oligo.
+    Takes the artificial chromosome's sequence, the opened output_genome (after replacement of oligos sequences)
+    and the length of the sequence lines of the genome.
+    Writes the artificial chromosome at the end of the output genome, with the same line length.
     """
-    if oligos_positionsart == [] \
-            or position_art < startart - 2 * len(line) - reads_size \
-            or position_art > endart + 2 * len(line) + reads_size:
-        return True
+    new_genome.write(">chr_artificial  " + '(' + str(len(artificial)) + ' bp)' + "\n")
+    new_genome.write(''.join(artificial[n:n + line_width] + '\n' for n in range(0, len(artificial), line_width)))
 
 
-def add_chr_artificial(artificial, output_genome):
-    """
-    Takes the artificial chromosome's sequence and the output_genome (after replacement of oligos sequences)
-    and returns one sequence composed of the output-genome followed by
-    the artificial chromosome
-    """
-    with open(output_genome, 'r') as new_genome:
-        new_genome.readline()
-        line = new_genome.readline()
-        long = len(line) - 1
-
-    n = 0
-    with open(output_genome, 'a') as new_genome:
-        new_genome.write(">chr_artificial  " + '(' + str(len(artificial)) + ' bp)' + "\n")
-        while n < len(artificial):
-            if n + long > len(artificial):
-                new_genome.write(artificial[n:])
-                new_genome.write('\n')
-                n += long
-            else:
-                new_genome.write(artificial[n:n + long] + '\n')
-                n += long
+COMPLEMENT = str.maketrans('ACGTacgtnN', 'TGCAtgcanN')
 
 
 def reverse_complement(dna):
     """
-    Takes a DNA sequence and returns its complementary sequence
+    Takes a DNA sequence (or a pandas Series of DNA sequences) and returns its complementary sequence
     """
-    complement = {'A': 'T', 'C': 'G', 'G': 'C', 'T': 'A', 'a': 't', 'c': 'g', 'g': 'c', 't': 'a', 'n': 'n', 'N': 'N'}
-    return ''.join([complement[base] for base in dna[::-1]])
+    if isinstance(dna, pd.Series):
+        return dna.str[::-1].str.translate(COMPLEMENT)
+    return dna[::-1].translate(COMPLEMENT)
 
 
 def oligo_correction(input_oligos):
@@ -101,234 +88,456 @@ def oligo_correction(input_oligos):
     oligos = pd.read_csv(input_oligos, sep=",")
     oligos.columns = [oligos.columns[i].lower() for i in range(len(oligos.columns))]
 
-    # delete lines that are not 'ss' or 'ss_neg' type
-    for j in range(len(oligos)):
-        if oligos['type'][j] != 'ss' and oligos['type'][j] != 'ss_neg':
-            oligos.drop([j], inplace=True)
-
-    oligos.reset_index(drop=True, inplace=True)
+    # keep only the lines of 'ss' or 'ss_neg' type
+    oligos = oligos[oligos['type'].isin(['ss', 'ss_neg'])]
     oligos = oligos.sort_values(by=['chr', 'start'])
     oligos.reset_index(drop=True, inplace=True)
 
-    for k in range(len(oligos)):
-
-        if oligos['orientation'][k] == 'C':
-            oligos['orientation'][k] = 'W'
+    reverse = oligos['orientation'] == 'C'
+    forward = oligos['orientation'] == 'W'
+    modified = oligos['sequence_modified'].mask(reverse | forward, oligos['sequence_modified'].str.upper())
 
-            original = oligos['sequence_original'][k]
-            oligos['sequence_original'][k] = reverse_complement(original)
-
-            modified = oligos['sequence_modified'][k]
-            modified = modified.upper()
-            oligos['sequence_modified'][k] = reverse_complement(modified)
-
-        elif oligos['orientation'][k] == 'W':
-            modified = oligos['sequence_modified'][k]
-            modified = modified.upper()
-            oligos['sequence_modified'][k] = str(modified)
+    oligos['orientation'] = oligos['orientation'].mask(reverse, 'W')
+    oligos['sequence_original'] = oligos['sequence_original'].mask(
+        reverse, reverse_complement(oligos['sequence_original']))
+    oligos['sequence_modified'] = modified.mask(reverse, reverse_complement(modified))
 
     return oligos
 
 
-def chr_name_bed(oligos, num_oligo):
+def bed_lines(chrom, start, end, name, present):
     """
-    Returns the name of the chromosome of the oligo number 'num_oligo'
+    Takes arrays (one row per oligo, one column per bed line that the oligo may produce) of chromosome names,
+    start and end coordinates, names, and a mask of the lines that are actually present.
+    Returns the bed lines (oligo by oligo, then column by column) in one string.
     """
-    return oligos['chr'][num_oligo]
+    present = present.ravel()
+    lines = pd.Series(chrom.ravel()[present]) + '\t' + \
+        pd.Series(start.ravel()[present]).astype(str) + '\t' + \
+        pd.Series(end.ravel()[present]).astype(str) + '\t' + \
+        pd.Series(name.ravel()[present]) + '\n'
+    return ''.join(lines)
 
 
 def bed_assembly(oligos, reads_sizes, bedpath):
     """
-    Assemblies the bed file with the sequences needed (see the README file)
+    Assemblies the bed file with the sequences needed (see the README file).
+    The coordinates in the genome and in the chr_artificial of the oligos and of their flanking regions
+    (clipped at the chromosome beginning or between two close oligos) are computed for all the oligos
+    at once with array operations, then the bed file is written in one go.
     """
-    bed = ''
+    reads_sizes = int(reads_sizes)
+    n_oligos = len(oligos)
+    chrom = oligos['chr'].astype(str).to_numpy(dtype=object)
+    name = oligos['name'].astype(str).to_numpy(dtype=object)
+    start = oligos['start'].to_numpy(dtype=np.int64)
+    end = oligos['end'].to_numpy(dtype=np.int64)
+    n = oligos['sequence_original'].str.len().to_numpy(dtype=np.int64)
+    artificial = np.full((n_oligos, 1), 'chr_artificial', dtype=object)
+
+    if n_oligos == 0:
+        open(bedpath, 'w').close()
+        return
+
     if reads_sizes == 0:
-        n_cum = 1
-        for k in range(len(oligos)):
-            start, end = startend(k, oligos)
-            start += 1
-            oligo_name = '\t' + oligos['name'][k]
-            n = len(oligos['sequence_original'][k])
-            bed += chr_name_bed(oligos, k) + '\t' + str(start) + '\t' + str(end) + oligo_name + '\n'
-            n_cum += n
-
-            n_cum = 1
-        for k in range(len(oligos)):
-            n = len(oligos['sequence_original'][k])
-            oligo_name = '\t' + oligos['name'][k]
-            bed += 'chr_artificial' + '\t' + str(n_cum) + '\t' + str(n_cum + n - 1) + oligo_name + '\n'
-            n_cum += n
-    else:
-        n_cum = 1
-        # genome
-        for k in range(len(oligos)):
-            oligo_name = '\t' + oligos['name'][k]
-            start, end = startend(k, oligos)
-            start += 1
-            n = len(oligos['sequence_original'][k])
-
-            # flank 5'
-            if start - reads_sizes <= 0:
-                bed += chr_name_bed(oligos, k) + '\t1\t' + str(start) + oligo_name + "_flank_5'" + '\n'
-
-            elif k > 0 and start - reads_sizes < oligos['end'][k - 1]:
-                pass
-            else:
-                bed += chr_name_bed(oligos, k) + '\t' + str(start - reads_sizes) + '\t' + \
-                       str(start - 1) + oligo_name + "_flank_5'" + '\n'
-                n_cum += reads_sizes
+        n_cum = 1 + np.cumsum(n) - n
+        bed = bed_lines(chrom[:, None], start[:, None], end[:, None], name[:, None],
+                        np.ones((n_oligos, 1), dtype=bool))
+        bed += bed_lines(artificial, n_cum[:, None], (n_cum + n - 1)[:, None], name[:, None],
+                         np.ones((n_oligos, 1), dtype=bool))
+        with open(bedpath, 'w') as bedfile:
+            bedfile.write(bed)
+        return
+
+    first = np.arange(n_oligos) == 0
+    previous_end = np.concatenate(([0], end[:-1]))
+    next_start = np.concatenate((start[1:], [0]))
+    next_name = np.concatenate((name[1:], [''])).astype(object)
+    same_chr_next = np.concatenate((chrom[1:] == chrom[:-1], [False]))
+
+    flank_5 = name + "_flank_5'"
+    flank_3 = name + "_flank_3'"
+    next_flank_5 = next_name + "_flank_5'"
+
+    # flank 5' clipped at the chromosome beginning, or skipped if it overlaps the previous oligo
+    at_origin = start - reads_sizes <= 0
+    overlap_previous = ~at_origin & ~first & (start - reads_sizes < previous_end)
+    # flank 3' shared with the next oligo if they are close on the same chromosome
+    overlap_next = same_chr_next & (end + reads_sizes >= next_start)
+
+    # genome
+    genome_start = np.stack([
+        np.where(at_origin, 1, start - reads_sizes),
+        start,
+        end + 1,
+        end + 1], axis=1)
+    genome_end = np.stack([
+        np.where(at_origin, start, start - 1),
+        end,
+        np.where(overlap_next, next_start - 1, end + reads_sizes),
+        next_start - 1], axis=1)
+    always = np.ones(n_oligos, dtype=bool)
+    genome_present = np.stack([~overlap_previous, always, always, overlap_next], axis=1)
+
+    # artificial
+    at_first_base = start == 1
+    artificial_at_origin = ~at_first_base & at_origin
+    artificial_overlap_previous = ~at_first_base & overlap_previous
+    size_5 = np.select(
+        [at_first_base, artificial_at_origin, artificial_overlap_previous], [0, start, 0], reads_sizes)
+    size_3 = np.where(overlap_next, next_start - end - 1, reads_sizes)
+    n_cum = 1 + np.cumsum(size_5 + n + size_3) - (size_5 + n + size_3)
+    oligo_start = n_cum + size_5
+
+    artificial_start = np.stack([
+        np.where(artificial_at_origin, 1, n_cum),
+        oligo_start,
+        oligo_start + n,
+        oligo_start + n], axis=1)
+    artificial_end = np.stack([
+        np.where(artificial_at_origin, start - 1, n_cum + reads_sizes - 1),
+        oligo_start + n - 1,
+        oligo_start + n + size_3 - 1,
+        oligo_start + n + size_3 - 1], axis=1)
+    artificial_present = np.stack([
+        ~at_first_base & ~artificial_overlap_previous, always, always, overlap_next], axis=1)
+
+    names = np.stack([flank_5, name, flank_3, next_flank_5], axis=1)
+    bed = bed_lines(np.repeat(chrom[:, None], 4, axis=1), genome_start, genome_end, names, genome_present)
+    bed += bed_lines(np.repeat(artificial, 4, axis=1), artificial_start, artificial_end, names, artificial_present)
+
+    with open(bedpath, 'w') as bedfile:
+        bedfile.write(bed)
+
 
-            # oligo
-            bed += chr_name_bed(oligos, k) + '\t' + str(start) + '\t' + \
-                str(end) + oligo_name + '\n'
+def artificial_intervals(oligos_positions, oligos, flank, length):
+    """
+    Takes the line numbers of the csv file that contain an oligo located on one chromosome (see oligo_positions),
+    the flanking size and the length of the chromosome.
+    Returns the list of the intervals (0-based start, end excluded) of the original chromosome's sequence
+    to add in the artificial chromosome, i.e. the oligos with their flanking regions.
+    Consecutive flanks that overlap are only taken once.
+    """
+    intervals = []
+    position_art = 0
+    for num_oligo in oligos_positions:
+        start, end = startend(num_oligo, oligos)
+        if end + flank <= position_art:
+            break
+        intervals.append((max(start - flank, position_art), min(end + flank, length)))
+        if end + flank > length:
+            break
+        position_art = end + flank
+    return intervals
 
-            n_cum += n
 
-            # flank 3'
-            if k + 1 != len(oligos) and end + reads_sizes >= oligos['start'][k + 1] \
-                    and chr_name_bed(oligos, k) == chr_name_bed(oligos, k + 1):
-                bed += chr_name_bed(oligos, k) + '\t' + str(end + 1) + '\t' + \
-                    str(oligos['start'][k + 1] - 1) + oligo_name + "_flank_3'" + '\n'
-                bed += chr_name_bed(oligos, k) + '\t' + str(end + 1) + '\t' + \
-                    str(oligos['start'][k + 1] - 1) + '\t' + oligos['name'][k + 1] + "_flank_5'" + '\n'
+def replacement_intervals(oligos_positions, oligos, length):
+    """
+    Takes the line numbers of the csv file that contain an oligo located on one chromosome (see oligo_positions)
+    and the length of the chromosome.
+    Returns the list of the intervals (0-based start, end excluded) of the chromosome to replace with
+    the modified sequence of the oligo, as tuples (start, end, sequence_modified).
+    """
+    intervals = []
+    position = 0
+    for num_oligo in oligos_positions:
+        start, end = startend(num_oligo, oligos)
+        if end <= position or start >= length:
+            break
+        start = max(start, position)
+        stop = min(end, length)
+        modified = oligos['sequence_modified'][num_oligo]
+        if len(modified) < stop - start:
+            raise ValueError("Error: the modified sequence of the oligo " + str(oligos['name'][num_oligo]) +
+                             " is shorter than its start-end interval.")
+        intervals.append((start, stop, modified[:stop - start]))
+        if end > length:
+            break
+        position = end
+    return intervals
 
-                n_cum += reads_sizes
-            else:
-                bed += chr_name_bed(oligos, k) + '\t' + str(end + 1) + '\t' + \
-                    str(end + reads_sizes) + oligo_name + "_flank_3'" + '\n'
-                n_cum += reads_sizes
-
-        # artificial
-
-        n_cum = 1
-        for k in range(len(oligos)):
-            oligo_name = '\t' + oligos['name'][k]
-            start, end = startend(k, oligos)
-            start += 1
-            n = len(oligos['sequence_original'][k])
-
-            # flank 5'
-            if start == 1:
-                pass
-            elif start - reads_sizes <= 0:
-                bed += 'chr_artificial' + '\t1\t' + str(start - 1) + oligo_name + "_flank_5'" + '\n'
-                n_cum += start
-            elif k > 0 and start - reads_sizes < oligos['end'][k - 1]:
-                pass
-            else:
-                bed += 'chr_artificial' + '\t' + str(n_cum) + '\t' + \
-                       str(n_cum + reads_sizes - 1) + oligo_name + "_flank_5'" + '\n'
-                n_cum += reads_sizes
-
-            bed += 'chr_artificial' + '\t' + str(n_cum) + '\t' + \
-                   str(n_cum + n - 1) + oligo_name + '\n'
-            n_cum += n
-
-            if k + 1 != len(oligos) and end + reads_sizes >= oligos['start'][k + 1] \
-                    and chr_name_bed(oligos, k) == chr_name_bed(oligos, k + 1):
-                new_reads_sizes = reads_sizes
-                while k + 1 != len(oligos) and end + new_reads_sizes >= oligos['start'][k + 1]:
-                    new_reads_sizes -= 1
-                bed += 'chr_artificial' + '\t' + str(n_cum) + '\t' + \
-                       str(n_cum + new_reads_sizes - 1) + oligo_name + "_flank_3'" + '\n'
-                bed += 'chr_artificial' + '\t' + str(n_cum) + '\t' + \
-                       str(n_cum + new_reads_sizes - 1) + '\t' + oligos['name'][k + 1] + "_flank_5'" + '\n'
-                n_cum += new_reads_sizes
 
+def chromosome_replacement(lines, oligos_positions, oligos, flank):
+    """
+    Takes the sequence lines of one chromosome of the reference genome, the line numbers of the csv file
+    that contain an oligo located on this chromosome (see oligo_positions) and the flanking size.
+    The chromosome is loaded in a mutable buffer where:
+    - the original sequences of the oligos and their flanking regions are extracted (for the artificial chromosome),
+    - the oligos sequences are replaced by the modified ones with slice assignments.
+    Returns the chromosome lines (with the same lengths as the input ones) and the artificial sequence.
+    """
+    widths = [len(line) - 1 if line[-1] == '\n' else len(line) for line in lines]
+    sequence = bytearray(''.join(line[:w] for line, w in zip(lines, widths)), 'ascii')
+
+    artificial = [sequence[start:end].decode()
+                  for start, end in artificial_intervals(oligos_positions, oligos, flank, len(sequence))]
+
+    for start, end, modified in replacement_intervals(oligos_positions, oligos, len(sequence)):
+        sequence[start:end] = modified.encode()
+
+    sequence = sequence.decode()
+    new_lines = []
+    n = 0
+    for w in widths:
+        new_lines.append(sequence[n:n + w] + '\n')
+        n += w
+    return ''.join(new_lines), ''.join(artificial)
+
+
+def fasta_index(input_genome):
+    """
+    Takes a fasta file and returns its faidx-style index (the .fai file next to the fasta, built if missing
+    or older than the fasta) as a dataframe, with for each chromosome (in the order of the fasta file):
+    its name, its length, the offset of its first base, the number of bases and of bytes per line.
+    If the directory of the fasta is not writable, the index is built again at each call and only kept in memory.
+    Raises a ValueError if the fasta can not be indexed (lines of different lengths inside a chromosome,
+    line endings other than '\\n').
+    """
+    index_path = input_genome + '.fai'
+    columns = ['chr', 'length', 'offset', 'line_bases', 'line_width']
+    if os.path.exists(index_path) and os.path.getmtime(index_path) >= os.path.getmtime(input_genome):
+        index = pd.read_csv(index_path, sep='\t', header=None, usecols=[0, 1, 2, 3, 4], dtype={0: str})
+        index.columns = columns
+        return index
+
+    records = build_fasta_index(input_genome)
+    try:
+        write_fasta_index(records, index_path)
+    except OSError:
+        print(f"Unable to write the index {index_path}, it is kept in memory.")
+    return pd.DataFrame(records, columns=columns)
+
+
+def build_fasta_index(input_genome):
+    """
+    Reads the fasta file 'input_genome' once and returns its faidx-style index as a list of records
+    [NAME, LENGTH, OFFSET, LINEBASES, LINEWIDTH], one per chromosome.
+    """
+    records = []
+    offset = 0
+    record = None
+    short_line = False
+    with open(input_genome, 'rb') as genome:
+        for line in genome:
+            if line[:1] == b'>':
+                if record is not None:
+                    records.append(record)
+                name = line[1:].split()[0].decode() if line[1:].split() else ''
+                record = [name, 0, offset + len(line), 0, 0]
+                short_line = False
+            elif record is None:
+                raise ValueError("Error: the fasta file does not begin with a chromosome-name line.")
             else:
-                bed += 'chr_artificial' + '\t' + str(n_cum) + '\t' + \
-                       str(n_cum + reads_sizes - 1) + oligo_name + "_flank_3'" + '\n'
-                n_cum += reads_sizes
+                if line.endswith(b'\r\n'):
+                    raise ValueError("Error: the fasta file has '\\r\\n' line endings.")
+                bases = len(line) - 1 if line[-1:] == b'\n' else len(line)
+                if short_line and bases > 0 or record[1] > 0 and bases > record[3]:
+                    raise ValueError("Error: the sequence lines of " + record[0] + " have different lengths.")
+                if record[1] == 0 and bases > 0:
+                    record[3], record[4] = bases, len(line)
+                short_line = short_line or bases < record[3] or bases == 0
+                record[1] += bases
+            offset += len(line)
+    if record is not None:
+        records.append(record)
+
+    return records
+
+
+def write_fasta_index(records, index_path):
+    """
+    Writes the faidx-style index 'records' (see build_fasta_index) in 'index_path' (tab separated).
+    """
+    with atomic_write(index_path) as tmp_path, open(tmp_path, 'w') as index:
+        for record in records:
+            index.write('\t'.join(str(x) for x in record) + '\n')
 
-    with open(bedpath, 'w') as bedfile:
-        bedfile.write(bed)
+
+def base_offset(record, position):
+    """
+    Returns the offset in the fasta file of the base at the 'position' (0-based) of the chromosome
+    described by its index line 'record' (see fasta_index).
+    """
+    return record.offset + (position // record.line_bases) * record.line_width + position % record.line_bases
 
 
-def replacement(input_genome, input_oligos, output_genome, bed_path, flanking_size):
+def fetch_sequence(genome, record, start, end):
     """
-    Takes the reference genome 'input genome' and reads it line by line if the oligos regions are far
-    or character by character if an oligo region is near. It copies the lines and characters
-    in a fasta file 'output_genome' excepted when the position is inside an oligo region :
-    - It writes the oligo's nucleotide in the output_genome (instead of the input_genome).
-    - It adds the reference genome's nucleotide in a string named 'artificial' (it also doest this step if we are in a
-    flanking region)
-    Then, it adds a new chromosome in the genome modified, that is the 'artificial' sequence.
+    Returns the sequence between 'start' (0-based) and 'end' (excluded) of the chromosome described
+    by its index line 'record', read by random access in the opened (binary) fasta file 'genome'.
     """
-    oligos = oligo_correction(input_oligos)
-    if problem_in_csv(oligos):
-        print('Error: the csv file structure is not correct, please check the README file')
+    if end <= start:
+        return ''
+    genome.seek(base_offset(record, start))
+    sequence = genome.read(base_offset(record, end - 1) + 1 - base_offset(record, start))
+    return sequence.replace(b'\n', b'').decode()
 
-    position = 0
-    position_art = 0
-    start, end = startend(0, oligos)
-    startart, endart = startend(0, oligos)
-    flank = int(flanking_size)
-    artificial = ''
-    with open(output_genome, 'w') as new_genome:
-        new_genome.write('')
-    with open(input_genome, 'r') as genome:
-        for line in genome:
-            if line[0] == '>':
-                position = 0
-                position_art = 0
-                position_oligo = 0
-                oligos_positions = oligo_positions(line, oligos)
-                oligos_positionsart = oligo_positions(line, oligos)
-                k = 0
-                kart = 0
-                if oligos_positions != [] and oligos_positionsart != []:
-                    start, end = startend(oligos_positions[k], oligos)
-                    startart, endart = startend(oligos_positionsart[kart], oligos)
-                with open(output_genome, 'a') as new_genome:
-                    new_genome.write(line)
-
-            elif not_in_oligo(position_art, flank, line, startart, endart, oligos_positionsart):
-                with open(output_genome, 'a') as new_genome:
-                    new_genome.write(line)
-                position += len(line) - 1
-                position_art += len(line) - 1
 
-            else:
-                for ch in line:
-                    if position_art in range(startart - flank, endart + flank) and ch != '\n':
-                        artificial += ch
-                        position_art += 1
+def write_sequence(new_genome, record, start, sequence):
+    """
+    Writes 'sequence' at the position 'start' (0-based) of the chromosome described by its index line 'record'
+    in the opened (binary) output fasta file 'new_genome', that has the same layout as the indexed fasta.
+    """
+    n = 0
+    while n < len(sequence):
+        position = start + n
+        size = min(len(sequence) - n, record.line_bases - position % record.line_bases)
+        new_genome.seek(base_offset(record, position))
+        new_genome.write(sequence[n:n + size].encode())
+        n += size
 
-                        if position_art == endart + flank \
-                                and kart < len(oligos_positionsart) - 1:
-                            kart += 1
-                            startart, endart = startend(oligos_positionsart[kart], oligos)
 
-                    elif ch != '\n':
-                        position_art += 1
+def record_replacement(input_genome, output_genome, record, oligos, flank):
+    """
+    Takes the index line 'record' (see fasta_index) of one chromosome of the reference genome and the oligos
+    located on it. Fetches the original sequences of the oligos and of their flanking regions by random access
+    in the input_genome and writes the modified sequences of the oligos in place in the output_genome
+    (a copy of the input_genome, only the bytes of this chromosome are modified).
+    Returns the artificial sequence of the chromosome.
+    """
+    oligos_positions = oligos.index.tolist()
+    artificial = []
+    with open(input_genome, 'rb') as genome, open(output_genome, 'r+b') as new_genome:
+        for start, end in artificial_intervals(oligos_positions, oligos, flank, record.length):
+            artificial.append(fetch_sequence(genome, record, start, end))
+        for start, end, modified in replacement_intervals(oligos_positions, oligos, record.length):
+            write_sequence(new_genome, record, start, modified)
+    return ''.join(artificial)
 
-                    if position in range(start, end) and ch != '\n':
 
-                        with open(output_genome, 'a') as new_genome:
-                            new_genome.write(oligos['sequence_modified'][oligos_positions[k]][position_oligo])
+def indexed_replacement(input_genome, oligos, output_genome, flank, processes=1):
+    """
+    Same as the streaming replacement but using the faidx-style index of the input genome (see fasta_index) :
+    - the whole genome is copied in the output_genome with a bulk byte copy,
+    - the original sequences of the oligos and of their flanking regions are fetched by random access,
+    - the modified sequences of the oligos are written in place in the output_genome.
+    The chromosomes are independent, they are processed in a pool of 'processes' processes
+    (see record_replacement) if more than one.
+    Then, it adds the artificial chromosome at the end of the output_genome, in the order of the input_genome.
+    """
+    index = fasta_index(input_genome)
+    if len(index) == 0 or index.loc[0, 'length'] == 0:
+        raise ValueError("Error: the first chromosome of the fasta file is empty.")
+    line_width = int(index.loc[0, 'line_bases'])
+
+    shutil.copyfile(input_genome, output_genome)
+    positions = oligo_index(oligos)
+    args_list = []
+    for _, record in index.iterrows():
+        if record.chr in positions:
+            args_list.append((input_genome, output_genome, record, oligos.loc[positions[record.chr]], flank))
+
+    if processes > 1 and len(args_list) > 1:
+        with mp.Pool(processes=min(processes, len(args_list))) as pool:
+            artificial = pool.starmap(record_replacement, args_list)
+    else:
+        artificial = [record_replacement(*args) for args in args_list]
 
-                        position_oligo += 1
-                        position += 1
-                        if position == end and k < len(oligos_positions) - 1:
-                            position_oligo = 0
-                            k += 1
-                            start, end = startend(oligos_positions[k], oligos)
+    with open(output_genome, 'r+b') as new_genome:
+        new_genome.seek(0, os.SEEK_END)
+        if new_genome.tell() > 0:
+            new_genome.seek(-1, os.SEEK_END)
+            if new_genome.read(1) != b'\n':
+                new_genome.write(b'\n')
 
-                    else:
-                        with open(output_genome, 'a') as new_genome:
-                            new_genome.write(ch)
-                            if ch in ['A', 'T', 'G', 'C', 'N', 'a', 't', 'g', 'c', 'n']:
-                                position += 1
+    with open(output_genome, 'a') as new_genome:
+        add_chr_artificial(''.join(artificial), new_genome, line_width)
+
+
+def fasta_chromosomes(genome):
+    """
+    Takes an opened fasta file and yields its chromosomes one by one,
+    as tuples (chromosome-name line, list of the sequence lines).
+    """
+    header = None
+    lines = []
+    for line in genome:
+        if line[0] == '>':
+            if header is not None:
+                yield header, lines
+            header = line if line[-1] == '\n' else line + '\n'
+            lines = []
+        else:
+            lines.append(line)
+    if header is not None:
+        yield header, lines
+
+
+def header_replacement(header, lines, oligos, flank):
+    """
+    Same as chromosome_replacement, but takes the chromosome-name line of the chromosome and only the oligos
+    located on this chromosome, and returns the chromosome lines with their header.
+    """
+    new_lines, artificial = chromosome_replacement(lines, oligos.index.tolist(), oligos, flank)
+    return header + new_lines, artificial
+
+
+def streaming_replacement(input_genome, oligos, output_genome, flank, processes=1):
+    """
+    Takes the reference genome 'input genome' and reads it chromosome by chromosome. Each chromosome is
+    copied in a fasta file 'output_genome' excepted inside the oligos regions (see chromosome_replacement) :
+    - It writes the oligo's nucleotides in the output_genome (instead of the input_genome).
+    - It adds the reference genome's nucleotides in the 'artificial' sequence (it also does this step
+    for the flanking regions)
+    The chromosomes are processed in a pool of 'processes' processes if more than one,
+    and written back in the order of the input_genome.
+    Then, it adds a new chromosome in the genome modified, that is the 'artificial' sequence.
+    """
+    with open(input_genome, 'r') as genome:
+        genome.readline()
+        line = genome.readline()
+        line_width = (len(line) - 1 if line[-1] == '\n' else len(line)) if line else None
+
+    positions = oligo_index(oligos)
+    artificial = []
+    with open(input_genome, 'r') as genome, open(output_genome, 'w') as new_genome:
+        args_list = ((header, lines, oligos.loc[oligo_positions(header, positions)], flank)
+                     for header, lines in fasta_chromosomes(genome))
+        if processes > 1:
+            with mp.Pool(processes=processes) as pool:
+                results = pool.starmap(header_replacement, args_list)
+        else:
+            results = (header_replacement(*args) for args in args_list)
+
+        for new_lines, artificial_chr in results:
+            new_genome.write(new_lines)
+            artificial.append(artificial_chr)
+
+        add_chr_artificial(''.join(artificial), new_genome, line_width)
+
+
+def replacement(input_genome, input_oligos, output_genome, bed_path, flanking_size, use_index=True, processes=1):
+    """
+    Takes the reference genome 'input genome', the oligos csv file and writes the genome modified
+    'output_genome' (oligos sequences replaced by the modified ones, and the artificial chromosome added)
+    as well as the bed file of the oligos and their flanking regions (see the README file).
+    By default, the genome is processed with random accesses through its faidx-style index
+    (see indexed_replacement) and falls back on the streaming engine (see streaming_replacement)
+    if the fasta can not be indexed.
+    The chromosomes are processed in parallel if 'processes' is more than one, the output is the same.
+    The genome and the bed file are written in temporary files renamed once complete (see utils.atomic_write).
+    """
+    oligos = oligo_correction(input_oligos)
+    if problem_in_csv(oligos):
+        print('Error: the csv file structure is not correct, please check the README file')
 
-    if line[-1] != '\n':
-        with open(output_genome, 'a') as new_genome:
-            new_genome.write('\n')
-    add_chr_artificial(artificial, output_genome)
+    flank = int(flanking_size)
+    with atomic_write(output_genome) as tmp_genome:
+        if use_index:
+            try:
+                indexed_replacement(input_genome, oligos, tmp_genome, flank, processes)
+            except (ValueError, OSError) as e:
+                print(e)
+                print('The genome is processed without index.')
+                use_index = False
+        if not use_index:
+            streaming_replacement(input_genome, oligos, tmp_genome, flank, processes)
 
-    bed_assembly(oligos, flanking_size, bed_path)
+    with atomic_write(bed_path) as tmp_bed:
+        bed_assembly(oligos, flanking_size, tmp_bed)
 
 
-def main():
+def main(argv=None):
 
     parser = argparse.ArgumentParser(description="Replace oligos in a genome sequence.")
     parser.add_argument("-i", "--igenome", required=True, help="Input fasta genome file")
@@ -336,10 +545,17 @@ def main():
     parser.add_argument("-c", "--cfile", required=True, help="Input CSV oligos file")
     parser.add_argument("-b", "--bfile", required=True, help="Output BED file")
     parser.add_argument("-s", "--size", type=int, default=0, help="Flanking sizes (integer)")
+    parser.add_argument("--no-index", action="store_true",
+                        help="Read the whole genome sequentially instead of using its .fai index "
+                             "(by default, the index is written next to the input genome as <genome>.fai "
+                             "if missing or outdated, or kept in memory if that directory is not writable)")
+    parser.add_argument("-p", "--processes", type=int, default=1,
+                        help="Number of processes to use, chromosomes are processed in parallel (integer)")
 
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
 
-    replacement(args.igenome, args.cfile, args.ogenome, args.bfile, args.size)
+    replacement(args.igenome, args.cfile, args.ogenome, args.bfile, args.size, use_index=not args.no_index,
+                processes=args.processes)
 
 
 if __name__ == "__main__":
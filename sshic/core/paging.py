@@ -0,0 +1,129 @@
+import re
+import weakref
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+import numpy as np
+import pandas as pd
+
+#   Set as None to avoid SettingWithCopyWarning
+pd.options.mode.chained_assignment = None
+
+#   operators of the filter queries of dash DataTable (filter_action='custom') and their names
+OPERATORS = {
+    'eq': 'eq', '=': 'eq', 'ne': 'ne', '!=': 'ne', 'lt': 'lt', '<': 'lt', 'le': 'le', '<=': 'le',
+    'gt': 'gt', '>': 'gt', 'ge': 'ge', '>=': 'ge', 'contains': 'contains', 'datestartswith': 'datestartswith'
+}
+FILTER_PART = re.compile(r'^\s*\{(?P<name>[^}]*)\}\s*(?P<operator>[^\s\'"`]+)\s*(?P<value>.*?)\s*$')
+
+
+def split_filter_part(filter_part: str) -> Tuple[Optional[str], Optional[str], Optional[str | float]]:
+    """
+    Splits one part of a DataTable filter query, e.g. '{chr} eq "chr3"' or '{sizes} >= 500',
+    into (column, operator, value). The value is a number when it can be read as one.
+    """
+    match = FILTER_PART.match(filter_part)
+    if match is None or match.group('operator') not in OPERATORS:
+        return None, None, None
+
+    value_part = match.group('value')
+    v0 = value_part[:1]
+    if len(value_part) > 1 and v0 == value_part[-1] and v0 in ("'", '"', '`'):
+        value = value_part[1:-1].replace('\\' + v0, v0)
+    else:
+        try:
+            value = float(value_part)
+        except ValueError:
+            value = value_part
+    return match.group('name'), OPERATORS[match.group('operator')], value
+
+
+def filter_mask(df: pd.DataFrame, filter_query: str) -> np.ndarray:
+    """
+    Rows of df that match the DataTable filter query (parts joined by ' && ').
+    Parts on unknown columns or with unknown operators are ignored.
+    """
+    mask = np.ones(len(df), dtype=bool)
+    for filter_part in filter_query.split(' && '):
+        col_name, operator, value = split_filter_part(filter_part)
+        if col_name not in df.columns:
+            continue
+        column = df[col_name]
+        if operator in ('eq', 'ne', 'lt', 'le', 'gt', 'ge'):
+            if isinstance(value, float) and not pd.api.types.is_numeric_dtype(column):
+                #   e.g. chromosome names typed as numbers, compared as text
+                value = f"{value:g}"
+                column = column.astype(str)
+            elif isinstance(value, str) and pd.api.types.is_numeric_dtype(column):
+                continue
+            mask &= getattr(column, operator)(value).to_numpy()
+        elif operator == 'contains':
+            mask &= column.astype(str).str.contains(str(value), regex=False).to_numpy()
+        elif operator == 'datestartswith':
+            mask &= column.astype(str).str.startswith(str(value)).to_numpy()
+    return mask
+
+
+class TablePager:
+    def __init__(self, max_orders: int = 8):
+        """
+        Pages of a table sorted and filtered as asked by a dash DataTable (page_action, sort_action and
+        filter_action set to 'custom'), so that only the rows of the page shown are sent to the browser.
+
+        The order of the rows of the last max_orders (table, sort, filter) asked is kept : turning the pages
+        does not sort or filter the table again.
+        """
+        self.max_orders = max_orders
+        self.orders = OrderedDict()
+        self._lock = threading.Lock()
+
+    def order(self, df: pd.DataFrame, sort_by: Optional[List[dict]] = None, filter_query: str = '') -> np.ndarray:
+        """
+        Positions of the rows of df that match filter_query, in the order of sort_by
+        ([{'column_id': ..., 'direction': 'asc' | 'desc'}, ...]).
+        """
+        sort_by = [s for s in (sort_by or []) if s['column_id'] in df.columns]
+        filter_query = filter_query or ''
+        key = (id(df), repr(sort_by), filter_query)
+        with self._lock:
+            entry = self.orders.get(key)
+            #   the id of a table dropped (e.g. from the cache) can be given to a new one
+            if entry is not None and entry[0]() is df:
+                self.orders.move_to_end(key)
+                return entry[1]
+
+        positions = np.flatnonzero(filter_mask(df, filter_query)) if filter_query else np.arange(len(df))
+        if sort_by:
+            df_sorted = df.iloc[positions][[s['column_id'] for s in sort_by]]
+            df_sorted.index = positions
+            df_sorted = df_sorted.sort_values(
+                [s['column_id'] for s in sort_by], ascending=[s['direction'] == 'asc' for s in sort_by],
+                kind='stable', na_position='last')
+            positions = df_sorted.index.to_numpy()
+
+        with self._lock:
+            self.orders[key] = (weakref.ref(df), positions)
+            while len(self.orders) > self.max_orders:
+                self.orders.popitem(last=False)
+        return positions
+
+    def page(
+            self,
+            df: pd.DataFrame,
+            page_current: int,
+            page_size: int,
+            sort_by: Optional[List[dict]] = None,
+            filter_query: str = ''
+    ) -> Tuple[pd.DataFrame, int]:
+        """
+        Rows of the page page_current (from 0) of df filtered and sorted, and the number of pages.
+        """
+        positions = self.order(df, sort_by, filter_query)
+        page_count = max(1, -(-len(positions) // page_size))
+        page_current = min(max(page_current or 0, 0), page_count - 1)
+        first = page_current * page_size
+        return df.iloc[positions[first: first + page_size]], page_count
+
+
+#   shared by all the pages of the web interface
+pager = TablePager()
@@ -1,14 +1,12 @@
-import os
-import sys
-
 import numpy as np
-import pandas as pd
-from utils import find_nearest
+from typing import Optional
+from utils import write_table, read_reference
 
 
 def associate_probes_to_fragments(
     fragments_list_path: str,
-    oligos_capture_path: str
+    oligos_capture_path: str,
+    output_path: Optional[str] = None
 ):
     """
     This function aims at formatting and creating a correspondence between each probe (oligo capture) and
@@ -16,7 +14,11 @@ def associate_probes_to_fragments(
     Complementary information are given such as chromosomes of the probe (basically the same as the fragment),
     the position on the chromosome of the fragment and the probe, and the type (ss, ds, ds_neg etc ..) of the probe
 
-    The resulting dataframe is written in a tsv file, in the same location of that of the fragments_list.txt
+    For each chromosome, the fragments start positions are sorted once and every probe middle of that chromosome
+    is resolved with a single searchsorted call (nearest fragment start strictly lower than the probe middle,
+    the first fragment of the list if several share that start).
+
+    The resulting dataframe is written in a csv file, by default in place of the oligos capture file.
 
     ARGUMENTS
     _______________________
@@ -24,39 +26,39 @@ def associate_probes_to_fragments(
         path to the digested fragments list based on a restriction enzyme or a fixed chunk size.
     oligos_capture_path : str
         path to the file containing the oligo-nucleotides capture information
+    output_path : str, optional
+        path to write the oligos table with its fragments columns. If None, the oligos capture file is rewritten.
     """
 
-    df_fragments = pd.read_csv(fragments_list_path, sep='\t')
-    df_oligos = pd.read_csv(oligos_capture_path, sep=",")
+    df_fragments = read_reference(fragments_list_path, sep='\t')
+    df_oligos = read_reference(oligos_capture_path, sep=",")
     if "fragment" in df_oligos.columns:
         return
-    else:
-        fragment_id = []
-        fragment_start = []
-        fragment_end = []
-
-        for index, row in df_oligos.iterrows():
-            chrom, probe_start, probe_end, probe_type, probe, probe_seq = row
-            sub_df_fragments = df_fragments[df_fragments['chrom'] == chrom]
-            oligo_middle = int(probe_start + (probe_end-probe_start)/2)
-            nearest_frag_start = find_nearest(
-                array=sub_df_fragments['start_pos'], key=oligo_middle, mode='lower'
-            )
-
-            id_ = sub_df_fragments.index[sub_df_fragments['start_pos'] == nearest_frag_start].tolist()[0]
-            start = sub_df_fragments.loc[id_, 'start_pos']
-            end = sub_df_fragments.loc[id_, 'end_pos']
-            fragment_id.append(id_)
-            fragment_start.append(start)
-            fragment_end.append(end)
-
-        df_oligos.insert(5, "fragment", np.array(fragment_id))
-        df_oligos.insert(6, "fragment_start", np.array(fragment_start))
-        df_oligos.insert(7, "fragment_end", np.array(fragment_end))
-
-    df_oligos.to_csv(oligos_capture_path, sep=",", index=False)
-
 
+    missing_chr = set(df_oligos['chr']) - set(df_fragments['chrom'])
+    if missing_chr:
+        raise ValueError(f"No fragments found for the oligos chromosome(s) : {', '.join(sorted(missing_chr))}")
 
+    fragment_id = np.zeros(len(df_oligos), dtype=np.int64)
+    oligos_middle = (df_oligos['start'] + (df_oligos['end'] - df_oligos['start']) / 2).astype(np.int64).values
+    oligos_chr = df_oligos['chr'].values
+    for chrom, sub_df_fragments in df_fragments.groupby('chrom', sort=False):
+        oligos_mask = oligos_chr == chrom
+        if not oligos_mask.any():
+            continue
+        order = np.argsort(sub_df_fragments['start_pos'].values, kind='stable')
+        sorted_starts = sub_df_fragments['start_pos'].values[order]
+        #   index of the largest start strictly lower than the middle, or the first fragment if there is none
+        ii = np.searchsorted(sorted_starts, oligos_middle[oligos_mask], side='left') - 1
+        ii = np.clip(ii, 0, len(sorted_starts) - 1)
+        #   first of the fragments sharing that start (stable sort : first in the list), as find_nearest did
+        ii = np.searchsorted(sorted_starts, sorted_starts[ii], side='left')
+        fragment_id[oligos_mask] = sub_df_fragments.index.values[order][ii]
 
+    df_oligos.insert(5, "fragment", fragment_id)
+    df_oligos.insert(6, "fragment_start", df_fragments.loc[fragment_id, 'start_pos'].values)
+    df_oligos.insert(7, "fragment_end", df_fragments.loc[fragment_id, 'end_pos'].values)
 
+    if output_path is None:
+        output_path = oligos_capture_path
+    write_table(df_oligos, output_path, sep=",", index=False)
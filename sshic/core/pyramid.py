@@ -0,0 +1,150 @@
+import sys
+import json
+import argparse
+from typing import List, Optional, Sequence, Tuple
+import numpy as np
+import pandas as pd
+from utils import read_table, atomic_write
+
+#   Set as None to avoid SettingWithCopyWarning
+pd.options.mode.chained_assignment = None
+
+
+def build_pyramid(
+        frequencies_path: str | pd.DataFrame,
+        output_path: str,
+        base_resolution: int = 128,
+        tile_size: int = 4096,
+        min_bins: int = 256
+):
+    """
+    Builds the tile pyramid of the probes profiles of an unbinned frequencies table (see fragments.organize_contacts),
+    to browse them at any zoom level without reading the whole table (see read_pyramid).
+
+    For each probe (and group of probes), the frequencies are summed in bins of the genome (along the genome_start
+    coordinate) of base_resolution bp, then of twice this size at each level up to the one with less than
+    min_bins bins. Each level is cut in tiles of tile_size bins, stored as float32 arrays compressed in the
+    .npz file output_path ('<probe>/<resolution>/<tile>'), along with the description of the levels ('meta').
+
+    Parameters
+    ----------
+    frequencies_path : str | pd.DataFrame
+        Path to the unbinned frequencies table (or the table itself).
+    output_path : str
+        Path to the .npz file to write.
+    base_resolution : int, default=128
+        Size in bp of the bins of the finest level.
+    tile_size : int, default=4096
+        Number of bins of each tile.
+    min_bins : int, default=256
+        Levels are added as long as the genome has more bins than that.
+    """
+    df: pd.DataFrame = read_table(frequencies_path, sep='\t')
+    probes = [c for c in df.columns if c not in ['chr', 'start', 'end', 'sizes', 'genome_start']]
+    genome_start = df['genome_start'].to_numpy(dtype=np.int64)
+    genome_length = int(genome_start.max() + df['sizes'].iloc[genome_start.argmax()]) if len(df) > 0 else 0
+
+    n_bins = genome_length // base_resolution + 1
+    bins = genome_start // base_resolution
+    resolutions = []
+    arrays = {}
+    for probe in probes:
+        values = np.nan_to_num(df[probe].to_numpy(dtype=float))
+        level = np.bincount(bins, weights=values, minlength=n_bins)
+        resolution = base_resolution
+        while True:
+            if probe == probes[0]:
+                resolutions.append(resolution)
+            for t, first in enumerate(range(0, len(level), tile_size)):
+                arrays[f"{probe}/{resolution}/{t}"] = level[first:first + tile_size].astype(np.float32)
+            if len(level) <= min_bins:
+                break
+            #   next level : bins twice as large, the sum of two bins of this level
+            if len(level) % 2:
+                level = np.append(level, 0.)
+            level = level.reshape(-1, 2).sum(axis=1)
+            resolution *= 2
+
+    meta = {
+        "probes": probes,
+        "resolutions": resolutions,
+        "tile_size": tile_size,
+        "genome_length": genome_length
+    }
+    with atomic_write(output_path) as tmp_path, open(tmp_path, 'wb') as f:
+        np.savez_compressed(f, meta=np.array(json.dumps(meta)), **arrays)
+
+
+def read_pyramid(
+        path: str,
+        probe: str,
+        n_pixels: int,
+        x_range: Optional[Sequence[float]] = None
+) -> Optional[Tuple[np.ndarray, np.ndarray, int]]:
+    """
+    Profile of the probe over x_range (the whole genome if None) from its tile pyramid (see build_pyramid),
+    at the coarsest resolution that still gives at least n_pixels bins over the range.
+    Only the tiles covering the range are read.
+
+    Returns the start of the bins, their values and the resolution, or None if even the finest level is
+    too coarse for the range (the unbinned table should be used instead).
+    """
+    with np.load(path) as npz:
+        meta = json.loads(str(npz["meta"]))
+        if probe not in meta["probes"]:
+            raise KeyError(f"No probe {probe} in the pyramid {path}")
+        start, end = x_range if x_range is not None else (0, meta["genome_length"])
+        start, end = max(float(start), 0.), min(float(end), meta["genome_length"])
+        wanted = (end - start) / n_pixels
+        levels: List[int] = [r for r in meta["resolutions"] if r <= wanted]
+        if not levels:
+            return None
+
+        resolution = levels[-1]
+        tile_span = resolution * meta["tile_size"]
+        first_tile, last_tile = int(start // tile_span), int(end // tile_span)
+        tiles = []
+        for t in range(first_tile, last_tile + 1):
+            name = f"{probe}/{resolution}/{t}"
+            if name not in npz.files:
+                break
+            tiles.append(npz[name])
+
+    values = np.concatenate(tiles) if tiles else np.array([], dtype=np.float32)
+    x = (first_tile * meta["tile_size"] + np.arange(len(values))) * resolution
+    keep = (x + resolution > start) & (x <= end)
+    return x[keep], values[keep], resolution
+
+
+def main(argv=None):
+    """
+    Main function to parse command-line arguments and execute the build_pyramid function.
+
+    Parameters
+    ----------
+    argv : Optional[List[str]]
+        List of command-line arguments. Default is None.
+    """
+    if argv is None:
+        argv = sys.argv[1:]
+    if not argv:
+        print('Please enter arguments correctly')
+        exit(0)
+
+    parser = argparse.ArgumentParser(description='Build the tile pyramid of the probes profiles of a sample')
+    parser.add_argument('-i', '--frequencies', type=str, required=True,
+                        help='Path to the unbinned_frequencies.tsv file (generated by fragments)')
+    parser.add_argument('-o', '--output', type=str, required=True,
+                        help='Path to the .npz file to write')
+    parser.add_argument('--base-resolution', type=int, default=128, required=False,
+                        help='size in bp of the bins of the finest level')
+    parser.add_argument('--tile-size', type=int, default=4096, required=False,
+                        help='number of bins of each tile')
+
+    args = parser.parse_args(argv)
+
+    build_pyramid(args.frequencies, args.output, args.base_resolution, args.tile_size)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,382 @@
+import os
+import json
+import time
+import hashlib
+import inspect
+import pandas as pd
+from typing import Callable, Dict, List, Optional
+from instrumentation import Measure, summary
+from utils import atomic_write
+
+
+class Node:
+    def __init__(
+        self,
+        name: str,
+        func: Callable,
+        inputs: List[Optional[str]],
+        outputs: List[str],
+        params: Optional[dict] = None,
+        args: Optional[list] = None,
+        kwargs: Optional[dict] = None,
+        description: Optional[str] = None
+    ):
+        """
+        A stage of the pipeline, i.e. a call to func(*args, **kwargs) that reads the files 'inputs'
+        and writes the files 'outputs'.
+
+        Parameters
+        ----------
+        name : str
+            Unique name of the node (key of the node in the manifest).
+        func : Callable
+            Function to run.
+        inputs : List[Optional[str]]
+            Paths of the files read by func (None paths, for optional inputs, are ignored).
+        outputs : List[str]
+            Paths of the files written by func. A file may be both an input and an output (modified in place).
+        params : dict, optional
+            Parameters of the node recorded in the manifest. If None, the args and kwargs are recorded.
+        args : list, optional
+            Positional arguments of func.
+        kwargs : dict, optional
+            Keyword arguments of func.
+        description : str, optional
+            Message printed when the node is run.
+        """
+        self.name = name
+        self.func = func
+        self.inputs = [p for p in inputs if p]
+        self.outputs = outputs
+        self.args = args or []
+        self.kwargs = kwargs or {}
+        self.description = description or name
+        if params is None:
+            params = {"args": self.args, "kwargs": self.kwargs}
+        #   round trip through json to compare the params with the ones read from the manifest
+        self.params = json.loads(json.dumps(params, default=str))
+
+    def run(self, objects: Optional[Dict[str, pd.DataFrame]] = None, writer=None):
+        """
+        Calls func. The arguments that are paths of inputs found in 'objects' are replaced by the DataFrames
+        themselves, and the writer is given to func if it has a 'writer' argument (see Scheduler, in memory mode).
+        """
+        args, kwargs = self.args, self.kwargs
+        if objects:
+            def resolve(value):
+                if isinstance(value, str) and value in self.inputs and value in objects:
+                    return objects[value]
+                return value
+            args = [resolve(a) for a in args]
+            kwargs = {k: resolve(v) for k, v in kwargs.items()}
+        if writer is not None and 'writer' in inspect.signature(self.func).parameters:
+            kwargs = dict(kwargs, writer=writer)
+        return self.func(*args, **kwargs)
+
+    def results(self, returned) -> Dict[str, pd.DataFrame]:
+        """
+        DataFrames returned by func, by output path : func returns either the table of its only output,
+        or a tuple of tables in the order of the outputs.
+        """
+        if isinstance(returned, pd.DataFrame) and len(self.outputs) == 1:
+            returned = (returned, )
+        if not isinstance(returned, tuple) or len(returned) != len(self.outputs):
+            return {}
+        return {p: df for p, df in zip(self.outputs, returned) if isinstance(df, pd.DataFrame)}
+
+
+def table_hash(df: pd.DataFrame) -> str:
+    """
+    sha256 of the content of the DataFrame (columns, index and values).
+    """
+    sha = hashlib.sha256()
+    sha.update(json.dumps([str(c) for c in df.columns]).encode())
+    sha.update(pd.util.hash_pandas_object(df, index=True).values.tobytes())
+    return sha.hexdigest()
+
+
+def file_record(path: str) -> dict:
+    """
+    Size, modification time and sha256 of the content of the file.
+    """
+    stat = os.stat(path)
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            sha.update(chunk)
+    return {"size": stat.st_size, "mtime": stat.st_mtime_ns, "sha256": sha.hexdigest()}
+
+
+class Journal:
+    def __init__(self, path: str):
+        """
+        Checkpoint journal of a run : one json event per line ("start" of the run, "done" of each node once its
+        outputs are written, "done" of the run), appended and flushed to the disk right away so that it survives
+        a crash of the process.
+        """
+        self.path = path
+
+    def reset(self):
+        with atomic_write(self.path) as tmp_path:
+            open(tmp_path, 'w').close()
+
+    def record(self, event: str, node: Optional[str] = None):
+        with open(self.path, 'a') as f:
+            f.write(json.dumps({"event": event, "node": node, "time": time.strftime("%Y-%m-%d %H:%M:%S")}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def events(self) -> List[dict]:
+        if not os.path.exists(self.path):
+            return []
+        events = []
+        with open(self.path, 'r') as f:
+            for line in f:
+                try:
+                    events.append(json.loads(line))
+                except json.JSONDecodeError:
+                    #   last line cut by a crash
+                    break
+        return events
+
+    def completed(self) -> set:
+        """
+        Names of the nodes done since the journal was reset.
+        """
+        return {e["node"] for e in self.events() if e["event"] == "done" and e["node"] is not None}
+
+    def is_complete(self) -> bool:
+        """
+        True if the last run recorded in the journal went to its end.
+        """
+        events = self.events()
+        return len(events) > 0 and events[-1]["event"] == "done" and events[-1]["node"] is None
+
+
+class Scheduler:
+    def __init__(
+        self,
+        manifest_path: str,
+        files_cache: Optional[Dict[str, dict]] = None,
+        writer=None,
+        journal: Optional[Journal] = None,
+        resume: bool = False
+    ):
+        """
+        Runs a set of nodes in the order of their dependencies (a node depends on the nodes that write its inputs)
+        and only re-executes the invalidated ones, i.e. the nodes :
+            - with a missing output,
+            - never run, or run with other parameters,
+            - with an input whose content changed since its last run.
+
+        The content hashes of the inputs and the parameters of each node are kept in a json manifest
+        (the hashes are cached by file size and modification time to avoid reading unchanged files again).
+
+        Parameters
+        ----------
+        manifest_path : str
+            Path to the json manifest.
+        files_cache : Dict[str, dict], optional
+            Hashes already computed (see file_record) for some files, e.g. the inputs shared by several samples.
+        writer : TableWriter, optional
+            If given, runs in memory : the DataFrames returned by a node are handed over to the nodes that read
+            its outputs (instead of being read again from the files), and the tables are written by the writer
+            (see utils.TableWriter) while the next nodes run. The tables the writer skips are never written,
+            their content hash is kept in the manifest, and the nodes that make them are run again at each run.
+        journal : Journal, optional
+            Checkpoint journal where each node is recorded as done once its outputs are written.
+        resume : bool, default=False
+            Trust the journal : the nodes it records as done (and whose outputs exist) are not checked again,
+            the run restarts at the first node not done.
+        """
+        self.manifest_path = manifest_path
+        self.nodes: List[Node] = []
+        self.writer = writer
+        self.journal = journal
+        self.resume = resume
+        #   nodes run whose outputs are not all written yet (in memory mode), with their manifest records
+        self.uncommitted: List[tuple] = []
+        #   tables returned by the nodes run, written by the writer (in memory mode)
+        self.produced = set()
+        self.objects: Dict[str, pd.DataFrame] = {}
+        #   measures of the nodes of the last run (see report)
+        self.stages: List[dict] = []
+        self.manifest = {"files": {}, "nodes": {}}
+        if os.path.exists(manifest_path):
+            with open(manifest_path, 'r') as f:
+                self.manifest = json.load(f)
+        self.manifest.setdefault("tables", {})
+        if files_cache:
+            self.manifest["files"].update(files_cache)
+
+    def add(self, node: Node):
+        if any(n.name == node.name for n in self.nodes):
+            raise ValueError(f"A node named {node.name} already exists")
+        self.nodes.append(node)
+
+    def file_hash(self, path: str) -> Optional[str]:
+        """
+        sha256 of the content of the file, None if it does not exist
+        (or the hash of the table if it is a table not written, see table_hash).
+        """
+        if not os.path.exists(path):
+            return self.manifest["tables"].get(path) if self.skips(path) else None
+        stat = os.stat(path)
+        cached = self.manifest["files"].get(path)
+        if cached and cached["size"] == stat.st_size and cached["mtime"] == stat.st_mtime_ns:
+            return cached["sha256"]
+
+        self.manifest["files"][path] = file_record(path)
+        return self.manifest["files"][path]["sha256"]
+
+    def skips(self, path: str) -> bool:
+        return self.writer is not None and path in self.writer.skipped
+
+    def sorted_nodes(self) -> List[Node]:
+        """
+        Nodes in topological order (nodes without dependency between them keep their order of addition).
+        A file written in place by a node is not a dependency of this node on itself.
+        """
+        writers: Dict[str, List[Node]] = {}
+        for node in self.nodes:
+            for p in node.outputs:
+                writers.setdefault(p, []).append(node)
+
+        ordered = []
+        done = set()
+        visiting = set()
+
+        def visit(node: Node):
+            if node.name in done:
+                return
+            if node.name in visiting:
+                raise ValueError(f"Cycle in the pipeline at the node {node.name}")
+            visiting.add(node.name)
+            for p in node.inputs:
+                for writer in writers.get(p, []):
+                    if writer is not node and p not in node.outputs:
+                        visit(writer)
+            visiting.remove(node.name)
+            done.add(node.name)
+            ordered.append(node)
+
+        for n in self.nodes:
+            visit(n)
+        return ordered
+
+    def is_valid(self, node: Node) -> bool:
+        record = self.manifest["nodes"].get(node.name)
+        if record is None or record["params"] != node.params:
+            return False
+        if not all(os.path.exists(p) for p in node.outputs):
+            #   including the tables not written (in memory mode)
+            return False
+        if set(record["inputs"]) != set(node.inputs):
+            return False
+        #   in memory mode, a table made again in this run may still be being written (the file is its previous
+        #   version) : the nodes that read it are run again
+        if any(p in self.produced and not self.skips(p) for p in node.inputs):
+            return False
+        return all(self.file_hash(p) == h for p, h in record["inputs"].items())
+
+    def report(self) -> dict:
+        """
+        Measures of the nodes of the last run (see instrumentation.Measure) : wall and cpu times (in s),
+        peak resident memory, bytes read and written by each node (in memory mode, including the tables
+        the writer wrote for it in background), number of rows of the tables read and returned by each node,
+        and the totals. To be called once the writer is done.
+        """
+        stages = []
+        for stage in self.stages:
+            stage = dict(stage)
+            written = stage.pop("written", [])
+            if stage["status"] == "run" and self.writer is not None:
+                stage["bytes_out"] += sum(self.writer.written_bytes.get(i, 0) for i in written)
+            stages.append(stage)
+        return {"stages": stages, "total": summary(stages)}
+
+    def commit(self, wait: bool = False):
+        """
+        Records in the manifest and in the journal the nodes run whose outputs are written
+        (all of them if wait, once the writer is done).
+        """
+        if wait and self.writer is not None:
+            self.writer.wait()
+        committed = [(node, record) for node, record in self.uncommitted
+                     if self.writer is None or all(self.writer.is_written(p) for p in node.outputs)]
+        if not committed:
+            return
+        for node, record in committed:
+            self.manifest["nodes"][node.name] = record
+        self.save()
+        for node, record in committed:
+            self.uncommitted.remove((node, record))
+            if self.journal is not None:
+                self.journal.record("done", node.name)
+
+    def save(self):
+        with atomic_write(self.manifest_path) as tmp_path, open(tmp_path, 'w') as f:
+            json.dump(self.manifest, f, indent=2)
+
+    def run(self) -> List[str]:
+        """
+        Runs the invalidated nodes, and returns their names.
+        """
+        nodes = self.sorted_nodes()
+        #   index of the last node that reads each file, the tables kept in memory are released after it
+        last_reader = {p: i for i, node in enumerate(nodes) for p in node.inputs}
+
+        completed = self.journal.completed() if self.journal is not None and self.resume else set()
+
+        executed = []
+        self.stages = []
+        for i, node in enumerate(nodes):
+            stage = {"name": node.name, "function": node.func.__name__, "inputs": node.inputs,
+                     "outputs": node.outputs}
+            self.stages.append(stage)
+            if node.name in completed and all(os.path.exists(p) for p in node.outputs):
+                print(f"{node.description} : done (resumed) \n")
+                stage["status"] = "resumed"
+            elif self.is_valid(node):
+                print(f"{node.description} : up to date \n")
+                stage["status"] = "up to date"
+                if self.journal is not None:
+                    self.journal.record("done", node.name)
+            else:
+                print(f"{node.description} \n")
+                stage["status"] = "run"
+                #   not valid anymore until its outputs are written
+                if self.manifest["nodes"].pop(node.name, None) is not None:
+                    self.save()
+                submitted = len(self.writer.submitted) if self.writer is not None else 0
+                with Measure() as measure:
+                    returned = node.run(self.objects, self.writer) if self.writer is not None else node.run()
+                if self.writer is not None:
+                    #   tables written in background for the node, their bytes are added to its own in report
+                    stage["written"] = range(submitted, len(self.writer.submitted))
+                results = node.results(returned)
+                if self.writer is not None:
+                    self.produced.update(results)
+                for p, df in results.items():
+                    if self.writer is None:
+                        continue
+                    if self.skips(p):
+                        self.manifest["tables"][p] = table_hash(df)
+                    if last_reader.get(p, -1) > i:
+                        self.objects[p] = df
+                stage.update(measure.record, rows_out=sum(len(df) for df in results.values()))
+                #   hashed after the run : the node is valid for the content of the inputs it modified in place,
+                #   and in memory mode the inputs are written by now (or while the node was running)
+                if self.writer is not None:
+                    for p in node.inputs:
+                        self.writer.wait(p)
+                inputs_hash = {p: self.file_hash(p) for p in node.inputs}
+                self.uncommitted.append((node, {"params": node.params, "inputs": inputs_hash}))
+                executed.append(node.name)
+            self.commit()
+
+            for p in node.inputs:
+                if last_reader[p] == i:
+                    self.objects.pop(p, None)
+        self.commit(wait=True)
+        return executed
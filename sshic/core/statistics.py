@@ -3,22 +3,26 @@ import sys
 import argparse
 import numpy as np
 import pandas as pd
+from typing import Optional
+from utils import read_table, write_table, read_reference, sample_name
 
 
 def get_stats(
-        contacts_unbinned_path: str,
+        contacts_unbinned_path: str | pd.DataFrame,
         sparse_contacts_path: str,
         oligos_path: str,
         output_dir: str,
         cis_range: int = 50000,
+        sample_id: Optional[str] = None,
+        writer=None
 ):
     """
     Generate statistics and normalization for contacts made by each probe.
 
     Parameters
     ----------
-    contacts_unbinned_path : str
-        Path to the unbinned_contacts.tsv file (generated by fragments).
+    contacts_unbinned_path : str | pd.DataFrame
+        Path to the unbinned_contacts.tsv file (generated by fragments), or the unbinned contacts themselves.
     sparse_contacts_path : str
         Path to the sparse_contacts_input.txt file (generated by hicstuff).
     oligos_path : str
@@ -27,14 +31,22 @@ def get_stats(
         Cis range to be considered around the probe.
     output_dir : str
         Path to the output directory.
+    sample_id : str, optional
+        Name of the sample, by default the beginning of the unbinned contacts file name (before the first '_'),
+        required if the unbinned contacts are given as a table.
+    writer : TableWriter, optional
+        Writer of the output tables (see utils.TableWriter), by default they are written right away.
+
+    Returns
+    -------
+    Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]
+        The global statistics, and the normalized contacts per chromosome (all and inter only).
     """
 
-    sample_filename = contacts_unbinned_path.split("/")[-1]
-    sample_id = sample_filename.split("_")[0]
-    # sample_id = re.search(r"AD\d+[A-Z]*", sample_filename).group()
+    sample_id = sample_name(contacts_unbinned_path, sample_id)
     output_path = os.path.join(output_dir, sample_id)
 
-    df_probes: pd.DataFrame = pd.read_csv(oligos_path, sep=',')
+    df_probes: pd.DataFrame = read_reference(oligos_path, sep=',')
 
     chr_size_dict: dict = {
         'chr1': 230218, 'chr2': 813184, 'chr3': 316620, 'chr4': 1531933, 'chr5': 576874, 'chr6': 270161,
@@ -43,11 +55,11 @@ def get_stats(
 
     chr_list = list(chr_size_dict.keys())
 
-    df_unbinned_contacts: pd.DataFrame = pd.read_csv(contacts_unbinned_path, sep='\t')
+    df_unbinned_contacts: pd.DataFrame = read_table(contacts_unbinned_path, sep='\t')
     df_unbinned_contacts = df_unbinned_contacts.astype(dtype={'chr': str, 'start': int, 'sizes': int})
 
     df_sparse_contacts: pd.DataFrame = \
-        pd.read_csv(sparse_contacts_path, header=0, sep="\t", names=['frag_a', 'frag_b', 'contacts'])
+        read_table(sparse_contacts_path, header=0, sep="\t", names=['frag_a', 'frag_b', 'contacts'])
     #   from sparse_matrix (hicstuff results): get total contacts from which probes enrichment is calculated
     total_sparse_contacts = sum(df_sparse_contacts["contacts"])
 
@@ -147,18 +159,29 @@ def get_stats(
     df_chr_nrm.sort_values(by="fragment", ascending=True, inplace=True)
     df_chr_inter_only_nrm.sort_values(by="fragment", ascending=True, inplace=True)
 
-    df_stats.to_csv(output_path + '_global_statistics.tsv', sep='\t')
-    df_chr_nrm.to_csv(output_path + '_normalized_chr_freq.tsv', sep='\t')
-    df_chr_inter_only_nrm.to_csv(output_path + '_normalized_inter_chr_freq.tsv', sep='\t')
+    write_table(df_stats, output_path + '_global_statistics.tsv', writer, sep='\t')
+    write_table(df_chr_nrm, output_path + '_normalized_chr_freq.tsv', writer, sep='\t')
+    write_table(df_chr_inter_only_nrm, output_path + '_normalized_inter_chr_freq.tsv', writer, sep='\t')
+    return df_stats, df_chr_nrm, df_chr_inter_only_nrm
 
 
-def compare_to_wt(statistics_path: str, reference_path: str, wt_ref_name: str):
+def compare_to_wt(
+        statistics_path: str | pd.DataFrame,
+        reference_path: str,
+        wt_ref_name: str,
+        output_path: Optional[str] = None,
+        writer=None
+):
     """
     wt_reference: Optional[str], default=None
             Path to the wt_capture_efficiency file (Optional, if you want to weighted sample).
+
+    statistics_path can also be the statistics table itself (see get_stats). The table with the new
+    capture efficiency column is returned, and written in output_path (by default in place of statistics_path
+    if it is a path, not written if it is a table).
     """
-    df_stats: pd.DataFrame = pd.read_csv(statistics_path, header=0, sep="\t", index_col=0)
-    df_wt: pd.DataFrame = pd.read_csv(reference_path, sep='\t')
+    df_stats: pd.DataFrame = read_table(statistics_path, header=0, sep="\t", index_col=0)
+    df_wt: pd.DataFrame = read_reference(reference_path, sep='\t')
     df_stats[f"capture_efficiency_vs_{wt_ref_name}"] = np.nan
     for index, row in df_stats.iterrows():
         probe = row['probe']
@@ -168,18 +191,25 @@ def compare_to_wt(statistics_path: str, reference_path: str, wt_ref_name: str):
             df_stats.loc[index, f"capture_efficiency_vs_{wt_ref_name}"] = \
                 df_stats.loc[index, 'dsdna_norm_capture_efficiency'] / wt_capture_eff
 
-    df_stats.to_csv(statistics_path, sep='\t')
+    if output_path is None and not isinstance(statistics_path, pd.DataFrame):
+        output_path = statistics_path
+    if output_path is not None:
+        write_table(df_stats, output_path, writer, sep='\t')
+    return df_stats
 
 
-def main(argv):
+def main(argv=None):
     """
-    Main function to parse command-line arguments and execute the get_stats function.
+    Main function to parse command-line arguments and execute the get_stats function
+    (and compare_to_wt if a wild type reference is given).
 
     Parameters
     ----------
-    argv : List[str]
-        List of command-line arguments.
+    argv : Optional[List[str]]
+        List of command-line arguments. Default is None.
     """
+    if argv is None:
+        argv = sys.argv[1:]
     if not argv:
         print('Please enter arguments correctly')
         exit(0)
@@ -197,13 +227,22 @@ def main(argv):
 
     args = parser.parse_args(argv)
 
+    output_dir = os.path.dirname(args.contacts)
     get_stats(
         contacts_unbinned_path=args.contacts,
         sparse_contacts_path=args.sparse,
         oligos_path=args.oligos,
-        output_dir=os.path.dirname(args.contacts)
+        output_dir=output_dir
     )
 
+    if args.wildtype:
+        sample_id = os.path.basename(args.contacts).split("_")[0]
+        compare_to_wt(
+            statistics_path=os.path.join(output_dir, f"{sample_id}_global_statistics.tsv"),
+            reference_path=args.wildtype,
+            wt_ref_name=os.path.basename(args.wildtype).split(".")[0]
+        )
+
 
 if __name__ == "__main__":
     main(sys.argv[1:])
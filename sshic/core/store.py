@@ -0,0 +1,168 @@
+import os
+import json
+import time
+import threading
+from typing import List, Optional
+from scheduler import file_record
+from utils import atomic_write
+
+
+def object_path(store_dir: str, sha256: str) -> str:
+    return os.path.join(store_dir, "objects", sha256[:2], sha256)
+
+
+def check_object(obj: str) -> bool:
+    """
+    Checks that the object still has the size and modification time of its creation (see ingest),
+    removes it otherwise (e.g. its file was modified in place, the object no longer matches its name).
+    An object without its sidecar json is being added by another sample (see ingest) : it is not valid yet,
+    but it is not removed.
+    """
+    if not os.path.lexists(obj):
+        return False
+    try:
+        with open(obj + ".json", 'r') as f:
+            expected = json.load(f)
+        current = os.stat(obj)
+        if current.st_size == expected["size"] and current.st_mtime_ns == expected["mtime"]:
+            return True
+    except FileNotFoundError:
+        #   no sidecar yet, or the object was removed in the meantime
+        return False
+    except (OSError, ValueError, KeyError):
+        pass
+    try:
+        os.remove(obj)
+    except FileNotFoundError:
+        pass
+    return False
+
+
+def ingest(path: str, store_dir: str, sha256: Optional[str] = None) -> dict:
+    """
+    Adds the file to the content addressed store : the object named after the sha256 of its content
+    is a hard link to the file (no byte is copied), or a symbolic link to it if the store is on another file system.
+    A sidecar json (object path + '.json') keeps the size and modification time of the object at its creation,
+    an object that no longer matches them (file modified in place) is replaced.
+
+    Parameters
+    ----------
+    path : str
+        Path to the file to add.
+    store_dir : str
+        Root directory of the store.
+    sha256 : str, optional
+        sha256 of the content of the file if already known (see scheduler.file_record), computed otherwise.
+
+    Returns
+    -------
+    dict
+        The provenance record of the file : source path, sha256, size, modification time,
+        path to the object and kind of link.
+    """
+    source = os.path.abspath(path)
+    stat = os.stat(source)
+    if sha256 is None:
+        sha256 = file_record(source)["sha256"]
+
+    obj = object_path(store_dir, sha256)
+    link = "hardlink"
+    if not check_object(obj):
+        #   the link is made under a temporary name and its sidecar written before it is renamed into place :
+        #   another sample never sees a complete object without its sidecar
+        os.makedirs(os.path.dirname(obj), exist_ok=True)
+        tmp_obj = os.path.join(os.path.dirname(obj), f".{os.getpid()}-{threading.get_ident()}.{sha256}")
+        if os.path.lexists(tmp_obj):
+            os.remove(tmp_obj)
+        try:
+            try:
+                os.link(source, tmp_obj)
+            except OSError:
+                link = "symlink"
+                os.symlink(source, tmp_obj)
+            obj_stat = os.stat(tmp_obj)
+            with atomic_write(obj + ".json") as tmp_path, open(tmp_path, 'w') as f:
+                json.dump({"size": obj_stat.st_size, "mtime": obj_stat.st_mtime_ns, "source": source}, f)
+            #   replaces the object added by another sample at the same time, if any (same content)
+            os.replace(tmp_obj, obj)
+        finally:
+            if os.path.lexists(tmp_obj):
+                os.remove(tmp_obj)
+    elif os.path.islink(obj):
+        link = "symlink"
+
+    return {
+        "source": source,
+        "sha256": sha256,
+        "size": stat.st_size,
+        "mtime": stat.st_mtime_ns,
+        "object": obj,
+        "link": link,
+        "date": time.strftime("%Y-%m-%d %H:%M:%S")
+    }
+
+
+def link_inputs(
+    paths: List[Optional[str]],
+    store_dir: str,
+    inputs_dir: str,
+    hashes: Optional[dict] = None
+) -> List[dict]:
+    """
+    Adds the files to the store (see ingest) and links each of them in inputs_dir under its own name
+    (hard link to the object, or symbolic link if not possible), in place of the copies of the inputs.
+    The provenance records are added to inputs_dir/inputs_provenance.json (by file name).
+
+    Parameters
+    ----------
+    paths : List[Optional[str]]
+        Paths of the files (None paths, for optional inputs, are ignored).
+    store_dir : str
+        Root directory of the store.
+    inputs_dir : str
+        Directory of the links.
+    hashes : dict, optional
+        sha256 already known, by path.
+
+    Returns
+    -------
+    List[dict]
+        The provenance records of the files.
+    """
+    hashes = hashes or {}
+    os.makedirs(inputs_dir, exist_ok=True)
+    provenance_path = os.path.join(inputs_dir, "inputs_provenance.json")
+    provenance = {}
+    if os.path.exists(provenance_path):
+        with open(provenance_path, 'r') as f:
+            provenance = json.load(f)
+
+    records = []
+    for path in paths:
+        if not path:
+            continue
+        if not os.path.isfile(path):
+            print(f"Unable to link file {path} : no such file.")
+            continue
+        destination = os.path.join(inputs_dir, os.path.basename(path))
+        if os.path.basename(path) in provenance:
+            #   the file may have been modified in place since it was linked
+            check_object(provenance[os.path.basename(path)]["object"])
+        record = ingest(path, store_dir, hashes.get(path))
+        if os.path.lexists(destination):
+            if os.path.exists(destination) and os.path.samefile(destination, record["object"]):
+                records.append(record)
+                provenance[os.path.basename(path)] = record
+                continue
+            os.remove(destination)
+        try:
+            os.link(record["object"], destination, follow_symlinks=False)
+        except OSError:
+            os.symlink(os.path.abspath(record["object"]), destination)
+        print(f"File {os.path.basename(path)} linked to the inputs store ({record['sha256'][:12]}).")
+        records.append(record)
+        provenance[os.path.basename(path)] = record
+
+    with atomic_write(provenance_path) as tmp_path, open(tmp_path, 'w') as f:
+        json.dump(provenance, f, indent=2)
+    return records
@@ -0,0 +1,127 @@
+import os
+import re
+import time
+import shutil
+import threading
+from typing import BinaryIO, Iterable, List, Optional
+
+#   disk budget (in MB) of the uploaded files (see UploadDirectory)
+DEFAULT_BUDGET_MB = int(os.environ.get("SSHIC_UPLOAD_CACHE_MB", 4096))
+
+#   uploads not completed after this time (in s) are dropped
+PARTIAL_MAX_AGE = 24 * 3600
+
+UPLOAD_ID = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+
+
+class UploadDirectory:
+    def __init__(self, directory: str, max_bytes: int):
+        """
+        Directory of the files uploaded to the web interface, written by chunks as they are received
+        (see write_chunk) so that a file is never held whole in memory.
+
+        The files are kept as long as they use less than max_bytes of disk : above, the least recently used
+        ones (by access time, set by touch when a file is opened) are deleted, the file just uploaded excepted.
+        The chunks of the uploads in progress are written in the '.partial' subdirectory.
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.partial_directory = os.path.join(directory, ".partial")
+        self._lock = threading.Lock()
+        os.makedirs(self.partial_directory, exist_ok=True)
+
+    def files(self) -> List[str]:
+        """
+        Names of the uploaded files, the most recently used first.
+        """
+        entries = [e for e in os.scandir(self.directory) if e.is_file()]
+        entries.sort(key=lambda e: e.stat().st_atime, reverse=True)
+        return [e.name for e in entries]
+
+    def write_chunk(
+            self,
+            upload_id: str,
+            name: str,
+            offset: int,
+            total: int,
+            stream: BinaryIO,
+            block_size: int = 1024 ** 2
+    ) -> Optional[str]:
+        """
+        Appends the chunk read from stream (by blocks of block_size bytes) at offset in the upload upload_id
+        of the file name (total bytes). Chunks must come in order : the offset must be the size received so far,
+        otherwise a ValueError is raised and the client can start again from there.
+
+        Returns the path of the file once complete (total bytes received), None before.
+        """
+        if not UPLOAD_ID.match(upload_id):
+            raise ValueError(f"Invalid upload id {upload_id}")
+        name = os.path.basename(name)
+        if name in ('', '.', '..', '.partial'):
+            raise ValueError(f"Invalid file name {name}")
+
+        partial_path = os.path.join(self.partial_directory, upload_id)
+        received = os.path.getsize(partial_path) if os.path.exists(partial_path) else 0
+        if offset != received:
+            raise ValueError(f"Chunk at {offset} while {received} bytes were received")
+
+        with open(partial_path, 'ab') as f:
+            while True:
+                block = stream.read(block_size)
+                if not block:
+                    break
+                f.write(block)
+                received += len(block)
+                if received > total:
+                    f.close()
+                    os.remove(partial_path)
+                    raise ValueError(f"More than the {total} bytes announced")
+
+        if received < total:
+            return None
+
+        path = os.path.join(self.directory, name)
+        os.replace(partial_path, path)
+        self.touch(path)
+        self.evict(keep=[path])
+        return path
+
+    def touch(self, path: str):
+        """
+        Marks the file as used now (its access time, its modification time is kept).
+        """
+        stat = os.stat(path)
+        os.utime(path, ns=(time.time_ns(), stat.st_mtime_ns))
+
+    def evict(self, keep: Iterable[str] = ()) -> List[str]:
+        """
+        Deletes the least recently used files (not in keep) while the files use more than max_bytes,
+        and the uploads left incomplete for more than PARTIAL_MAX_AGE. Returns the names of the files deleted.
+        """
+        keep = {os.path.abspath(p) for p in keep}
+        removed = []
+        with self._lock:
+            now = time.time()
+            for entry in os.scandir(self.partial_directory):
+                if entry.is_file() and entry.stat().st_mtime < now - PARTIAL_MAX_AGE:
+                    os.remove(entry.path)
+
+            entries = [e for e in os.scandir(self.directory) if e.is_file()]
+            nbytes = sum(e.stat().st_size for e in entries)
+            for entry in sorted(entries, key=lambda e: e.stat().st_atime):
+                if nbytes <= self.max_bytes:
+                    break
+                if os.path.abspath(entry.path) in keep:
+                    continue
+                nbytes -= entry.stat().st_size
+                os.remove(entry.path)
+                removed.append(entry.name)
+        return removed
+
+    def clear(self):
+        with self._lock:
+            for entry in os.scandir(self.directory):
+                if entry.is_file():
+                    os.remove(entry.path)
+            shutil.rmtree(self.partial_directory, ignore_errors=True)
+            os.makedirs(self.partial_directory, exist_ok=True)
@@ -1,5 +1,9 @@
 import sys
 import os
+import json
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 from typing import Optional
 import pandas as pd
@@ -112,3 +116,247 @@ def make_groups_of_probes(df_groups: pd.DataFrame, df: pd.DataFrame, prob2frag:
             df[group_name] = df[group_frags].sum(axis=1)
         else:
             continue
+
+
+#   parsed reference tables by (path, modification time, size, read_csv arguments), None if not cached
+_references_cache: Optional[dict] = None
+#   number of rows of the tables read by each thread (see rows_read)
+_rows_read = threading.local()
+
+
+def rows_read() -> int:
+    """
+    Number of rows of the tables read with read_reference and read_table by the current thread
+    since its start (see instrumentation.Measure).
+    """
+    return getattr(_rows_read, "count", 0)
+
+
+def _count_rows(df: pd.DataFrame) -> pd.DataFrame:
+    _rows_read.count = rows_read() + len(df)
+    return df
+
+
+def cache_references(enabled: bool = True):
+    """
+    Enables (or disables and empties) the cache of the reference tables read with read_reference,
+    for processes that run many samples with the same references (see daemon.py and pipeline.shared_inputs).
+    The tables already cached are kept if the cache is enabled again.
+    """
+    global _references_cache
+    if not enabled:
+        _references_cache = None
+    elif _references_cache is None:
+        _references_cache = {}
+
+
+def read_reference(path: str, **kwargs) -> pd.DataFrame:
+    """
+    Reads a reference table (oligos, fragments list, chromosomes coordinates, groups of probes, etc.)
+    with pd.read_csv (kwargs are given to read_csv).
+    If the cache is enabled (see cache_references), the table is parsed only once as long as the file is not
+    modified, and a copy of it is returned. The rows are counted in rows_read.
+    """
+    if _references_cache is None:
+        return _count_rows(pd.read_csv(path, **kwargs))
+
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size, repr(sorted(kwargs.items())))
+    if key not in _references_cache:
+        #   older versions of the file are dropped
+        for k in [k for k in _references_cache if k[0] == key[0] and k[1:3] != key[1:3]]:
+            del _references_cache[k]
+        _references_cache[key] = pd.read_csv(path, **kwargs)
+    return _count_rows(_references_cache[key].copy(deep=True))
+
+
+def read_table(table: str | pd.DataFrame, **kwargs) -> pd.DataFrame:
+    """
+    Reads the table at the path 'table' with pd.read_csv (kwargs are given to read_csv).
+    If 'table' is already a DataFrame (handed over in memory by the previous step), returns a copy of it
+    with the nullable dtypes (convert_dtypes) turned back into the numpy dtypes read_csv would give.
+    The rows are counted in rows_read either way.
+    """
+    if not isinstance(table, pd.DataFrame):
+        return _count_rows(pd.read_csv(table, **kwargs))
+
+    df = _count_rows(table.copy(deep=True))
+    for col, dtype in df.dtypes.items():
+        if not isinstance(dtype, pd.api.extensions.ExtensionDtype) or isinstance(dtype, pd.CategoricalDtype):
+            continue
+        if pd.api.types.is_bool_dtype(dtype):
+            df[col] = df[col].astype(object if df[col].hasnans else bool)
+        elif pd.api.types.is_integer_dtype(dtype):
+            df[col] = df[col].astype(float if df[col].hasnans else 'int64')
+        elif pd.api.types.is_float_dtype(dtype):
+            df[col] = df[col].astype(float)
+        else:
+            df[col] = df[col].astype(object).where(df[col].notna(), np.nan)
+    return df
+
+
+def sample_name(table: str | pd.DataFrame, sample_id: Optional[str] = None) -> str:
+    """
+    Returns sample_id if given, otherwise the name of the sample taken from the file name of the table
+    (before the first '_', e.g. AD241 for AD241_S0_pcrdupkept.txt).
+    Raises a ValueError if the table is not a path (handed over in memory by the previous step) and
+    sample_id is not given.
+    """
+    if sample_id is not None:
+        return sample_id
+    if not isinstance(table, str):
+        raise ValueError("sample_id is required when the table is given in memory instead of a file path")
+    # sample_id = re.search(r"AD\d+[A-Z]*", sample_filename).group()
+    return os.path.basename(table).split("_")[0]
+
+
+@contextmanager
+def atomic_write(path: str):
+    """
+    Gives a temporary path (hidden, in the same directory as 'path') to write into, renamed to 'path'
+    once the 'with' block is done : 'path' is either its previous version or complete, never half written.
+    The temporary file is removed if the writing fails.
+
+        with atomic_write(path) as tmp_path:
+            df.to_csv(tmp_path)
+    """
+    directory, name = os.path.split(path)
+    tmp_path = os.path.join(directory, f".{os.getpid()}-{threading.get_ident()}.{name}")
+    try:
+        yield tmp_path
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def to_csv(df: pd.DataFrame, path: str, **kwargs):
+    """
+    df.to_csv(path, **kwargs), written atomically (see atomic_write).
+    """
+    with atomic_write(path) as tmp_path:
+        df.to_csv(tmp_path, **kwargs)
+
+
+def write_table(df: pd.DataFrame, path: str, writer=None, **kwargs):
+    """
+    Writes the DataFrame in the file 'path' with df.to_csv (kwargs are given to to_csv) atomically,
+    directly or through the TableWriter 'writer' if given.
+    """
+    if writer is None:
+        to_csv(df, path, **kwargs)
+    else:
+        writer.write(df, path, **kwargs)
+
+
+#   name of the index of the tables of an output directory (see index_table)
+TABLES_INDEX = "tables_index.json"
+#   columns of the contacts and frequencies tables that are not probes or groups
+COORDINATES_COLUMNS = ['chr', 'start', 'end', 'sizes', 'genome_start', 'chr_bins', 'genome_bins']
+_index_lock = threading.Lock()
+
+
+def index_table(df: pd.DataFrame, path: str, resolution: int, probes_to_fragments: dict):
+    """
+    Records the description of the contacts or frequencies table written at 'path' in the index of its directory
+    (TABLES_INDEX, a json by table file name), so that the tables can be listed without being read :
+    resolution (bin size in bp, 0 for unbinned), number of rows, fragments columns, groups columns
+    and the probes of the fragments columns.
+    """
+    columns = [str(c) for c in df.columns if c not in COORDINATES_COLUMNS]
+    fragments_to_probes = {}
+    for probe, frag in probes_to_fragments.items():
+        fragments_to_probes.setdefault(str(frag), []).append(probe)
+    entry = {
+        "resolution": resolution,
+        "rows": len(df),
+        "fragments": [c for c in columns if c in fragments_to_probes],
+        "groups": [c for c in columns if c not in fragments_to_probes],
+        "probes": {p: f for f, probes in fragments_to_probes.items() if f in columns for p in probes}
+    }
+
+    index_path = os.path.join(os.path.dirname(path), TABLES_INDEX)
+    with _index_lock:
+        index = read_tables_index(os.path.dirname(path))
+        index[os.path.basename(path)] = entry
+        with atomic_write(index_path) as tmp_path, open(tmp_path, 'w') as f:
+            json.dump(index, f, indent=2)
+
+
+def read_tables_index(directory: str) -> dict:
+    """
+    Index of the tables of the directory (see index_table), empty if there is none.
+    """
+    try:
+        with open(os.path.join(directory, TABLES_INDEX), 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+class TableWriter:
+    def __init__(self, asynchronous: bool = True, skipped: Optional[list] = None, max_workers: int = 2):
+        """
+        Writes the tables of the pipeline steps (see write_table) in background threads, so that the next steps
+        can already run on the DataFrames handed over in memory. The DataFrames given to write must not be
+        modified afterwards.
+
+        Parameters
+        ----------
+        asynchronous : bool, default=True
+            Write in background threads, otherwise the tables are written right away.
+        skipped : list, optional
+            Paths of the tables not to write at all (e.g. intermediate tables only used by the next step).
+        max_workers : int, default=2
+            Number of writing threads.
+        """
+        self.executor = ThreadPoolExecutor(max_workers=max_workers) if asynchronous else None
+        self.skipped = set(skipped or [])
+        self.pending = {}
+        #   paths of the tables written in the background threads, in the order of submission,
+        #   and bytes written by each of these writings, by index (see Scheduler.report)
+        self.submitted = []
+        self.written_bytes = {}
+
+    def write(self, df: pd.DataFrame, path: str, **kwargs):
+        if path in self.skipped:
+            #   an older version of the table would not match the one handed over
+            if os.path.exists(path):
+                os.remove(path)
+            return
+        if self.executor is None:
+            to_csv(df, path, **kwargs)
+            return
+        #   a table rewritten (in place) must be written after its previous version
+        self.wait(path)
+        self.pending[path] = self.executor.submit(self._write, len(self.submitted), df, path, **kwargs)
+        self.submitted.append(path)
+
+    def _write(self, submission: int, df: pd.DataFrame, path: str, /, **kwargs):
+        #   measured in the writing thread, that only writes this table meanwhile
+        from instrumentation import io_bytes
+        written = io_bytes()[1]
+        to_csv(df, path, **kwargs)
+        self.written_bytes[submission] = io_bytes()[1] - written
+
+    def is_written(self, path: str) -> bool:
+        """
+        True if the table 'path' is not being written (anymore) and its writing did not fail.
+        """
+        future = self.pending.get(path)
+        return future is None or (future.done() and future.exception() is None)
+
+    def wait(self, path: Optional[str] = None):
+        """
+        Waits for the table 'path' to be written (all the tables if None), raises the error of the writing if any.
+        """
+        paths = [path] if path is not None else list(self.pending)
+        for p in paths:
+            future = self.pending.pop(p, None)
+            if future is not None:
+                future.result()
+
+    def close(self):
+        self.wait()
+        if self.executor is not None:
+            self.executor.shutdown()
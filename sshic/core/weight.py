@@ -1,19 +1,23 @@
 import re
 import os
+import sys
+import argparse
 import pandas as pd
 import numpy as np
 from typing import Optional
-from utils import make_groups_of_probes
+from utils import make_groups_of_probes, read_table, write_table, read_reference, index_table, sample_name
 
 
 def weight_mutant(
-        statistics_path: str,
+        statistics_path: str | pd.DataFrame,
         wt_ref_name: str,
-        contacts_path: str,
-        frequencies_path: str,
+        contacts_path: str | pd.DataFrame,
+        frequencies_path: str | pd.DataFrame,
         binned_type: str,
         output_dir: str,
-        additional_path: Optional[str] = None
+        additional_path: Optional[str] = None,
+        sample_id: Optional[str] = None,
+        writer=None
 ):
 
     """
@@ -23,25 +27,27 @@ def weight_mutant(
 
     Do it for each bin.
 
+    The statistics, contacts and frequencies can be given as paths or directly as tables
+    (the sample_id is then required, it is otherwise taken from the contacts file name).
+    Returns the weighted contacts and frequencies tables.
+
     ARGUMENTS
     ________________
 
     """
 
-    sample_filename = os.path.basename(contacts_path)
-    sample_id = sample_filename.split("_")[0]
-    # sample_id = re.search(r"AD\d+[A-Z]*", sample_filename).group()
+    sample_id = sample_name(contacts_path, sample_id)
     output_path = os.path.join(output_dir, sample_id)
 
-    df_stats: pd.DataFrame = pd.read_csv(statistics_path, header=0, sep="\t", index_col=0)
+    df_stats: pd.DataFrame = read_table(statistics_path, header=0, sep="\t", index_col=0)
     df_stats["fragment"] = df_stats["fragment"].astype(str)
-    df_contacts: pd.DataFrame = pd.read_csv(contacts_path, header=0, sep="\t")
-    df_frequencies: pd.DataFrame = pd.read_csv(frequencies_path, header=0, sep="\t")
+    df_contacts: pd.DataFrame = read_table(contacts_path, header=0, sep="\t")
+    df_frequencies: pd.DataFrame = read_table(frequencies_path, header=0, sep="\t")
 
     probes = df_stats['probe'].tolist()
     fragments = df_stats['fragment'].astype(str).tolist()
     if additional_path:
-        df_additional: pd.DataFrame = pd.read_csv(additional_path, sep='\t')
+        df_additional: pd.DataFrame = read_reference(additional_path, sep='\t')
         groups = df_additional['name'].to_list()
         df_contacts.drop(columns=groups, inplace=True)
         df_frequencies.drop(columns=groups, inplace=True)
@@ -61,5 +67,60 @@ def weight_mutant(
         make_groups_of_probes(df_additional, df_contacts, probes_to_fragments)
         make_groups_of_probes(df_additional, df_frequencies, probes_to_fragments)
 
-    df_contacts.to_csv(output_path+f"_{binned_type}_contacts.tsv", sep='\t', index=False)
-    df_frequencies.to_csv(output_path + f"_{binned_type}_frequencies.tsv", sep='\t', index=False)
+    write_table(df_contacts, output_path+f"_{binned_type}_contacts.tsv", writer, sep='\t', index=False)
+    write_table(df_frequencies, output_path + f"_{binned_type}_frequencies.tsv", writer, sep='\t', index=False)
+    bin_size = re.match(r"(\d+)kb", binned_type)
+    resolution = int(bin_size.group(1)) * 1000 if bin_size else 0
+    index_table(df_contacts, output_path + f"_{binned_type}_contacts.tsv", resolution, dict(zip(probes, fragments)))
+    index_table(
+        df_frequencies, output_path + f"_{binned_type}_frequencies.tsv", resolution, dict(zip(probes, fragments)))
+    return df_contacts, df_frequencies
+
+
+def main(argv=None):
+    """
+    Main function to parse command-line arguments and execute the weight_mutant function.
+
+    Parameters
+    ----------
+    argv : Optional[List[str]]
+        List of command-line arguments. Default is None.
+    """
+    if argv is None:
+        argv = sys.argv[1:]
+    if not argv:
+        print('Please enter arguments correctly')
+        exit(0)
+
+    parser = argparse.ArgumentParser(
+        description='Weight the contacts and frequencies of a sample by the capture efficiency of its probes')
+    parser.add_argument('-s', '--statistics', type=str, required=True,
+                        help='Path to the global_statistics.tsv file (generated by statistics)')
+    parser.add_argument('-w', '--wt-reference', type=str, required=True,
+                        help='Name of the wild type reference (capture_efficiency_vs_<name> column)')
+    parser.add_argument('--contacts', type=str, required=True,
+                        help='Path to the contacts table (unbinned or binned)')
+    parser.add_argument('--frequencies', type=str, required=True,
+                        help='Path to the frequencies table (unbinned or binned)')
+    parser.add_argument('-t', '--binned-type', type=str, required=True,
+                        help='Resolution of the tables, used in the output names (unbinned, 10kb_binned, etc ...)')
+    parser.add_argument('-o', '--output-dir', type=str, required=True,
+                        help='Path to the output directory')
+    parser.add_argument('-a', '--additional-groups', type=str, required=False,
+                        help='Path to additional groups of probes table')
+
+    args = parser.parse_args(argv)
+
+    weight_mutant(
+        statistics_path=args.statistics,
+        wt_ref_name=args.wt_reference,
+        contacts_path=args.contacts,
+        frequencies_path=args.frequencies,
+        binned_type=args.binned_type,
+        output_dir=args.output_dir,
+        additional_path=args.additional_groups
+    )
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
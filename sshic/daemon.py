@@ -0,0 +1,273 @@
+"""
+Long-lived worker that runs the pipeline (see pipeline.py) on the samples it receives, without paying the imports
+and the parsing of the reference tables (oligos, fragments list, chromosomes coordinates, groups of probes)
+for each of them : they are loaded once at start (and again only if their files change).
+
+The jobs are json objects, with the sample sparse matrix path and its references (if any) :
+
+    {"sample": "../data/samples/AD241_S0_pcrdupkept.txt", "references": ["../data/references/ref_wt.tsv"]}
+
+or several samples at once :
+
+    {"samples": [{"sample": ..., "references": [...]}, ...]}
+
+They are received on a local UNIX socket (one json line per connection, the status of the samples is sent back),
+and/or as .json files dropped in a spool directory (moved to spool/done or spool/failed with their status).
+
+Usage (from the sshic directory, core in the python path as for pipeline.py) :
+
+    python daemon.py serve --socket /tmp/sshic.sock --spool ../data/spool \\
+        -o ../data/inputs/capture_oligo_positions.csv -f ../data/inputs/fragments_list.txt \\
+        -c ../data/inputs/chr_centros_coordinates.tsv -b 1000 10000 \\
+        --window-size-centros 150000 --window-size-telos 15000
+
+    python daemon.py submit --socket /tmp/sshic.sock -s ../data/samples/AD241_S0_pcrdupkept.txt
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import traceback
+from os.path import join
+from typing import Dict, List, Optional
+
+from pipeline import PathBundle, AggregateParams, shared_inputs, run_samples
+#   the flat module, the one the core functions read the references with
+from utils import cache_references
+
+
+class Daemon:
+    def __init__(
+        self,
+        oligos_path: str,
+        fragments_list_path: str,
+        centromeres_coordinates_path: str,
+        binning_size_list: List[int],
+        aggregate_params: AggregateParams,
+        additional_groups: Optional[str] = None,
+        in_memory: bool = False,
+        jobs: int = 1,
+        max_memory: Optional[int] = None
+    ):
+        """
+        Pipeline parameters shared by all the jobs (see pipeline.pipeline and pipeline.run_samples).
+        The reference tables are loaded at creation.
+        """
+        self.oligos_path = oligos_path
+        self.fragments_list_path = fragments_list_path
+        self.centromeres_coordinates_path = centromeres_coordinates_path
+        self.binning_size_list = binning_size_list
+        self.aggregate_params = aggregate_params
+        self.additional_groups = additional_groups
+        self.in_memory = in_memory
+        self.jobs = jobs
+        self.max_memory = max_memory
+        self.files_cache: Dict[str, dict] = {}
+
+        cache_references()
+        self.refresh()
+
+    def refresh(self):
+        """
+        Prepares the shared inputs (see pipeline.shared_inputs) and parses the reference tables,
+        if not done yet or if one of their files changed since.
+        """
+        changed = not self.files_cache or any(
+            not os.path.exists(p) or os.stat(p).st_size != r["size"] or os.stat(p).st_mtime_ns != r["mtime"]
+            for p, r in self.files_cache.items())
+        if not changed:
+            return
+
+        t0 = time.time()
+        #   the tables are parsed in the cache of the references
+        self.files_cache = shared_inputs(
+            self.oligos_path, self.fragments_list_path, self.centromeres_coordinates_path, self.additional_groups)
+        print(f"Reference tables loaded in {time.time() - t0:.1f} s", flush=True)
+
+    def run_job(self, job: dict) -> Dict[str, str]:
+        """
+        Runs the pipeline on the samples of the job, returns their status by sample path (see pipeline.run_samples).
+        """
+        samples = job["samples"] if "samples" in job else [job]
+        self.refresh()
+        samples_data = []
+        for s in samples:
+            samples_data.append([
+                PathBundle(s["sample"], s.get("references") or []), self.oligos_path, self.fragments_list_path,
+                self.centromeres_coordinates_path, self.binning_size_list, self.aggregate_params,
+                self.additional_groups, self.in_memory])
+        return run_samples(samples_data, self.jobs, self.max_memory, self.files_cache)
+
+    def handle_connection(self, connection: socket.socket) -> bool:
+        """
+        Reads a job (json line) on the connection and sends back the status of its samples.
+        Returns False if the job asks the daemon to stop.
+        """
+        with connection, connection.makefile('rw') as stream:
+            try:
+                job = json.loads(stream.readline())
+                if job.get("command") == "stop":
+                    stream.write(json.dumps({"stopped": True}) + "\n")
+                    return False
+                answer = {"status": self.run_job(job)}
+            except Exception as e:
+                traceback.print_exc()
+                answer = {"error": f"{type(e).__name__}: {e}"}
+            stream.write(json.dumps(answer) + "\n")
+        return True
+
+    def handle_spool(self, spool_dir: str):
+        """
+        Runs the jobs (.json files) of the spool directory, oldest first.
+        Each job file is moved to spool_dir/done (or spool_dir/failed) with the status of its samples.
+        """
+        jobs = sorted((f for f in os.listdir(spool_dir) if f.endswith('.json')),
+                      key=lambda f: os.stat(join(spool_dir, f)).st_mtime_ns)
+        for name in jobs:
+            running = join(spool_dir, name + '.running')
+            try:
+                #   claims the job
+                os.rename(join(spool_dir, name), running)
+            except FileNotFoundError:
+                continue
+
+            try:
+                with open(running, 'r') as f:
+                    job = json.load(f)
+                job["status"] = self.run_job(job)
+                outcome = "done" if all(v == 'done' for v in job["status"].values()) else "failed"
+            except Exception as e:
+                traceback.print_exc()
+                job = {"job": name, "error": f"{type(e).__name__}: {e}"}
+                outcome = "failed"
+
+            os.makedirs(join(spool_dir, outcome), exist_ok=True)
+            with open(join(spool_dir, outcome, name), 'w') as f:
+                json.dump(job, f, indent=2)
+            os.remove(running)
+
+    def serve(self, socket_path: Optional[str] = None, spool_dir: Optional[str] = None, poll: float = 2.0):
+        """
+        Waits for jobs on the UNIX socket socket_path and/or in the spool directory spool_dir
+        (checked every 'poll' seconds), and runs them one after the other until a stop command is received.
+        """
+        if socket_path is None and spool_dir is None:
+            raise ValueError("A socket or a spool directory is needed to receive the jobs")
+
+        server = None
+        if socket_path is not None:
+            if os.path.exists(socket_path):
+                os.remove(socket_path)
+            server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            server.bind(socket_path)
+            server.listen()
+            server.settimeout(poll)
+            print(f"Listening on {socket_path}", flush=True)
+        if spool_dir is not None:
+            os.makedirs(spool_dir, exist_ok=True)
+            print(f"Watching {spool_dir}", flush=True)
+
+        try:
+            while True:
+                if spool_dir is not None:
+                    self.handle_spool(spool_dir)
+                if server is None:
+                    time.sleep(poll)
+                    continue
+                try:
+                    connection, _ = server.accept()
+                except socket.timeout:
+                    continue
+                connection.settimeout(None)
+                if not self.handle_connection(connection):
+                    break
+        finally:
+            if server is not None:
+                server.close()
+                os.remove(socket_path)
+
+
+def submit(socket_path: str, job: dict) -> dict:
+    """
+    Sends the job to the daemon listening on socket_path, and returns its answer once the job is done.
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.connect(socket_path)
+        with client.makefile('rw') as stream:
+            stream.write(json.dumps(job) + "\n")
+            stream.flush()
+            return json.loads(stream.readline())
+
+
+def main(argv=None):
+    """
+    Parses the command line arguments and starts the daemon (serve) or sends it a job (submit).
+    """
+    parser = argparse.ArgumentParser(description="Daemon that runs the pipeline on the samples it receives.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    serve_parser = subparsers.add_parser('serve', help="start the daemon")
+    serve_parser.add_argument('--socket', type=str, required=False, help='Path to the UNIX socket to listen on')
+    serve_parser.add_argument('--spool', type=str, required=False, help='Spool directory to watch for jobs')
+    serve_parser.add_argument('--poll', type=float, default=2.0, required=False,
+                              help='Interval (in s) between two checks of the spool directory')
+    serve_parser.add_argument('-o', '--oligos-capture', type=str, required=True,
+                              help='Path to the file that contains positions of oligos')
+    serve_parser.add_argument('-f', '--fragments-list', type=str, required=True,
+                              help='Path to the file fragments_list (hic_stuff output)')
+    serve_parser.add_argument('-c', '--centromeres-coordinates', type=str, required=True,
+                              help='Path to the file centromeres_coordinates')
+    serve_parser.add_argument('-b', '--binning-sizes', nargs='+', type=int, required=True,
+                              help='desired bin size for the rebin step')
+    serve_parser.add_argument('-a', '--additional-groups', type=str, required=False,
+                              help='Path to additional groups of probes table')
+    serve_parser.add_argument('--window-size-centros', type=int, required=True,
+                              help="window (in bp) that defines a focus region to aggregated centromeres")
+    serve_parser.add_argument('--window-size-telos', type=int, required=True,
+                              help="window (in bp) that defines a focus region to aggregated telomeres")
+    serve_parser.add_argument('--excluded-chr', nargs='+', type=str, required=False,
+                              help='list of chromosomes to excludes to prevent bias of contacts')
+    serve_parser.add_argument('--exclude-probe-chr', action='store_true', required=False,
+                              help="exclude the chromosome where the probe comes from (oligo's chromosome)")
+    serve_parser.add_argument('-j', '--jobs', type=int, default=1, required=False,
+                              help="number of samples of a job to process at the same time")
+    serve_parser.add_argument('--max-memory', type=float, required=False,
+                              help="memory limit (in GB) of each sample process when --jobs is more than 1")
+    serve_parser.add_argument('--in-memory', action='store_true', required=False,
+                              help="hand over the tables from one step to the next in memory")
+
+    submit_parser = subparsers.add_parser('submit', help="send a sample to the daemon and wait for it")
+    submit_parser.add_argument('--socket', type=str, required=True, help='Path to the UNIX socket of the daemon')
+    submit_parser.add_argument('-s', '--sample', type=str, required=False, help='Path to the sample sparse matrix')
+    submit_parser.add_argument('-r', '--references', nargs='+', type=str, required=False,
+                               help='Paths to the references of the sample')
+    submit_parser.add_argument('--stop', action='store_true', required=False, help='stop the daemon')
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'submit':
+        if args.stop:
+            answer = submit(args.socket, {"command": "stop"})
+        elif args.sample:
+            answer = submit(args.socket, {"sample": os.path.abspath(args.sample),
+                                          "references": [os.path.abspath(r) for r in args.references or []]})
+        else:
+            parser.error("submit needs a sample (-s) or --stop")
+        print(json.dumps(answer, indent=2))
+        if any(v != 'done' for v in answer.get("status", {}).values()) or "error" in answer:
+            sys.exit(1)
+    else:
+        daemon = Daemon(
+            args.oligos_capture, args.fragments_list, args.centromeres_coordinates, args.binning_sizes,
+            AggregateParams(args.window_size_centros, args.window_size_telos, args.exclude_probe_chr,
+                            args.excluded_chr),
+            args.additional_groups, args.in_memory, args.jobs,
+            int(args.max_memory * 1024 ** 3) if args.max_memory else None)
+        daemon.serve(args.socket, args.spool, args.poll)
+
+
+if __name__ == "__main__":
+    main()
@@ -14,6 +14,7 @@ import probes_viewer
 server = Flask(__name__, template_folder='templates', )
 app = dash.Dash(__name__, server=server, external_stylesheets=[dbc.themes.BOOTSTRAP, 'assets/style.css'])
 app.config.suppress_callback_exceptions = True
+data_viewer.register_upload_routes(server)
 
 # Set up the app layout
 app.layout = html.Div([
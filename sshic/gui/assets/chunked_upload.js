@@ -0,0 +1,72 @@
+// Uploads of the Data Viewer page : the files are sent by chunks to /dv-upload (see data_viewer.py),
+// so that neither the browser nor the server hold a whole file in memory.
+// Once all the files are uploaded, the hidden dv-upload-done button is clicked to refresh the list of files.
+
+(function () {
+    const CHUNK_SIZE = 8 * 1024 * 1024;
+
+    function setProgress(text) {
+        const progress = document.getElementById("dv-upload-progress");
+        if (progress) {
+            progress.textContent = text;
+        }
+    }
+
+    async function uploadFile(file) {
+        const uploadId = Date.now().toString(36) + "-" + Math.random().toString(36).slice(2, 10);
+        let offset = 0;
+        do {
+            const chunk = file.slice(offset, offset + CHUNK_SIZE);
+            const params = new URLSearchParams({id: uploadId, name: file.name, offset: offset, total: file.size});
+            const response = await fetch("/dv-upload?" + params.toString(), {method: "POST", body: chunk});
+            if (!response.ok) {
+                const error = await response.json().catch(() => ({error: response.statusText}));
+                throw new Error(file.name + " : " + error.error);
+            }
+            offset += chunk.size;
+            const percent = file.size ? Math.floor(100 * offset / file.size) : 100;
+            setProgress("Uploading " + file.name + " : " + percent + " %");
+        } while (offset < file.size);
+    }
+
+    async function uploadFiles(files) {
+        try {
+            for (const file of files) {
+                await uploadFile(file);
+            }
+            setProgress(files.length + " file(s) uploaded");
+        } catch (e) {
+            setProgress("Upload failed, " + e.message);
+        }
+        const done = document.getElementById("dv-upload-done");
+        if (done) {
+            done.click();
+        }
+    }
+
+    function inZone(target) {
+        return target instanceof Element && target.closest("#dv-upload-data") !== null;
+    }
+
+    document.addEventListener("click", function (e) {
+        if (inZone(e.target)) {
+            document.getElementById("dv-upload-input").click();
+        }
+    });
+    document.addEventListener("change", function (e) {
+        if (e.target.id === "dv-upload-input" && e.target.files.length > 0) {
+            uploadFiles(Array.from(e.target.files)).then(() => { e.target.value = ""; });
+        }
+    });
+    document.addEventListener("dragover", function (e) {
+        if (inZone(e.target)) {
+            e.preventDefault();
+        }
+    });
+    document.addEventListener("drop", function (e) {
+        if (inZone(e.target)) {
+            e.preventDefault();
+            uploadFiles(Array.from(e.dataTransfer.files));
+        }
+    });
+})();
@@ -1,33 +1,46 @@
 import dash
 import os
-import base64
 from os.path import join, dirname
-import pandas as pd
+from flask import request, jsonify
 from dash import callback
 from dash import html, dcc, dash_table
 import dash_bootstrap_components as dbc
 from dash.dependencies import Input, Output
 
+import core.cache
+import core.paging
+import core.uploads
+
 
 TEMPORARY_DIRECTORY = join(dirname(dirname(os.getcwd())), "data", "__cache__")
 
 if not os.path.exists(TEMPORARY_DIRECTORY):
     os.makedirs(TEMPORARY_DIRECTORY)
 
+#   uploaded files, streamed to disk by chunks (see assets/chunked_upload.js), the least recently used
+#   being deleted above SSHIC_UPLOAD_CACHE_MB (4 GB by default)
+uploads = core.uploads.UploadDirectory(TEMPORARY_DIRECTORY, core.uploads.DEFAULT_BUDGET_MB * 1024 ** 2)
+
 
 def generate_data_table(id, data, columns):
+    #   paged, sorted and filtered on the server (see update_table), only the rows of the page shown are sent
     return dash_table.DataTable(
         id=id,
         data=data,
         columns=columns,
         style_table={'overflowX': 'auto'},
+        page_current=0,
         page_size=16,
+        page_action='custom',
         style_header={
             'backgroundColor': '#eaecee',
             'color': ' #3498db ',
             'fontWeight': 'bold'},
-        sort_action='native',
+        sort_action='custom',
         sort_mode='multi',
+        sort_by=[],
+        filter_action='custom',
+        filter_query='',
     )
 
 
@@ -35,7 +48,7 @@ layout = dbc.Container([
     html.H2('Data Viewer', style={'margin-top': '20px', 'margin-bottom': '20px'}),
     dbc.Row([
         dbc.Col([
-            dcc.Upload(
+            html.Div(
                 id="dv-upload-data",
                 children=html.Div(
                     ["Drag and drop or click to select a file to upload."]
@@ -49,9 +62,13 @@ layout = dbc.Container([
                     "borderRadius": "20px",
                     "textAlign": "center",
                     "margin": "10px",
+                    "cursor": "pointer",
                 },
-                multiple=True,
             ),
+            #   the file input and the button clicked once the uploads are done are driven by chunked_upload.js
+            html.Input(id="dv-upload-input", type="file", multiple=True, style={"display": "none"}),
+            html.Button(id="dv-upload-done", style={"display": "none"}),
+            html.Div(id="dv-upload-progress", style={'margin-left': '10px'}),
         ], width=8, style={'margin-top': '0px', 'margin-bottom': '25px'}),
     ]),
     dbc.Row([
@@ -96,42 +113,34 @@ layout = dbc.Container([
 ])
 
 
-def save_file(name, content):
-    """Decode and store a file uploaded with Plotly Dash."""
-    data = content.encode("utf8").split(b";base64,")[1]
-    with open(os.path.join(TEMPORARY_DIRECTORY, name), "wb") as fp:
-        fp.write(base64.decodebytes(data))
-
-
-def uploaded_files():
-    """List the files in the upload directory."""
-    files = []
-    for filename in os.listdir(TEMPORARY_DIRECTORY):
-        path = os.path.join(TEMPORARY_DIRECTORY, filename)
-        if os.path.isfile(path):
-            files.append(filename)
-    return files
+def register_upload_routes(server):
+    """
+    Adds to the Flask server the endpoint receiving the uploads by chunks : POST /dv-upload?id=&name=&offset=&total=
+    with the bytes of the chunk as body (see assets/chunked_upload.js).
+    """
+    @server.route("/dv-upload", methods=["POST"])
+    def upload_chunk():
+        try:
+            path = uploads.write_chunk(
+                request.args["id"], request.args["name"], int(request.args["offset"]), int(request.args["total"]),
+                request.stream)
+        except (KeyError, ValueError) as e:
+            return jsonify({"error": str(e)}), 409
+        return jsonify({"done": path is not None})
 
 
 @callback(
     Output("dv-file-list-selector", "options"),
     Output("dv-clear-list", "n_clicks"),
-    [Input("dv-upload-data", "filename"),
-     Input("dv-upload-data", "contents"),
+    [Input("dv-upload-done", "n_clicks"),
      Input("dv-clear-list", "n_clicks")],
 )
-def update_file_list(uploaded_filenames, uploaded_file_contents, n_clicks):
-    if uploaded_filenames is not None and uploaded_file_contents is not None:
-        for name, data in zip(uploaded_filenames, uploaded_file_contents):
-            save_file(name, data)
-
-    files = uploaded_files()
+def update_file_list(upload_n_clicks, n_clicks):
     if n_clicks is not None:
         if n_clicks > 0:
-            for filename in files:
-                os.remove(os.path.join(TEMPORARY_DIRECTORY, filename))
-            files = []
+            uploads.clear()
 
+    files = uploads.files()
     n_clicks = 0
     if len(files) == 0:
         return files, n_clicks
@@ -142,22 +151,43 @@ def update_file_list(uploaded_filenames, uploaded_file_contents, n_clicks):
         return options, n_clicks
 
 
-def update_table(file_path, delim):
+def update_table(file_path, delim, page_current, page_size, sort_by, filter_query):
     if file_path and delim:
-        df = pd.read_csv(file_path, sep=delim)
-        data = df.to_dict('records')
+        #   the whole table stays on the server (parsed once, see core.cache), the browser gets one page :
+        #   pinned, it is neither parsed nor sorted again at each page turn, however big it is
+        df = core.cache.tables.get(file_path, pin="data_viewer", sep=delim)
+        uploads.touch(file_path)
+        df_page, page_count = core.paging.pager.page(df, page_current, page_size, sort_by, filter_query)
+        data = df_page.to_dict('records')
         columns = [{"name": i, "id": i} for i in df.columns]
-        return data, columns
-    return None, None
+        return data, columns, page_count
+    return None, None, None
 
 
 @callback(
     [Output('dv-dataframe', 'data'),
-     Output('dv-dataframe', 'columns')],
+     Output('dv-dataframe', 'columns'),
+     Output('dv-dataframe', 'page_count'),
+     Output('dv-dataframe', 'page_current'),
+     Output('dv-dataframe', 'sort_by'),
+     Output('dv-dataframe', 'filter_query')],
     [Input('dv-file-list-selector', 'value'),
-     Input('dv-delim-selector', 'value')]
+     Input('dv-delim-selector', 'value'),
+     Input('dv-dataframe', 'page_current'),
+     Input('dv-dataframe', 'page_size'),
+     Input('dv-dataframe', 'sort_by'),
+     Input('dv-dataframe', 'filter_query')]
 )
-def update_dataframe(file_path, delim):
-    if file_path is not None and delim is not None:
-        return update_table(file_path, delim)
-    return [], []
+def update_dataframe(file_path, delim, page_current, page_size, sort_by, filter_query):
+    #   a new file (or delimiter) is shown from its first page, not sorted nor filtered
+    ctx = dash.callback_context
+    triggered_id = ctx.triggered[0]['prop_id'] if ctx.triggered else ''
+    if not triggered_id.startswith('dv-dataframe.'):
+        page_current, sort_by, filter_query = 0, [], ''
+        view = [page_current, sort_by, filter_query]
+    else:
+        view = [dash.no_update] * 3
+
+    if file_path is not None and delim is not None and os.path.isfile(file_path):
+        return [*update_table(file_path, delim, page_current, page_size, sort_by, filter_query), *view]
+    return [[], [], 1, *view]
@@ -2,10 +2,10 @@ import os
 import re
 import dash
 import json
+import time
 
 import pandas as pd
-from os.path import basename, join, isfile, isdir
-from shutil import copyfile
+from os.path import join, isfile
 import dash_bootstrap_components as dbc
 from dash import callback
 from dash import html, dcc, dash_table
@@ -20,10 +20,30 @@ import core.binning
 import core.statistics
 import core.weight
 import core.aggregated
+import core.store
+import core.jobs
+import core.catalog
 import utils
 
 from common import generate_data_table, prepare_dataframe_for_output
 
+#   the steps of the pipeline run in background processes, their output div shows the progress of the job
+_jobs = None
+
+
+def job_queue() -> core.jobs.JobQueue:
+    """
+    Queue of the pipeline jobs of the page, made at the first use (not at import) : its pool of processes
+    is only started at the first job submitted (see core.jobs.JobQueue).
+    """
+    global _jobs
+    if _jobs is None:
+        _jobs = core.jobs.JobQueue(max_workers=max(1, (os.cpu_count() or 2) // 2))
+    return _jobs
+
+
+JOB_SECTIONS = ['filter', 'coverage', 'orga-contacts', 'binning', 'stats', 'weight', 'aggregate']
+
 layout = dbc.Container([
 
     dbc.Row([
@@ -351,7 +371,39 @@ layout = dbc.Container([
                 ])
             ], style={'height': '240px'})
         )
-    ])
+    ], style={'margin-top': '0px', 'margin-bottom': '50px'}),
+
+    dbc.Row([
+        dbc.Col(
+            dbc.Card([
+                dbc.CardHeader("Run report"),
+                dbc.CardBody([
+                    dbc.Row([
+                        dbc.Col([
+                            html.Button(id="pp-run-report-button", className="blue-button", children="Refresh"),
+                            dbc.Tooltip("Time, memory, bytes read and written and rows of the tables read and "
+                                        "returned by each step of the last run of pipeline.py for this sample",
+                                        target="pp-run-report-button", className="custom-tooltip",
+                                        placement="right"),
+                        ], width=2, style={'margin-top': '0px', 'margin-bottom': '10px'}),
+
+                        dbc.Col([
+                            html.Div(id='pp-run-report-output', style={'margin-top': '10px', 'margin-bottom': '10px'}),
+                        ], width=10, style={'margin-top': '0px', 'margin-bottom': '10px'})
+                    ]),
+
+                    dbc.Row([
+                        dbc.Col([
+                            dcc.Loading(generate_data_table('pp-run-report-dataframe', [], [], 20))
+                        ], width=12, style={'margin-top': '0px', 'margin-bottom': '10px'})
+                    ]),
+                ])
+            ])
+        )
+    ], style={'margin-top': '0px', 'margin-bottom': '50px'}),
+
+    dcc.Interval(id='pp-jobs-interval', interval=1000),
+    *[dcc.Store(id=f'pp-{section}-job') for section in JOB_SECTIONS]
 ])
 
 
@@ -386,10 +438,7 @@ def display_samples_files(sample_id, data_basedir):
     if sample_id is None:
         return None
 
-    samples_dir = join(data_basedir, "samples")
-    current_samp_files = [
-        f for f in os.listdir(samples_dir) if isfile(join(samples_dir, f)) and sample_id.lower() in f.lower()
-    ]
+    current_samp_files = core.catalog.catalog(data_basedir).sample_files(sample_id)
     return html.Div([
         html.Label("Select a file : "),
         dcc.Dropdown(
@@ -441,7 +490,8 @@ def update_current_sample_paths(sample_file, data_basedir, sample_id):
      State('pp-chr-coords', 'value'),
      State('pp-reference-selector', 'value'),
      State('pp-current-sample-out-dir-path', 'data'),
-     State('pp-current-sample-in-dir-path', 'data')]
+     State('pp-current-sample-in-dir-path', 'data'),
+     State('data-basedir', 'data')]
 )
 def copy_input_files(
         n_clicks,
@@ -451,7 +501,8 @@ def copy_input_files(
         chr_coords_file,
         reference_file,
         sample_out_dir,
-        sample_in_dir
+        sample_in_dir,
+        data_basedir
 ):
     if n_clicks is None or n_clicks == 0:
         return None
@@ -470,12 +521,11 @@ def copy_input_files(
         if sample_matrix is not None:
             files_to_copy.append(sample_matrix)
 
-        for file in files_to_copy:
-            copyfile(file, join(sample_in_dir, basename(file)))
-
         if reference_file is not None:
-            reference_file_name = basename(reference_file)
-            copyfile(reference_file, join(sample_in_dir, reference_file_name))
+            files_to_copy.append(reference_file)
+
+        #   linked from the content addressed store of the outputs (see core.store), not copied
+        core.store.link_inputs(files_to_copy, join(data_basedir, "outputs", "inputs_store"), sample_in_dir)
         return 0
 
 
@@ -490,13 +540,13 @@ def copy_input_files(
 def update_dropdowns(data_basedir):
     if data_basedir is None:
         return [], [], [], [], []
+    catalog = core.catalog.catalog(data_basedir)
     inputs_dir = join(data_basedir, "inputs")
-    inputs_files = sorted([f for f in os.listdir(inputs_dir) if isfile(join(inputs_dir, f))],
-                          key=lambda x: x.lower())
+    inputs_files = sorted(catalog.files("inputs"), key=lambda x: x.lower())
     options = [{'label': f, 'value': join(inputs_dir, f)} for f in inputs_files]
 
     reference_dir = join(data_basedir, "references")
-    references = sorted([f for f in os.listdir(reference_dir) if isfile(join(reference_dir, f))])
+    references = catalog.files("references")
     ref_options = [{'label': f, 'value': join(reference_dir, f)} for f in references]
     return options, options, options, options, ref_options
 
@@ -550,7 +600,7 @@ def probe_groups(groups_file):
 
 @callback(
     [Output('pp-filter-button', 'n_clicks'),
-     Output('pp-filter-output', 'children')],
+     Output('pp-filter-job', 'data')],
     [Input('pp-filter-button', 'n_clicks')],
     [State('pp-current-sample-out-dir-path', 'data'),
      State('pp-current-sample-id', 'data'),
@@ -564,55 +614,60 @@ def filter_contacts(n_clicks, output_dir, sample_id, sparse_matrix, fragments_fi
         return 0, dash.no_update
 
     if sample_id is None:
-        return 0, "You have to select a sample first"
+        return 0, {"message": "You have to select a sample first"}
 
     pattern = re.compile(r'.+_filtered\.tsv')
     if n_clicks == 1:
         if output_dir is None:
-            return dash.no_update, "You have to select a sample first"
+            return dash.no_update, {"message": "You have to select a sample first"}
         for file in os.listdir(output_dir):
             if pattern.match(file):
-                return n_clicks, "Filtered contacts file already exists (click again to overwrite)"
+                return n_clicks, {"message": "Filtered contacts file already exists (click again to overwrite)"}
 
     if fragments_file is None:
-        return 0, "Select a digested fragments file"
+        return 0, {"message": "Select a digested fragments file"}
     if oligos_file is None:
-        return 0, "Select a capture oligos file"
+        return 0, {"message": "Select a capture oligos file"}
 
-    core.filter.filter_contacts(oligos_file, fragments_file, sparse_matrix, output_dir)
-    return 0, "Filtered contacts file created successfully"
+    job_id = job_queue().submit(
+        "Filter", [(core.filter.filter_contacts, [oligos_file, fragments_file, sparse_matrix, output_dir], {})],
+        sample=sample_id, message="Filtered contacts file created successfully")
+    return 0, {"job": job_id}
 
 
 @callback(
     [Output('pp-coverage-button', 'n_clicks'),
-     Output('pp-coverage-output', 'children')],
+     Output('pp-coverage-job', 'data')],
     [Input('pp-coverage-button', 'n_clicks')],
     [State('pp-current-sample-out-dir-path', 'data'),
+     State('pp-current-sample-id', 'data'),
      State('pp-current-sample-file-path', 'data'),
      State('pp-fragments-selector', 'value')]
 )
-def compute_cover(n_clicks, output_dir, sparse_matrix, fragments_file):
+def compute_cover(n_clicks, output_dir, sample_id, sparse_matrix, fragments_file):
     if n_clicks is None or n_clicks == 0:
         return 0, dash.no_update
 
     pattern = re.compile(r'.+_coverage_')
     if n_clicks == 1:
         if output_dir is None:
-            return dash.no_update, "You have to select a sample first"
+            return dash.no_update, {"message": "You have to select a sample first"}
         for file in os.listdir(output_dir):
             if pattern.match(file):
-                return n_clicks, "Coverage bed-graph file already exists (click again to overwrite)"
+                return n_clicks, {"message": "Coverage bed-graph file already exists (click again to overwrite)"}
 
     if fragments_file is None:
-        return 0, "Select a digested fragments file"
+        return 0, {"message": "Select a digested fragments file"}
 
-    core.coverage.coverage(sparse_matrix, fragments_file, output_dir)
-    return 0, "Coverage file created successfully"
+    job_id = job_queue().submit(
+        "Coverage", [(core.coverage.coverage, [sparse_matrix, fragments_file, output_dir], {})],
+        sample=sample_id, message="Coverage file created successfully")
+    return 0, {"job": job_id}
 
 
 @callback(
     [Output('pp-orga-contacts-button', 'n_clicks'),
-     Output('pp-orga-contacts-output', 'children')],
+     Output('pp-orga-contacts-job', 'data')],
     [Input('pp-orga-contacts-button', 'n_clicks'),
      State('pp-current-sample-out-dir-path', 'data'),
      State('pp-current-sample-id', 'data'),
@@ -625,7 +680,7 @@ def fragment_contacts(n_clicks, sample_output_dir, sample_id, oligos_file, chr_c
         return 0, dash.no_update
 
     if sample_id is None:
-        return 0, "You need to select a sample first"
+        return 0, {"message": "You need to select a sample first"}
 
     output_dir = join(sample_output_dir, 'not_weighted')
     if not os.path.exists(output_dir):
@@ -633,20 +688,23 @@ def fragment_contacts(n_clicks, sample_output_dir, sample_id, oligos_file, chr_c
 
     filtered_sample = join(sample_output_dir, f"{sample_id}_filtered.tsv")
     if filtered_sample is None:
-        return 0, "You need to filter the sample first"
+        return 0, {"message": "You need to filter the sample first"}
     if oligos_file is None:
-        return 0, "Select a capture oligos file"
+        return 0, {"message": "Select a capture oligos file"}
     if chr_coords is None:
-        return 0, "Select a chromosome coordinates file"
+        return 0, {"message": "Select a chromosome coordinates file"}
 
     pattern = re.compile(r'.+_unbinned_contacts')
     if n_clicks == 1:
         for file in os.listdir(output_dir):
             if pattern.match(file):
-                return n_clicks, "Contacts file already exists (click again to overwrite)"
+                return n_clicks, {"message": "Contacts file already exists (click again to overwrite)"}
 
-    core.fragments.organize_contacts(filtered_sample, oligos_file, chr_coords, output_dir, groups_file)
-    return 0, "Contacts file created successfully"
+    job_id = job_queue().submit(
+        "Organize contacts",
+        [(core.fragments.organize_contacts, [filtered_sample, oligos_file, chr_coords, output_dir, groups_file], {})],
+        sample=sample_id, message="Contacts file created successfully")
+    return 0, {"job": job_id}
 
 
 @callback(
@@ -689,7 +747,7 @@ def update_bins_list(delete_n_clicks_list, n_submit, input_value, stored_numbers
 
 @callback(
     [Output('pp-binning-button', 'n_clicks'),
-     Output('pp-binning-output', 'children')],
+     Output('pp-binning-job', 'data')],
     [Input('pp-binning-button', 'n_clicks'),
      State('pp-stored-bins', 'data'),
      State('pp-current-sample-out-dir-path', 'data'),
@@ -703,32 +761,37 @@ def make_rebin(n_clicks, bins_list, sample_output_dir, sample_id, oligos_file, c
     if n_clicks is None or n_clicks == 0:
         return 0, dash.no_update
     if sample_id is None:
-        return 0, "You need to select a sample first"
+        return 0, {"message": "You need to select a sample first"}
     if oligos_file is None:
-        return 0, "Select a capture oligos file"
+        return 0, {"message": "Select a capture oligos file"}
     if chr_coords is None:
-        return 0, "Select a chromosome coordinates file"
+        return 0, {"message": "Select a chromosome coordinates file"}
     if len(bins_list) == 0:
-        return 0, "Select at least one bin size (in kb)"
+        return 0, {"message": "Select at least one bin size (in kb)"}
 
     unbinned_contacts = join(sample_output_dir, 'not_weighted', f"{sample_id}_unbinned_contacts.tsv")
     if not os.path.exists(unbinned_contacts):
-        return 0, "You need to create fragment contacts tables (unbinned) first"
+        return 0, {"message": "You need to create fragment contacts tables (unbinned) first"}
     output_dir = join(sample_output_dir, 'not_weighted')
     if not os.path.exists(output_dir):
         os.makedirs(output_dir)
 
     if n_clicks == 1:
-        for bin_kb in bins_list:
-            bin_bp = int(bin_kb) * 1000
-            core.binning.rebin_contacts(unbinned_contacts, chr_coords, oligos_file, bin_bp, output_dir, groups_file)
-
-    return 0, "Binned contacts files created successfully"
+        #   one step per bin size, to follow the progress
+        steps = [
+            (core.binning.rebin_contacts,
+             [unbinned_contacts, chr_coords, oligos_file, int(bin_kb) * 1000, output_dir, groups_file], {})
+            for bin_kb in bins_list
+        ]
+        job_id = job_queue().submit(
+            "Binning", steps, sample=sample_id, message="Binned contacts files created successfully")
+        return 0, {"job": job_id}
+    return 0, dash.no_update
 
 
 @callback(
     [Output('pp-stats-button', 'n_clicks'),
-     Output('pp-stats-output', 'children')],
+     Output('pp-stats-job', 'data')],
     [Input('pp-stats-button', 'n_clicks')],
     [State('pp-current-sample-out-dir-path', 'data'),
      State('pp-current-sample-id', 'data'),
@@ -741,11 +804,11 @@ def make_statistics(n_clicks, sample_output_dir, sample_id, sample_path, oligos_
     if n_clicks is None or n_clicks == 0:
         return 0, dash.no_update
     if sample_id is None or sample_path is None:
-        return 0, "You need to select a sample first"
+        return 0, {"message": "You need to select a sample first"}
     if oligos_file is None:
-        return 0, "Select a capture oligos file"
+        return 0, {"message": "Select a capture oligos file"}
     if cis_range < 0:
-        return 0, "Cis range must be positive integer"
+        return 0, {"message": "Cis range must be positive integer"}
 
     output_dir = sample_output_dir
     sparse_matrix = sample_path
@@ -755,41 +818,45 @@ def make_statistics(n_clicks, sample_output_dir, sample_id, sample_path, oligos_
 
     if n_clicks == 1:
         if global_stats in os.listdir(output_dir):
-            return n_clicks, "Statistics file already exists (click again to overwrite)"
+            return n_clicks, {"message": "Statistics file already exists (click again to overwrite)"}
 
-    core.statistics.get_stats(unbinned_contacts, sparse_matrix, oligos_file, output_dir, cis_range)
+    steps = [(core.statistics.get_stats, [unbinned_contacts, sparse_matrix, oligos_file, output_dir, cis_range], {})]
+    message = "Statistics files created successfully"
     if reference is not None:
         ref_name = reference.split('/')[-1].split('.')[0]
-        core.statistics.compare_to_wt(global_stats, reference, ref_name)
+        steps.append((core.statistics.compare_to_wt, [global_stats, reference, ref_name], {}))
+        message = "Statistics files created successfully and compared to wild type reference"
 
-        return 0, "Statistics files created successfully and compared to wild type reference"
-    return 0, "Statistics files created successfully"
+    job_id = job_queue().submit("Statistics", steps, sample=sample_id, message=message)
+    return 0, {"job": job_id}
 
 
 @callback(
     [Output('pp-weight-button', 'n_clicks'),
-     Output('pp-weight-output', 'children')],
+     Output('pp-weight-job', 'data')],
     [Input('pp-weight-button', 'n_clicks')],
     [State('pp-current-sample-out-dir-path', 'data'),
      State('pp-current-sample-id', 'data'),
      State('pp-reference-selector', 'value'),
-     State('pp-probe-groups', 'value')]
+     State('pp-probe-groups', 'value'),
+     State('data-basedir', 'data')]
 )
-def make_statistics(n_clicks, sample_output_dir, sample_id, reference, groups_file):
+def make_weight(n_clicks, sample_output_dir, sample_id, reference, groups_file, data_basedir):
     if n_clicks is None or n_clicks == 0:
         return 0, dash.no_update
     if sample_id is None:
-        return 0, "You need to select a sample first"
+        return 0, {"message": "You need to select a sample first"}
     if reference is None:
-        return 0, "You need first to select a reference WT to weight with"
+        return 0, {"message": "You need first to select a reference WT to weight with"}
 
     global_stats = join(sample_output_dir, f"{sample_id}_global_statistics.tsv")
     ref_name = reference.split('/')[-1].split('.')[0]
 
     not_weighted_dir = join(sample_output_dir, 'not_weighted')
     weighted_dir = join(sample_output_dir, f'weighted_{ref_name}')
-    binned_contacts_list = [f for f in os.listdir(not_weighted_dir) if '_binned_contacts' in f]
-    binned_frequencies_list = [f for f in os.listdir(not_weighted_dir) if '_binned_frequencies' in f]
+    not_weighted_files = core.catalog.catalog(data_basedir).files(os.path.relpath(not_weighted_dir, data_basedir))
+    binned_contacts_list = [f for f in not_weighted_files if '_binned_contacts' in f]
+    binned_frequencies_list = [f for f in not_weighted_files if '_binned_frequencies' in f]
     unbinned_contacts = join(not_weighted_dir, f"{sample_id}_unbinned_contacts.tsv")
     unbinned_frequencies = join(not_weighted_dir, f"{sample_id}_unbinned_frequencies.tsv")
 
@@ -797,28 +864,114 @@ def make_statistics(n_clicks, sample_output_dir, sample_id, reference, groups_fi
         if not os.path.exists(weighted_dir):
             os.makedirs(weighted_dir)
 
-        core.weight.weight_mutant(
-            global_stats, ref_name, unbinned_contacts, unbinned_frequencies,
-            "unbinned", weighted_dir, groups_file)
+        steps = [(core.weight.weight_mutant,
+                  [global_stats, ref_name, unbinned_contacts, unbinned_frequencies,
+                   "unbinned", weighted_dir, groups_file], {})]
 
         for binned_c, binned_f in zip(binned_contacts_list, binned_frequencies_list):
             bin_suffix = re.search(r'(\d+)kb', binned_c).group(1) + 'kb'
-            core.weight.weight_mutant(
-                global_stats, ref_name, join(not_weighted_dir, binned_c), join(not_weighted_dir, binned_f),
-                f"{bin_suffix}_binned", weighted_dir, groups_file)
+            steps.append((core.weight.weight_mutant,
+                          [global_stats, ref_name, join(not_weighted_dir, binned_c), join(not_weighted_dir, binned_f),
+                           f"{bin_suffix}_binned", weighted_dir, groups_file], {}))
+
+        job_id = job_queue().submit("Weight", steps, sample=sample_id, message="Weighted files created successfully")
+        return 0, {"job": job_id}
+
+
+@callback(
+    [Output('pp-aggregate-button', 'n_clicks'),
+     Output('pp-aggregate-job', 'data')],
+    [Input('pp-aggregate-button', 'n_clicks')],
+    [State('pp-current-sample-id', 'data'),
+     State('pp-aggr-weight-selector', 'value'),
+     State('pp-aggr-on-selector', 'value'),
+     State('pp-aggr-window', 'value'),
+     State('pp-aggr-chr-exclusion-selector', 'value'),
+     State('pp-aggr-self-chr-checkbox', 'value'),
+     State('pp-aggr-inter-norm-checkbox', 'value'),
+     State('pp-aggr-plot-checkbox', 'value'),
+     State('pp-oligo-selector', 'value'),
+     State('pp-chr-coords', 'value'),
+     State('pp-probe-groups', 'value')]
+)
+def make_aggregate(n_clicks, sample_id, weight_dir, on, window, excluded_chr, self_chr, inter_norm, plot,
+                   oligos_file, chr_coords, groups_file):
+    if n_clicks is None or n_clicks == 0:
+        return 0, dash.no_update
+    if sample_id is None:
+        return 0, {"message": "You need to select a sample first"}
+    if weight_dir is None:
+        return 0, {"message": "Select the (not) weighted contacts to aggregate"}
+    if on is None:
+        return 0, {"message": "Select centromeres or telomeres"}
+    if not window:
+        return 0, {"message": "Specify the window region (in bp)"}
+    if oligos_file is None:
+        return 0, {"message": "Select a capture oligos file"}
+    if chr_coords is None:
+        return 0, {"message": "Select a chromosome coordinates file"}
+
+    binned_10kb = join(weight_dir, f"{sample_id}_10kb_binned_frequencies.tsv")
+    binned_1kb = join(weight_dir, f"{sample_id}_1kb_binned_frequencies.tsv")
+    if not os.path.exists(binned_10kb) or not os.path.exists(binned_1kb):
+        return 0, {"message": "You need to bin (and weight) the contacts at 10 kb and 1 kb first"}
+
+    kwargs = dict(
+        binned_10kb_contacts_path=binned_10kb,
+        binned_1kb_contacts_path=binned_1kb,
+        centros_coord_path=chr_coords,
+        oligos_path=oligos_file,
+        window_size=int(window),
+        on=on,
+        output_dir=weight_dir,
+        excluded_chr_list=excluded_chr or None,
+        exclude_probe_chr='checked' in self_chr,
+        additional_path=groups_file,
+        inter_normalization='checked' in inter_norm,
+        plot='checked' in plot)
+    job_id = job_queue().submit("Aggregate", [(core.aggregated.aggregate, [], kwargs)], sample=sample_id,
+                                message=f"Aggregated contacts around {on} created successfully")
+    return 0, {"job": job_id}
+
 
-        return 0, "Weighted files created successfully"
+@callback(
+    [Output(f'pp-{section}-output', 'children') for section in JOB_SECTIONS],
+    [Input('pp-jobs-interval', 'n_intervals')],
+    [Input(f'pp-{section}-job', 'data') for section in JOB_SECTIONS]
+)
+def display_jobs(n_intervals, *jobs_data):
+    """
+    Shows the status of the last job of each section, polled every second while it runs.
+    """
+    ctx = dash.callback_context
+    polled = ctx.triggered and ctx.triggered[0]['prop_id'].startswith('pp-jobs-interval')
+    outputs = []
+    for data in jobs_data:
+        if data is None:
+            outputs.append(None)
+        elif data.get("job") is None:
+            outputs.append(dash.no_update if polled else data["message"])
+        else:
+            job = job_queue().status(data["job"])
+            if polled and job is not None and job["status"] in ("done", "failed") and job["finished"] < time.time() - 2:
+                #   already shown as finished
+                outputs.append(dash.no_update)
+            else:
+                outputs.append(job_queue().describe(data["job"]))
+    return outputs
 
 
 @callback(
     [Output('pp-aggr-weight-selector', 'options')],
-    [Input('pp-current-sample-out-dir-path', 'data')]
+    [Input('pp-current-sample-out-dir-path', 'data')],
+    [State('data-basedir', 'data')]
 )
-def update_aggr_weight_selector(sample_output_dir):
-    if sample_output_dir is None:
+def update_aggr_weight_selector(sample_output_dir, data_basedir):
+    if sample_output_dir is None or data_basedir is None:
         return dash.no_update
 
-    weighted_dirs = [d for d in os.listdir(sample_output_dir) if 'weighted' in d and isdir(join(sample_output_dir, d))]
+    sample_dirs = core.catalog.catalog(data_basedir).dirs(os.path.relpath(sample_output_dir, data_basedir))
+    weighted_dirs = [d for d in sample_dirs if 'weighted' in d]
     options = [{'label': d, 'value': join(sample_output_dir, d)} for d in weighted_dirs]
     return [options]
 
@@ -836,3 +989,38 @@ def update_aggr_chr_exclusion_selector(chr_coords):
     options = [{'label': c, 'value': c} for c in chr_list]
     return [options]
 
+
+@callback(
+    [Output('pp-run-report-output', 'children'),
+     Output('pp-run-report-dataframe', 'data'),
+     Output('pp-run-report-dataframe', 'columns')],
+    [Input('pp-run-report-button', 'n_clicks'),
+     Input('pp-current-sample-out-dir-path', 'data')],
+    [State('pp-current-sample-id', 'data')]
+)
+def display_run_report(n_clicks, sample_output_dir, sample_id):
+    if sample_output_dir is None or sample_id is None:
+        return None, [], []
+
+    report_path = join(sample_output_dir, f"{sample_id}_run_report.json")
+    if not isfile(report_path):
+        return "No run report for this sample (run pipeline.py first)", [], []
+
+    with open(report_path, 'r') as f:
+        report = json.load(f)
+
+    df_stages = pd.DataFrame(report["stages"]).drop(columns=["inputs", "outputs"])
+    for col in ["wall_time", "cpu_time"]:
+        if col in df_stages.columns:
+            df_stages[col] = df_stages[col].round(3)
+    for col in ["peak_rss", "bytes_in", "bytes_out"]:
+        if col in df_stages.columns:
+            df_stages[col] = (df_stages[col] / 1024 ** 2).round(1)
+            df_stages.rename(columns={col: col + " (MB)"}, inplace=True)
+    df_stages.rename(columns={"wall_time": "wall_time (s)", "cpu_time": "cpu_time (s)"}, inplace=True)
+
+    total = report["total"]
+    message = f"{total['stages_run']} steps run ({total['stages_up_to_date']} up to date) in " \
+              f"{total['wall_time']:.1f} s, peak memory {total['peak_rss'] / 1024 ** 2:.0f} MB"
+    data, columns = prepare_dataframe_for_output(df_stages)
+    return message, data, columns
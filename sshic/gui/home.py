@@ -1,12 +1,13 @@
 import os
 import dash
-import numpy as np
 from os.path import join, dirname
 from dash import html, dcc
 from dash import callback
 import dash_bootstrap_components as dbc
 from dash.dependencies import Input, Output
 
+import core.catalog
+
 
 layout = html.Div([
     dbc.Container([
@@ -89,8 +90,7 @@ layout = html.Div([
 )
 def update_samples_checklist(data_value, search_value):
     if data_value:
-        samples_dir = join(data_value, "samples")
-        samples = sorted(np.unique([f.split("_")[0] for f in os.listdir(samples_dir)]))
+        samples = core.catalog.catalog(data_value).samples()
         if search_value:
             samples = [s for s in samples if search_value in s]
         return [{'label': s, 'value': s} for s in samples]
@@ -4,7 +4,6 @@ import numpy as np
 import dash
 import json
 from os.path import join
-from os import listdir
 from dash import html
 from dash import dcc
 from dash import callback
@@ -14,6 +13,10 @@ import plotly.graph_objs as go
 
 from common import generate_data_table, prepare_dataframe_for_output
 import core.utils
+import core.cache
+import core.catalog
+from core.downsampling import minmax_downsample
+from core.pyramid import read_pyramid
 
 colors = [
     'rgba(0, 0, 255, 0.8)',  # blue
@@ -48,6 +51,12 @@ chr_pos = [230218, 813184, 316620, 1531933, 576874, 270161, 1090940, 562643, 439
 chr_colors = ['#000000', '#0c090a', '#2c3e50', '#34495e', '#7f8c8d', '#8e44ad', '#2ecc71', '#2980b9',
               '#f1c40f', '#d35400', '#e74c3c', '#c0392b', '#1abc9c', '#16a085', '#bdc3c7', '#2c3e50',
               '#7f8c8d', '#f39c12', '#27ae60']
+chr_boundaries = [0] + list(np.cumsum(chr_pos))[:-1]
+
+#   width of the figures, and of their plot area in pixels (x axis domain [0, 0.9]) :
+#   the traces are downsampled to about two points per pixel of the range shown
+figure_width = 1500
+plot_width = int(figure_width * 0.9)
 
 layout = dbc.Container([
     dbc.Row([
@@ -143,6 +152,7 @@ layout = dbc.Container([
     ]),
 
     dcc.Store(id='pv-stored-graphs-axis-range', data={}),
+    dcc.Store(id='pv-graphs-info', data={}),
     html.Div(id='pv-dynamic-probes-cards', children=[], style={'margin-top': '20px', 'margin-bottom': '20px'}),
     html.Div(id='pv-graphs', children=[], style={'margin-top': '20px', 'margin-bottom': '20px'}),
 ])
@@ -157,8 +167,7 @@ def update_oligo_selector(data_basedir):
     if data_basedir is None:
         return [], []
     inputs_dir = join(data_basedir, 'inputs')
-    inputs_files = sorted([f for f in listdir(inputs_dir) if os.path.isfile(join(inputs_dir, f))],
-                          key=lambda x: x.lower())
+    inputs_files = sorted(core.catalog.catalog(data_basedir).files('inputs'), key=lambda x: x.lower())
 
     options = [{'label': f, 'value': join(inputs_dir, f)} for f in inputs_files]
     return options, options
@@ -204,9 +213,35 @@ def display_df_probe_groups(groups_file):
     Output('pv-slider-output-container', 'children'),
     [Input('pv-binning-slider', 'value')])
 def update_output(value):
+    if value == 0:
+        return 'No binning : the resolution follows the zoom'
     return f'You have selected a binning of {value} kb'
 
 
+@callback(
+    Output('pv-binning-slider', 'marks'),
+    Input({'type': 'weight-checkboxes', 'index': ALL}, 'value'),
+    State({'type': 'sample-dropdown', 'index': ALL}, 'value'),
+    State({'type': 'pcr-checkboxes', 'index': ALL}, 'value'),
+    State('data-basedir', 'data')
+)
+def update_binning_marks(weight_values, samples_values, pcr_values, data_basedir):
+    #   the bin sizes available for all the probes selected (see core.catalog), 0 being always there
+    marks = {i: str(i) for i in range(0, 101, 10)}
+    if data_basedir is None:
+        return marks
+    catalog = core.catalog.catalog(data_basedir)
+    available = None
+    for sample, pcr, weight in zip(samples_values, pcr_values, weight_values):
+        if not sample or not pcr or not weight:
+            continue
+        sizes = {b // 1000 for b in catalog.bin_sizes(sample, pcr[-1], weight[-1])}
+        available = sizes if available is None else available & sizes
+    if available is None:
+        return marks
+    return {0: '0', **{b: f"{b}" for b in sorted(available) if b <= 100}}
+
+
 def create_card(
         index,
         sample_options,
@@ -299,9 +334,7 @@ def update_probes_cards(n_cards, data_basedir, cards_children):
     if n_cards is None or n_cards == 0:
         return []
 
-    pp_outputs_dir = join(data_basedir, 'outputs')
-    all_samples_items = sorted(listdir(pp_outputs_dir))
-    samples_options = [{'label': s, 'value': s} for s in all_samples_items if os.path.isdir(join(pp_outputs_dir, s))]
+    samples_options = [{'label': s, 'value': s} for s in core.catalog.catalog(data_basedir).output_samples()]
     graph_options = [{'label': f'graph {x}', 'value': f'graph {x}'} for x in range(n_cards)]
 
     existing_cards = []
@@ -357,12 +390,10 @@ def update_probes_cards(n_cards, data_basedir, cards_children):
     State('data-basedir', 'data')
 )
 def update_pcr_checkboxes_options(sample_value, data_basedir):
-    pp_outputs_dir = join(data_basedir, 'outputs')
     if sample_value is None:
         return []
-    all_items = listdir(join(pp_outputs_dir, sample_value))
-    pcr_dirs = [item for item in all_items if os.path.isdir(join(pp_outputs_dir, sample_value, item))]
-    return [{'label': d, 'value': d} for d in pcr_dirs if 'pcr' in d.lower()]
+    pcr_dirs = core.catalog.catalog(data_basedir).pcr_dirs(sample_value)
+    return [{'label': d, 'value': d} for d in pcr_dirs]
 
 
 @callback(
@@ -388,12 +419,10 @@ def update_weight_checkboxes_options(pcr_value, sample_value, data_basedir):
     if triggerd_input == '':
         return []
 
-    pp_outputs_dir = join(data_basedir, 'outputs')
     if not sample_value or not pcr_value or pcr_value == []:
         return []
 
-    pcr_dir = join(pp_outputs_dir, sample_value, pcr_value[-1])
-    weight_dirs = [w for w in listdir(pcr_dir) if os.path.isdir(join(pcr_dir, w))]
+    weight_dirs = core.catalog.catalog(data_basedir).weight_dirs(sample_value, pcr_value[-1])
     return [{'label': d, 'value': d} for d in weight_dirs]
 
 
@@ -421,15 +450,13 @@ def update_probe_dropdown_options(weight_value, sample_value, pcr_value, data_ba
     if triggerd_input == '':
         return []
 
-    pp_outputs_dir = join(data_basedir, 'outputs')
     if sample_value is None:
         return []
     if pcr_value is None or pcr_value == [] or weight_value is None or weight_value == []:
         return []
 
-    items_dir = join(pp_outputs_dir, sample_value, pcr_value[-1], weight_value[-1])
-    df = pd.read_csv(join(items_dir, f"{sample_value}_unbinned_contacts.tsv"), sep='\t')
-    probes = [c for c in df.columns if c not in ['chr', 'start', 'sizes', 'genome_start', 'end']]
+    #   listed by the pipeline in the index of the directory (see core.catalog)
+    probes = core.catalog.catalog(data_basedir).probes(sample_value, pcr_value[-1], weight_value[-1])
     return [{'label': f, 'value': f} for f in probes]
 
 
@@ -467,14 +494,29 @@ def update_figure(
         pcr = graph_dict['pcr'][j]
         weight = graph_dict['weight'][j]
         filepath = graph_dict['filepaths'][j]
-        df = pd.read_csv(filepath, sep='\t')
-
+        name = f"{samp} - {frag} - {pcr} - {weight}"
         x_col = "genome_bins" if binning > 0 else "genome_start"
+
+        profile = None
+        pyramid_path = join(os.path.dirname(filepath), f"{samp}_frequencies_pyramid.npz")
+        if binning == 0 and os.path.exists(pyramid_path) and \
+                os.path.getmtime(pyramid_path) >= os.path.getmtime(filepath):
+            #   only the tiles of the range shown, at the resolution of the zoom (see core.pyramid)
+            profile = read_pyramid(pyramid_path, frag, plot_width, x_range)
+        if profile is not None:
+            x, y, resolution = profile
+            name += f" ({resolution} bp bins)"
+        else:
+            #   parsed once, then read from memory for the next plots and zooms
+            df = core.cache.tables.get(filepath, columns=[x_col, frag], sep='\t')
+            #   only the lowest and highest points of each pixel column of the x range shown are sent
+            x, y = minmax_downsample(df[x_col].to_numpy(), df[frag].to_numpy(), plot_width, x_range)
+
         fig.add_trace(
             go.Scattergl(
-                x=df[x_col],
-                y=df[frag],
-                name=f"{samp} - {frag} - {pcr} - {weight}",
+                x=x,
+                y=y,
+                name=name,
                 mode='lines+markers',
                 line=dict(width=1, color=traces_colors[trace_id]),
                 marker=dict(size=4)
@@ -482,7 +524,7 @@ def update_figure(
         )
 
         fig.update_layout(
-            width=1500,
+            width=figure_width,
             height=500,
             title=f"Graphe {graph_id}",
             xaxis=dict(domain=[0.0, 0.9], title="Genome bins"),
@@ -523,6 +565,7 @@ def update_figure(
 
 @callback(
     Output('pv-graphs', 'children'),
+    Output('pv-graphs-info', 'data'),
     Input('pv-plot-buttom', 'n_clicks'),
     Input('pv-stored-graphs-axis-range', 'data'),
     State('pv-binning-slider', 'value'),
@@ -548,7 +591,7 @@ def update_graphs(
     triggerd_input = ctx.triggered[0]['prop_id'].split('.')[0]
 
     if n_clicks is None or n_clicks == 0:
-        return None
+        return None, {}
 
     pp_outputs_dir = join(data_basedir, 'outputs')
     graphs_info = {}
@@ -592,17 +635,15 @@ def update_graphs(
 
     # TODO: use a file that stores chr data
 
-    chr_cum_pos = list(np.cumsum(chr_pos))
-    chr_boundaries = [0] + chr_cum_pos[:-1]
-
     figures = {}
     traces_count = 0
     for i in graphs_info:
         traces_to_add = graphs_info[i]['size']
+        graphs_info[i]['colors'] = colors[traces_count:traces_count+traces_to_add]
         figures[i] = update_figure(
             graph_id=i,
             graph_dict=graphs_info[i],
-            traces_colors=colors[traces_count:traces_count+traces_to_add],
+            traces_colors=graphs_info[i]['colors'],
             binning=binning_value,
             chr_boundaries=chr_boundaries,
             x_range=x_range,
@@ -618,7 +659,47 @@ def update_graphs(
                       style={'height': 'auto', 'width': '100%'},
                       figure=figures[i])
         )
-    return graphs_layout
+    return graphs_layout, {'binning': binning_value, 'graphs': graphs_info}
+
+
+@callback(
+    Output({'type': 'graph', 'index': MATCH}, 'figure'),
+    Input({'type': 'graph', 'index': MATCH}, 'relayoutData'),
+    State('pv-graphs-info', 'data'),
+    State('pv-sync-box', 'value'),
+    prevent_initial_call=True
+)
+def update_graph_resolution(relayout_data, graphs_info, sync_value):
+    """
+    Plots again the graph zoomed in (or out), with the points of the new x range at full resolution
+    (see update_figure). With synced axis, all the graphs are plotted again by update_graphs instead.
+    """
+    if sync_value or not relayout_data or not graphs_info:
+        return dash.no_update
+
+    if 'xaxis.range[0]' in relayout_data:
+        x_range = [relayout_data['xaxis.range[0]'], relayout_data['xaxis.range[1]']]
+    elif relayout_data.get('xaxis.autorange'):
+        x_range = None
+    else:
+        return dash.no_update
+    y_range = None
+    if 'yaxis.range[0]' in relayout_data:
+        y_range = [relayout_data['yaxis.range[0]'], relayout_data['yaxis.range[1]']]
+
+    ctx = dash.callback_context
+    graph_id = json.loads(ctx.triggered[0]['prop_id'].split('.')[0])['index']
+    #   json keys of the stored dict are strings
+    graph_dict = graphs_info['graphs'][str(graph_id)]
+    return update_figure(
+        graph_id=graph_id,
+        graph_dict=graph_dict,
+        traces_colors=graph_dict['colors'],
+        binning=graphs_info['binning'],
+        chr_boundaries=chr_boundaries,
+        x_range=x_range,
+        y_range=y_range
+    )
 
 
 @callback(
@@ -1,10 +1,16 @@
 import os
-from os.path import join, dirname
+import sys
+import json
+import time
 import itertools
 import argparse
-import shutil
+import traceback
+import multiprocessing as mp
+from multiprocessing.connection import wait
+from contextlib import redirect_stdout, redirect_stderr
+from os.path import join, dirname
 import pandas as pd
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 from core.filter import filter_contacts
 from core.probe2fragment import associate_probes_to_fragments
@@ -14,6 +20,13 @@ from core.statistics import get_stats, compare_to_wt
 from core.binning import rebin_contacts
 from core.weight import weight_mutant
 from core.aggregated import aggregate
+from core.pyramid import build_pyramid
+from core.scheduler import Journal, Node, Scheduler, file_record
+from core.utils import TableWriter, write_table
+from core.instrumentation import batch_report, write_report
+from core.store import link_inputs
+#   the flat module, the one the core functions read the references with
+from utils import cache_references, read_reference
 
 
 class PathBundle:
@@ -34,6 +47,7 @@ class PathBundle:
             self.sample_output_dir = self.sample_dir
 
         self.sample_inputs_dir = join(self.sample_dir, "inputs")
+        self.store_dir = join(outputs_dir, "inputs_store")
         self.not_weighted_dir = join(self.sample_output_dir, "not_weighted")
 
         os.makedirs(self.sample_dir, exist_ok=True)
@@ -42,10 +56,15 @@ class PathBundle:
         os.makedirs(self.not_weighted_dir, exist_ok=True)
 
         self.filtered_contacts_input = join(self.sample_output_dir, self.samp_id + "_filtered.tsv")
-        self.cover = join(self.sample_output_dir, self.samp_id + "_coverage_per_fragment.bedgraph")
+        self.cover = join(self.sample_output_dir, self.samp_id + "_coverage_per_fragment_contacts.bedgraph")
+        self.cover_frequencies = join(self.sample_output_dir, self.samp_id + "_coverage_per_fragment_frequencies.bedgraph")
         self.unbinned_contacts_input = join(self.not_weighted_dir, self.samp_id+"_unbinned_contacts.tsv")
         self.unbinned_frequencies_input = join(self.not_weighted_dir, self.samp_id+"_unbinned_frequencies.tsv")
         self.global_statistics_input = join(self.sample_output_dir, f"{self.samp_id}_global_statistics.tsv")
+        self.manifest = join(self.sample_output_dir, f"{self.samp_id}_pipeline_manifest.json")
+        self.log = join(self.sample_output_dir, f"{self.samp_id}_pipeline.log")
+        self.report = join(self.sample_output_dir, f"{self.samp_id}_run_report.json")
+        self.journal = join(self.sample_output_dir, f"{self.samp_id}_checkpoints.jsonl")
 
         self.wt_references_path = []
         self.wt_references_name = []
@@ -68,17 +87,35 @@ class AggregateParams:
         self.excluded_chr_list = excluded_chr_list
 
 
-def check_and_run(output_path, func, *args):
-    if not os.path.exists(output_path):
-        func(*args)
-
+def statistics(
+    contacts_unbinned_path: str,
+    sparse_contacts_path: str,
+    oligos_path: str,
+    output_dir: str,
+    statistics_path: str,
+    wt_references_path: List[str],
+    wt_references_name: List[str],
+    sample_id: Optional[str] = None,
+    writer=None
+):
+    """
+    get_stats followed by the comparison to each wild type reference (compare_to_wt),
+    that adds a capture efficiency column in the statistics table. Returns the statistics table.
+    Without writer (files mode), each comparison reads the statistics table back from its file and rewrites it,
+    as the statistics script does, the table is handed over in memory otherwise.
+    """
+    df_stats, _, _ = get_stats(
+        contacts_unbinned_path, sparse_contacts_path, oligos_path, output_dir, sample_id=sample_id, writer=writer)
+    if writer is None:
+        for rp, rn in zip(wt_references_path, wt_references_name):
+            df_stats = compare_to_wt(statistics_path=statistics_path, reference_path=rp, wt_ref_name=rn)
+        return df_stats
 
-def copy_file(source_path, destination_path):
-    try:
-        shutil.copy(source_path, destination_path)
-        print(f"File {source_path.split('/')[-1]} copied successfully.")
-    except IOError as e:
-        print(f"Unable to copy file. Error: {e}")
+    for rp, rn in zip(wt_references_path, wt_references_name):
+        df_stats = compare_to_wt(statistics_path=df_stats, reference_path=rp, wt_ref_name=rn)
+    if wt_references_path:
+        write_table(df_stats, statistics_path, writer, sep='\t')
+    return df_stats
 
 
 def pipeline(
@@ -88,81 +125,137 @@ def pipeline(
     centromeres_coordinates_path: str,
     binning_size_list: List[int],
     aggregate_params: AggregateParams,
-    additional_groups: Optional[str] = None
+    additional_groups: Optional[str] = None,
+    in_memory: bool = False,
+    write_intermediate: bool = True,
+    resume: bool = False,
+    files_cache: Optional[Dict[str, dict]] = None
 ):
-    print(f" -- Sample {path_bundle.samp_id} -- \n")
+    """
+    Runs the steps of the pipeline for one sample (only the ones invalidated since the last run, see Scheduler).
 
-    copy_file(fragments_list_path, path_bundle.sample_inputs_dir)
-    copy_file(centromeres_coordinates_path, path_bundle.sample_inputs_dir)
-    copy_file(additional_groups, path_bundle.sample_inputs_dir)
-    copy_file(oligos_path, path_bundle.sample_inputs_dir)
-    copy_file(path_bundle.sample_sparse_file_path, path_bundle.sample_inputs_dir)
-    for rp in path_bundle.wt_references_path:
-        copy_file(rp, path_bundle.sample_inputs_dir)
+    With in_memory, the tables are handed over from one step to the next ones in memory and written in the
+    background. Without write_intermediate (only in memory), the filtered contacts table is not written at all.
 
-    print("\n")
+    The measures of each step (times, memory, bytes and rows read and written, see Scheduler.report)
+    are written in the run report of the sample (PathBundle.report).
 
-    print(f"Filter contacts \n")
-    check_and_run(
-        path_bundle.filtered_contacts_input, filter_contacts, oligos_path,
-        fragments_list_path, path_bundle.sample_sparse_file_path, path_bundle.sample_output_dir)
+    Each step is recorded in the checkpoint journal of the sample (PathBundle.journal) once its outputs are written.
+    With resume, a sample whose last run went to its end is skipped, and the others restart at their first step
+    not recorded as done (the steps done are not checked again).
+    """
+    print(f" -- Sample {path_bundle.samp_id} -- \n")
 
-    print(f"Associate the fragment name to probe where it is located \n")
-    associate_probes_to_fragments(fragments_list_path, oligos_path)
+    journal = Journal(path_bundle.journal)
+    if resume and journal.is_complete():
+        print(f"--- {path_bundle.samp_id} already done (resume) --- \n\n")
+        return
+    if not resume:
+        journal.reset()
+    journal.record("start")
+
+    writer = None
+    if in_memory:
+        writer = TableWriter(skipped=None if write_intermediate else [path_bundle.filtered_contacts_input])
+    scheduler = Scheduler(path_bundle.manifest, files_cache, writer, journal, resume)
+
+    #   the inputs are linked (not copied) from the content addressed store, for traceability
+    inputs = [fragments_list_path, centromeres_coordinates_path, additional_groups, oligos_path,
+              path_bundle.sample_sparse_file_path] + path_bundle.wt_references_path
+    link_inputs(inputs, path_bundle.store_dir, path_bundle.sample_inputs_dir,
+                hashes={p: scheduler.file_hash(p) for p in inputs if p})
+    print("\n")
 
-    print(f"Make the coverage \n")
-    check_and_run(
-        path_bundle.cover, coverage, path_bundle.sample_sparse_file_path,
-        fragments_list_path, path_bundle.sample_output_dir)
-
-    print(f"Organize the contacts between probe fragments and the rest of the genome 'unbinned tables' \n")
-    check_and_run(
-        path_bundle.unbinned_contacts_input, organize_contacts, path_bundle.filtered_contacts_input,
-        oligos_path, centromeres_coordinates_path, path_bundle.not_weighted_dir, additional_groups)
-
-    print(f"Make basic statistics on the contacts (inter/intra chr, cis/trans, ssdna/dsdna etc ...) \n")
-    check_and_run(
-        path_bundle.global_statistics_input, get_stats, path_bundle.unbinned_contacts_input,
-        path_bundle.sample_sparse_file_path, oligos_path, path_bundle.sample_output_dir)
-
-    for rp, rn, rd in zip(path_bundle.wt_references_path, path_bundle.wt_references_name, path_bundle.weighted_dirs):
-        print(f"Compare the capture efficiency with that of a wild type (may be another sample) \n")
-        compare_to_wt(
-            statistics_path=path_bundle.global_statistics_input,
-            reference_path=rp,
-            wt_ref_name=rn)
-
-        print(f"Weight the unbinned contacts and frequencies tables by the efficiency score got on step ahead \n")
-        weight_mutant(
-            statistics_path=path_bundle.global_statistics_input, wt_ref_name=rn,
-            contacts_path=path_bundle.unbinned_contacts_input, frequencies_path=path_bundle.unbinned_frequencies_input,
-            binned_type="unbinned", output_dir=rd, additional_path=additional_groups)
-
-    print(f"Rebin and weight the unbinned tables (contacts and frequencies) at : \n")
+    scheduler.add(Node(
+        "associate_probes_to_fragments", associate_probes_to_fragments,
+        inputs=[fragments_list_path, oligos_path], outputs=[oligos_path],
+        args=[fragments_list_path, oligos_path],
+        description="Associate the fragment name to probe where it is located"))
+
+    scheduler.add(Node(
+        "filter", filter_contacts,
+        inputs=[oligos_path, fragments_list_path, path_bundle.sample_sparse_file_path],
+        outputs=[path_bundle.filtered_contacts_input],
+        args=[oligos_path, fragments_list_path, path_bundle.sample_sparse_file_path, path_bundle.sample_output_dir],
+        kwargs=dict(sample_id=path_bundle.samp_id),
+        description="Filter contacts"))
+
+    scheduler.add(Node(
+        "coverage", coverage,
+        inputs=[path_bundle.sample_sparse_file_path, fragments_list_path],
+        outputs=[path_bundle.cover, path_bundle.cover_frequencies],
+        args=[path_bundle.sample_sparse_file_path, fragments_list_path, path_bundle.sample_output_dir],
+        kwargs=dict(sample_id=path_bundle.samp_id),
+        description="Make the coverage"))
+
+    scheduler.add(Node(
+        "organize_contacts", organize_contacts,
+        inputs=[path_bundle.filtered_contacts_input, oligos_path, centromeres_coordinates_path, additional_groups],
+        outputs=[path_bundle.unbinned_contacts_input, path_bundle.unbinned_frequencies_input],
+        args=[path_bundle.filtered_contacts_input, oligos_path, centromeres_coordinates_path,
+              path_bundle.not_weighted_dir, additional_groups],
+        kwargs=dict(sample_id=path_bundle.samp_id),
+        description="Organize the contacts between probe fragments and the rest of the genome 'unbinned tables'"))
+
+    scheduler.add(Node(
+        "statistics", statistics,
+        inputs=[path_bundle.unbinned_contacts_input, path_bundle.sample_sparse_file_path, oligos_path] +
+        path_bundle.wt_references_path,
+        outputs=[path_bundle.global_statistics_input],
+        args=[path_bundle.unbinned_contacts_input, path_bundle.sample_sparse_file_path, oligos_path,
+              path_bundle.sample_output_dir, path_bundle.global_statistics_input,
+              path_bundle.wt_references_path, path_bundle.wt_references_name],
+        kwargs=dict(sample_id=path_bundle.samp_id),
+        description="Make basic statistics on the contacts (inter/intra chr, cis/trans, ssdna/dsdna etc ...) "
+                    "and compare the capture efficiency with that of the wild types (may be other samples)"))
+
+    binned_types = [("unbinned", path_bundle.unbinned_contacts_input, path_bundle.unbinned_frequencies_input)]
     for bn in binning_size_list:
         bin_suffix = str(bn // 1000) + "kb"
-        print(bin_suffix)
-        rebin_contacts(
-            contacts_unbinned_path=path_bundle.unbinned_contacts_input,
-            chromosomes_coord_path=centromeres_coordinates_path, oligos_path=oligos_path, bin_size=bn,
-            output_dir=path_bundle.not_weighted_dir, additional_path=additional_groups)
-
         binned_contacts_input = \
             join(path_bundle.not_weighted_dir, path_bundle.samp_id + f"_{bin_suffix}_binned_contacts.tsv")
         binned_frequencies_input = \
             join(path_bundle.not_weighted_dir, path_bundle.samp_id + f"_{bin_suffix}_binned_frequencies.tsv")
-
-        for rn, rd in zip(path_bundle.wt_references_name, path_bundle.weighted_dirs):
-            weight_mutant(
-                statistics_path=path_bundle.global_statistics_input, wt_ref_name=rn,
-                contacts_path=binned_contacts_input, frequencies_path=binned_frequencies_input,
-                binned_type=f"{bin_suffix}_binned", output_dir=rd,
-                additional_path=additional_groups)
-
-    print("\n")
+        binned_types.append((f"{bin_suffix}_binned", binned_contacts_input, binned_frequencies_input))
+
+        scheduler.add(Node(
+            f"rebin_{bin_suffix}", rebin_contacts,
+            inputs=[path_bundle.unbinned_contacts_input, centromeres_coordinates_path, oligos_path, additional_groups],
+            outputs=[binned_contacts_input, binned_frequencies_input],
+            kwargs=dict(
+                contacts_unbinned_path=path_bundle.unbinned_contacts_input,
+                chromosomes_coord_path=centromeres_coordinates_path, oligos_path=oligos_path, bin_size=bn,
+                output_dir=path_bundle.not_weighted_dir, additional_path=additional_groups,
+                sample_id=path_bundle.samp_id),
+            description=f"Rebin the unbinned tables (contacts and frequencies) at {bin_suffix}"))
+
+    for rn, rd in zip(path_bundle.wt_references_name, path_bundle.weighted_dirs):
+        for binned_type, contacts_input, frequencies_input in binned_types:
+            scheduler.add(Node(
+                f"weight_{binned_type}_{rn}", weight_mutant,
+                inputs=[path_bundle.global_statistics_input, contacts_input, frequencies_input, additional_groups],
+                outputs=[join(rd, path_bundle.samp_id + f"_{binned_type}_contacts.tsv"),
+                         join(rd, path_bundle.samp_id + f"_{binned_type}_frequencies.tsv")],
+                kwargs=dict(
+                    statistics_path=path_bundle.global_statistics_input, wt_ref_name=rn,
+                    contacts_path=contacts_input, frequencies_path=frequencies_input,
+                    binned_type=binned_type, output_dir=rd, additional_path=additional_groups,
+                    sample_id=path_bundle.samp_id),
+                description=f"Weight the {binned_type} contacts and frequencies tables by the efficiency score "
+                            f"compared to {rn}"))
 
     regions = ["centromeres", "telomeres"]
     weights_dir = [rd for rd in path_bundle.weighted_dirs] + [path_bundle.not_weighted_dir]
+
+    for weight_dir in weights_dir:
+        unbinned_frequencies_path = join(weight_dir, path_bundle.samp_id + "_unbinned_frequencies.tsv")
+        scheduler.add(Node(
+            f"pyramid_{weight_dir.split('/')[-1]}", build_pyramid,
+            inputs=[unbinned_frequencies_path],
+            outputs=[join(weight_dir, path_bundle.samp_id + "_frequencies_pyramid.npz")],
+            args=[unbinned_frequencies_path, join(weight_dir, path_bundle.samp_id + "_frequencies_pyramid.npz")],
+            description=f"Build the tile pyramid of the probes profiles ({weight_dir.split('/')[-1]}) "
+                        f"for the probes viewer"))
     normalization = [True, False]
 
     param_combinations = list(itertools.product(regions, weights_dir, normalization))
@@ -173,34 +266,207 @@ def pipeline(
         output_dir = weight_dir
         ws = aggregate_params.window_size_centromeres \
             if region == "centromeres" else aggregate_params.window_size_telomeres
+        norm_suffix = "inter" if is_normalized else "absolute"
+
+        scheduler.add(Node(
+            f"aggregate_{region}_{weight_dir.split('/')[-1]}_{norm_suffix}", aggregate,
+            inputs=[binned_10kb_path, binned_1kb_path, centromeres_coordinates_path, oligos_path, additional_groups],
+            outputs=[join(output_dir, region, "tables", f"aggregated_mean_contacts_around_{region}_{norm_suffix}.tsv")],
+            kwargs=dict(
+                binned_10kb_contacts_path=binned_10kb_path,
+                binned_1kb_contacts_path=binned_1kb_path,
+                centros_coord_path=centromeres_coordinates_path,
+                oligos_path=oligos_path,
+                window_size=ws,
+                on=region,
+                output_dir=output_dir,
+                exclude_probe_chr=aggregate_params.excluded_probe_chr,
+                excluded_chr_list=aggregate_params.excluded_chr_list,
+                additional_path=additional_groups,
+                inter_normalization=is_normalized,
+                plot=False),
+            description=f"Make an aggregated of contacts around {region} ({weight_dir.split('/')[-1]}, "
+                        f"{'with' if is_normalized else 'no'} normalization)"))
 
-        print(
-            f"Make an aggregated of contacts around {region} ({weight_dir.split('/')[-1]}, "
-            f"{'with' if is_normalized else 'no'} normalization)")
-
-        aggregate(
-            binned_10kb_contacts_path=binned_10kb_path,
-            binned_1kb_contacts_path=binned_1kb_path,
-            centros_coord_path=centromeres_coordinates_path,
-            oligos_path=oligos_path,
-            window_size=ws,
-            on=region,
-            output_dir=output_dir,
-            exclude_probe_chr=aggregate_params.excluded_probe_chr,
-            excluded_chr_list=aggregate_params.excluded_chr_list,
-            additional_path=additional_groups,
-            inter_normalization=is_normalized,
-            plot=False
-        )
+    try:
+        scheduler.run()
+    finally:
+        if writer is not None:
+            writer.close()
+
+    report = scheduler.report()
+    report["sample"] = path_bundle.samp_id
+    report["sample_path"] = path_bundle.sample_sparse_file_path
+    write_report(report, path_bundle.report)
+    journal.record("done")
 
     print(f"--- {path_bundle.samp_id} DONE --- \n\n")
 
 
+def shared_inputs(
+    oligos_path: str,
+    fragments_list_path: str,
+    centromeres_coordinates_path: str,
+    additional_groups: Optional[str] = None
+) -> Dict[str, dict]:
+    """
+    Prepares once for the whole batch the reference inputs shared by all the samples :
+    the probes are associated to their fragments (the oligos table is modified in place before any sample
+    runs, so the samples only read it), then each table is parsed, its columns checked and its content hash
+    computed (see core.scheduler.file_record).
+    The parsed tables are kept in the cache of the references (see utils.cache_references) : the samples
+    run in this process, and the sample processes forked from it (see run_samples), read them from there
+    instead of parsing the files again.
+
+    Returns the hashes, to give to the pipeline of each sample.
+    """
+    associate_probes_to_fragments(fragments_list_path, oligos_path)
+    cache_references()
+
+    #   same read_csv arguments as the core functions, to hit the cache
+    tables = [
+        (oligos_path, ',', ['chr', 'start', 'end', 'type', 'name', 'fragment']),
+        (fragments_list_path, '\t', ['chrom', 'start_pos', 'end_pos', 'size']),
+        (centromeres_coordinates_path, '\t', ['chr', 'length', 'left_arm_length', 'right_arm_length']),
+    ]
+    if additional_groups:
+        tables.append((additional_groups, '\t', ['name', 'probes', 'action']))
+
+    files_cache = {}
+    for path, sep, columns in tables:
+        df = read_reference(path, sep=sep)
+        missing = [c for c in columns if c not in df.columns]
+        if missing:
+            raise ValueError(f"Missing column(s) {', '.join(missing)} in {path}")
+        files_cache[path] = file_record(path)
+    return files_cache
+
+
+def run_sample(
+    sample_data: list,
+    log_path: str,
+    max_memory: Optional[int] = None,
+    files_cache: Optional[Dict[str, dict]] = None
+):
+    """
+    Runs the pipeline of one sample in a worker process : its address space is limited to max_memory bytes
+    (if given) and its standard and error outputs are written in the log file log_path.
+    The process exits with code 1 if the sample fails.
+    """
+    if max_memory:
+        import resource
+        resource.setrlimit(resource.RLIMIT_AS, (max_memory, max_memory))
+
+    with open(log_path, 'w') as log, redirect_stdout(log), redirect_stderr(log):
+        try:
+            pipeline(*sample_data, files_cache=files_cache)
+        except BaseException:
+            traceback.print_exc()
+            sys.exit(1)
+
+
+def run_samples(
+    samples_data: List[list],
+    jobs: int = 1,
+    max_memory: Optional[int] = None,
+    files_cache: Optional[Dict[str, dict]] = None
+) -> Dict[str, str]:
+    """
+    Runs the pipeline for every sample (list of the pipeline arguments, the PathBundle first).
+
+    With jobs > 1, up to 'jobs' samples run at the same time, each one in its own process (see run_sample).
+    Otherwise, the samples run one after the other in the current process.
+    A sample that uses the statistics of another sample as reference only starts once that sample is done,
+    and is skipped if it failed. A failing sample does not stop the others.
+
+    Prints a summary at the end and returns the status of each sample ('done', 'failed' or 'skipped'),
+    by sample sparse file path. The run reports of the samples are gathered in batch_run_report.json,
+    in the outputs directory of the first sample (see core.instrumentation.batch_report).
+    """
+    bundles = {data[0].sample_sparse_file_path: data[0] for data in samples_data}
+    statistics_of = {b.global_statistics_input: key for key, b in bundles.items()}
+    dependencies = {
+        key: [statistics_of[rp] for rp in b.wt_references_path if statistics_of.get(rp) not in (None, key)]
+        for key, b in bundles.items()
+    }
+
+    pending = [data for data in samples_data]
+    running = {}
+    status = {}
+    elapsed = {}
+    while pending or running:
+        for data in list(pending):
+            key = data[0].sample_sparse_file_path
+            if any(status.get(d) in ('failed', 'skipped') for d in dependencies[key]):
+                status[key] = 'skipped'
+                pending.remove(data)
+            elif all(status.get(d) == 'done' for d in dependencies[key]):
+                if jobs <= 1:
+                    pending.remove(data)
+                    t0 = time.time()
+                    try:
+                        pipeline(*data, files_cache=files_cache)
+                        status[key] = 'done'
+                    except Exception:
+                        traceback.print_exc()
+                        status[key] = 'failed'
+                    elapsed[key] = time.time() - t0
+                    break
+                elif len(running) < jobs:
+                    pending.remove(data)
+                    process = mp.Process(
+                        target=run_sample, args=(data, data[0].log, max_memory, files_cache))
+                    process.start()
+                    running[process.sentinel] = (key, process, time.time())
+                    print(f"Sample {data[0].samp_id} started (log : {data[0].log})")
+
+        if running:
+            for sentinel in wait(list(running)):
+                key, process, t0 = running.pop(sentinel)
+                process.join()
+                status[key] = 'done' if process.exitcode == 0 else 'failed'
+                elapsed[key] = time.time() - t0
+                print(f"Sample {bundles[key].samp_id} {status[key]}")
+        elif pending and not any(
+                all(status.get(d) == 'done' for d in dependencies[data[0].sample_sparse_file_path])
+                for data in pending):
+            #   the remaining samples depend on each other
+            for data in pending:
+                status[data[0].sample_sparse_file_path] = 'skipped'
+            pending = []
+
+    print("\n -- Summary -- ")
+    for key, b in bundles.items():
+        line = f"{b.samp_id} ({key.split('/')[-1]}) : {status[key]}"
+        if key in elapsed:
+            line += f" in {elapsed[key]:.1f} s"
+        if jobs > 1 and status[key] != 'skipped':
+            line += f" (log : {b.log})"
+        print(line)
+    print(f"{sum(v == 'done' for v in status.values())}/{len(status)} samples done \n")
+
+    reports = {}
+    for key, b in bundles.items():
+        reports[key] = None
+        if status[key] == 'done' and os.path.exists(b.report):
+            with open(b.report, 'r') as f:
+                reports[key] = json.load(f)
+    if bundles:
+        batch_report_path = join(dirname(next(iter(bundles.values())).sample_dir), "batch_run_report.json")
+        write_report(batch_report(reports, status, elapsed), batch_report_path)
+        print(f"Run report : {batch_report_path} \n")
+    return status
+
+
 def check_nan(str_):
     return str_ != str_
 
 
-if __name__ == "__main__":
+def main(argv=None):
+    """
+    Parses the command line arguments and runs the pipeline on every sample of the samplesheet.
+    """
+
     #   Example command to enter for parameters (parse)
     """
     -s ../data/inputs/samplesheet.csv
@@ -248,7 +514,23 @@ if __name__ == "__main__":
     parser.add_argument('--exclude-probe-chr', action='store_true', required=False,
                         help="exclude the chromosome where the probe comes from (oligo's chromosome)")
 
-    args = parser.parse_args()
+    parser.add_argument('-j', '--jobs', type=int, default=1, required=False,
+                        help="number of samples to process at the same time, each one in its own process")
+
+    parser.add_argument('--max-memory', type=float, required=False,
+                        help="memory limit (in GB) of each sample process when --jobs is more than 1")
+
+    parser.add_argument('--in-memory', action='store_true', required=False,
+                        help="hand over the tables from one step to the next in memory, and write them in background")
+
+    parser.add_argument('--no-intermediate', action='store_true', required=False,
+                        help="with --in-memory, do not write the filtered contacts table")
+
+    parser.add_argument('--resume', action='store_true', required=False,
+                        help="skip the samples done, and restart the others at their first step not done "
+                             "according to their checkpoint journal")
+
+    args = parser.parse_args(argv)
 
     df_samplesheet: pd.DataFrame = pd.read_csv(args.samplesheet, sep=",")
     samples = {}
@@ -259,13 +541,26 @@ if __name__ == "__main__":
                 if not check_nan(row.iloc[i]):
                     samples[row.loc["sample"]].append(row.iloc[i])
 
+    files_cache = shared_inputs(
+        args.oligos_capture, args.fragments_list, args.centromeres_coordinates, args.additional_groups)
+
+    samples_data = []
     for samp in samples:
         refs = samples[samp]
         sample_path_bundle = PathBundle(samp, refs)
         sample_aggregate_params_centros = AggregateParams(
             args.window_size_centros, args.window_size_telos, args.exclude_probe_chr, args.excluded_chr)
 
-        sample_data = [
+        samples_data.append([
             sample_path_bundle, args.oligos_capture, args.fragments_list, args.centromeres_coordinates,
-            args.binning_sizes, sample_aggregate_params_centros, args.additional_groups]
-        pipeline(*sample_data)
+            args.binning_sizes, sample_aggregate_params_centros, args.additional_groups,
+            args.in_memory, not args.no_intermediate, args.resume])
+
+    max_memory = int(args.max_memory * 1024 ** 3) if args.max_memory else None
+    samples_status = run_samples(samples_data, args.jobs, max_memory, files_cache)
+    if any(v != 'done' for v in samples_status.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,13 @@
 import os
 import re
+import sys
 import numpy as np
 import pandas as pd
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'core'))
+
+from hic_matrix import open_matrix
+
 
 if __name__ == "__main__":
     bin_size = 1000
@@ -21,10 +26,6 @@ if __name__ == "__main__":
     df_fragments = pd.read_csv(fragments_dir+'AD154to160_S288c_DSB_cutsite_q20_chrs_1kb.frag.tsv',
                                sep='\t', index_col=None)
 
-    chr_to_fragid = {}
-    for c in np.unique(df_fragments.chr):
-        chr_to_fragid[c] = df_fragments[df_fragments['chr'] == c].index.tolist()
-
     df_merged_frag_centros = pd.merge(df_fragments, df_centros, on='chr')
 
     #   filter fragments that belongs to excluded chromosomes lits
@@ -47,26 +48,14 @@ if __name__ == "__main__":
 
     for samp in samples:
         samp_id = re.search(r"AD\d+[A-Z]*", samp).group()
-        df0 = pd.read_csv(samples_dir+samp, sep=' ', header=None)
-        mat = df0.to_numpy(dtype=float)
-
-        for chrom, frags in chr_to_fragid.items():
-            start = frags[0]
-            end = frags[-1] + 1
-            mat[start:end, start:end] = np.nan
-
-        df1 = pd.DataFrame(mat)
-        #   remove excluded chromosomes
-        df1b = df1.filter(items=df_fragments_filtered1.index.tolist(), axis=0)
-        df1c = df1b.filter(items=df_fragments_filtered1.index.tolist(), axis=1)
-        #   inter normalization
-        #   add 1e-9 to prevent from dividing by zero
-        df1d = df1c.div(df1c.sum(axis=0)+1e-9)
-
-        #   remove fragments on row that are not in the windows [-nkb -- centromere -- + nkb]
-        df2 = df1d.filter(items=df_fragments_filtered2.index.tolist(), axis=0)
-        #   only keep on columns fragments that are on the centromere's bin
-        df3 = df2.filter(items=df_fragments_filtered3.index.tolist(), axis=1)
+        #   dense matrix converted once to float32 and memory mapped (see core/hic_matrix.py)
+        hic = open_matrix(samples_dir+samp, df_fragments)
+        #   intra chromosome contacts masked, inter normalization over the fragments of the chromosomes kept
+        #   rows : fragments in the windows [-nkb -- centromere -- + nkb]
+        #   columns : fragments that are on the centromere's bin
+        df3 = hic.viewpoints(
+            rows=df_fragments_filtered2.index, cols=df_fragments_filtered3.index,
+            norm_rows=df_fragments_filtered1.index)
         #   add columns with chr ID for each fragment on row
         df3.insert(0, 'chr', df_fragments_filtered2.chr)
         #   add columns with bin for each fragment on row
@@ -1,8 +1,12 @@
 import os
 import re
-import numpy as np
+import sys
 import pandas as pd
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'core'))
+
+from hic_matrix import open_matrix
+
 #   Set as None to avoid SettingWithCopyWarning
 pd.options.mode.chained_assignment = None
 
@@ -29,10 +33,6 @@ if __name__ == "__main__":
     df_fragments = pd.read_csv(fragments_dir+'AD154to160_S288c_DSB_cutsite_q20_chrs_1kb.frag.tsv',
                                sep='\t', index_col=None)
 
-    chr_to_fragid = {}
-    for c in np.unique(df_fragments.chr):
-        chr_to_fragid[c] = df_fragments[df_fragments['chr'] == c].index.tolist()
-
     df_merged1 = pd.merge(df_fragments, df_centros, on='chr')
 
     #   filter fragments that belongs to excluded chromosomes lits
@@ -86,26 +86,14 @@ if __name__ == "__main__":
     del df_merged1, df_merged2, df_merged3, df_fragments_filtered3r, df_fragments_filtered3l
     for samp in samples:
         samp_id = re.search(r"AD\d+[A-Z]*", samp).group()
-        df0 = pd.read_csv(samples_dir+samp, sep=' ', header=None)
-        mat = df0.to_numpy(dtype=float)
-
-        for chrom, frags in chr_to_fragid.items():
-            start = frags[0]
-            end = frags[-1] + 1
-            mat[start:end, start:end] = np.nan
-
-        df1 = pd.DataFrame(mat)
-        #   remove excluded chromosomes
-        df1b = df1.filter(items=df_fragments_filtered1.index.tolist(), axis=0)
-        df1c = df1b.filter(items=df_fragments_filtered1.index.tolist(), axis=1)
-        #   inter normalization
-        #   add 1e-9 to prevent from dividing by zero
-        df1d = df1c.div(df1c.sum(axis=0)+1e-9)
-
-        #   remove fragments on row that are not in the windows [-nkb -- centromere -- + nkb]
-        df2 = df1d.filter(items=df_fragments_filtered2.index.tolist(), axis=0)
-        #   remove fragments on row that are not in the windows [-nkb -- telomeres -- + nkb]
-        df3 = df2.filter(items=df_fragments_filtered5.index.tolist(), axis=1)
+        #   dense matrix converted once to float32 and memory mapped (see core/hic_matrix.py)
+        hic = open_matrix(samples_dir+samp, df_fragments)
+        #   intra chromosome contacts masked, inter normalization over the fragments of the chromosomes kept
+        #   rows : fragments in the windows [-nkb -- centromere -- + nkb]
+        #   columns : fragments in the windows [-nkb -- telomeres -- + nkb]
+        df3 = hic.viewpoints(
+            rows=df_fragments_filtered2.index, cols=df_fragments_filtered5.index,
+            norm_rows=df_fragments_filtered1.index)
 
         df3['small'] = df3.loc[:, categories_of_arm_idx['small']].mean(axis=1)
         df3['middle'] = df3.loc[:, categories_of_arm_idx['middle']].mean(axis=1)
@@ -1,9 +1,14 @@
 import os
 import re
+import sys
 
 import numpy as np
 import pandas as pd
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'core'))
+
+from hic_matrix import open_matrix
+
 #   Set as None to avoid SettingWithCopyWarning
 pd.options.mode.chained_assignment = None
 
@@ -45,10 +50,6 @@ if __name__ == "__main__":
     df_fragments = pd.read_csv(fragments_dir+'AD154to160_S288c_DSB_cutsite_q20_chrs_1kb.frag.tsv',
                                sep='\t', index_col=None)
 
-    chr_to_fragid = {}
-    for c in np.unique(df_fragments.chr):
-        chr_to_fragid[c] = df_fragments[df_fragments['chr'] == c].index.tolist()
-
     #   filter fragments that belongs to excluded chromosomes list
     df_fragments_filtered1 = df_fragments[
         (~df_fragments.chr.isin(excluded_chr))
@@ -66,24 +67,11 @@ if __name__ == "__main__":
         #   just the name of the sample (AD157, AD254, ...)
         samp_id = re.search(r"AD\d+[A-Z]*", samp).group()
         print(samp_id)
-        #   df0: raw dataframe, dense matrix
-        #   may require a lot of time to import the table as it is heavy table
-        #   NB : df1 is a square matrix
-        df0 = pd.read_csv(samples_dir+samp, sep=' ', header=None)
-        mat = df0.to_numpy(dtype=float)
-        for chrom, frags in chr_to_fragid.items():
-            start = frags[0]
-            end = frags[-1] + 1
-            mat[start:end, start:end] = np.nan
-
-        df1 = pd.DataFrame(mat)
-        #   remove excluded chromosomes
-        df1b = df1.filter(items=df_fragments_filtered1.index.tolist(), axis=0)
-        #   inter normalization
-        #   add 1e-9 to prevent from dividing by zero
-        df1c = df1b.div(df1b.sum(axis=0)+1e-9)
-
-        df2 = df1c.filter(items=df_fragments_filtered2.index.tolist(), axis=1)
+        #   dense matrix, parsed only at the first run : converted to float32 and memory mapped
+        #   (see core/hic_matrix.py), only the columns of the bins of interest are read
+        hic = open_matrix(samples_dir+samp, df_fragments)
+        #   intra chromosome contacts masked, excluded chromosomes removed, inter normalization
+        df2 = hic.viewpoints(rows=df_fragments_filtered1.index, cols=df_fragments_filtered2.index)
         #   group the 6 bins at the left of the breaks site by mean and add columns for result
         df2['chr5_dsb_left'] = df2.iloc[:, 0:6].mean(axis=1)
         #   group the 6 bins on the rigth by mean and add columns for result
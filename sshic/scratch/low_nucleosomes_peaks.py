@@ -7,6 +7,7 @@ import matplotlib.pyplot as plt
 from scipy.stats import gaussian_kde
 
 from core import utils
+from core.intervals import contained_average
 
 #   Set as None to avoid SettingWithCopyWarning
 pd.options.mode.chained_assignment = None
@@ -14,20 +15,14 @@ pd.options.mode.chained_assignment = None
 
 def process_chunk(args):
     df_fragments_chr_mask, df_nucleosomes_chr_mask, current_chr = args
-    frag_starts = df_fragments_chr_mask['start'].values
-    frag_ends = df_fragments_chr_mask['end'].values
-    nucleosome_starts = df_nucleosomes_chr_mask['start'].values
-    nucleosome_ends = df_nucleosomes_chr_mask['end'].values
-    nucleosome_scores = df_nucleosomes_chr_mask['score'].values
-    nucleosomes_average_score = []
-    for i in range(len(df_fragments_chr_mask)):
-        nucleosome_mask = np.array((nucleosome_starts >= frag_starts[i]) & (nucleosome_ends <= frag_ends[i]))
-        nucleosome_scores_i = nucleosome_scores[nucleosome_mask]
-        if len(nucleosome_scores_i) == 0:
-            average_score = 0.
-        else:
-            average_score = np.average(nucleosome_scores_i)
-        nucleosomes_average_score.append(average_score)
+    #   average score of the nucleosomes contained in each fragment (0 if none), see core/intervals.py
+    nucleosomes_average_score = contained_average(
+        df_nucleosomes_chr_mask['start'].values,
+        df_nucleosomes_chr_mask['end'].values,
+        df_nucleosomes_chr_mask['score'].values,
+        df_fragments_chr_mask['start'].values,
+        df_fragments_chr_mask['end'].values
+    ).tolist()
     print(current_chr)
     return {current_chr: nucleosomes_average_score}
 
@@ -35,7 +30,8 @@ def process_chunk(args):
 def preprocess(
         fragments_list_path: str,
         single_nucleosomes_scores_path,
-        output_dir: str
+        output_dir: str,
+        processes: int = 1
 ):
     roman_chr = {'chrI': 'chr1', 'chrII': 'chr2', 'chrIII': 'chr3', 'chrIV': 'chr4',
                  'chrV': 'chr5', 'chrVI': 'chr6', 'chrVII': 'chr7', 'chrVIII': 'chr8',
@@ -53,14 +49,18 @@ def preprocess(
 
     df_fragments['average_scores'] = np.zeros(df_fragments.shape[0], dtype=float)
     args_list = []
-    eff_cores = int(mp.cpu_count() / 2)
     for c in pd.unique(df_fragments.chr):
         df_frag_chr_mask = df_fragments[df_fragments.chr == c]
         df_nucleosomes_chr_mask = df_nucleosomes[df_nucleosomes.chr == c]
         args_list.append((df_frag_chr_mask, df_nucleosomes_chr_mask, c))
 
-    with mp.Pool(processes=eff_cores) as pool:
-        chunk_results = pool.map(process_chunk, args_list)
+    #   a chromosome takes a fraction of a second with the interval join, the pool is only worth it
+    #   for very large genomes
+    if processes > 1:
+        with mp.Pool(processes=processes) as pool:
+            chunk_results = pool.map(process_chunk, args_list)
+    else:
+        chunk_results = [process_chunk(args) for args in args_list]
 
     results = {list(d.keys())[0]: list(d.values())[0] for d in chunk_results}
     for chrom, scores in results.items():
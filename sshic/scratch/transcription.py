@@ -1,9 +1,9 @@
 #! /usr/bin/env python3
-import numpy as np
 import pandas as pd
 import os
 import re
 
+from core.intervals import coverage_by_chromosome
 
 #   Set as None to avoid SettingWithCopyWarning
 pd.options.mode.chained_assignment = None
@@ -34,23 +34,9 @@ def preprocess(
     df_transcript_regions = df_transcript_regions[df_transcript_regions['chr'].isin(chr_of_interest)]
     df_transcript_regions.reset_index(inplace=True, drop=True)
 
-    df_genes_list["rna_per_bp"] = np.nan
-    for index, row in df_genes_list.iterrows():
-        # print(index)
-        chrom = row["chr"]
-        start = row["start"]
-        end = row["end"]
-        sub_df = df_transcript_regions.loc[
-            (df_transcript_regions['chr'] == chrom) &
-            (df_transcript_regions['start'] >= start) &
-            (df_transcript_regions['end'] <= end)
-        ]
-        if len(sub_df) == 0:
-            coverage_per_bp = 0.
-        else:
-            interval_size = sub_df.iloc[-1, 2] - sub_df.iloc[0, 1] + 1
-            coverage_per_bp = sub_df['score'].values.sum() / interval_size
-        df_genes_list.loc[index, "rna_per_bp"] = coverage_per_bp
+    #   sum of the scores of the transcript regions within each gene, per bp from the first to the last region
+    #   (0 if there is none), see core/intervals.py
+    df_genes_list["rna_per_bp"] = coverage_by_chromosome(df_genes_list, df_transcript_regions)
     df_genes_list.to_csv(inputs_dir+"genes_list_with_coverage_per_bp.tsv", sep='\t')
 
 
@@ -0,0 +1,63 @@
+import os
+import sys
+import tempfile
+from unittest import TestCase
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), 'sshic', 'core'))
+
+from cache import TableCache
+
+
+class Test(TestCase):
+    def test_table_cache(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            paths = []
+            for i in range(3):
+                paths.append(os.path.join(tmp_dir, f'table_{i}.tsv'))
+                with open(paths[-1], 'w') as f:
+                    f.write('genome_bins\t1234\t5678\n' + ''.join(f'{k}\t{k * i}\t{k + i}\n' for k in range(100)))
+
+            cache = TableCache(max_bytes=10 ** 6)
+            df = cache.get(paths[0], sep='\t')
+            view = cache.get(paths[0], columns=['genome_bins', '5678'], sep='\t')
+            self.assertEqual(list(view.columns), ['genome_bins', '5678'])
+            #   the view shares the data of the cached table
+            self.assertTrue(np.shares_memory(view['5678'].values, df['5678'].values))
+            self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+            #   the file changed : parsed again
+            with open(paths[0], 'a') as f:
+                f.write('100\t0\t0\n')
+            self.assertEqual(len(cache.get(paths[0], sep='\t')), 101)
+            self.assertEqual(cache.misses, 2)
+
+            #   room for two tables only : the least recently used is dropped
+            cache.resize(int(cache.nbytes * 2.5))
+            cache.get(paths[1], sep='\t')
+            cache.get(paths[0], sep='\t')
+            cache.get(paths[2], sep='\t')
+            cached = [k[0] for k in cache.tables]
+            self.assertEqual(cached, [os.path.abspath(paths[0]), os.path.abspath(paths[2])])
+            self.assertLessEqual(cache.nbytes, cache.max_bytes)
+
+    def test_pinned_table(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            paths = []
+            for i in range(2):
+                paths.append(os.path.join(tmp_dir, f'table_{i}.tsv'))
+                with open(paths[-1], 'w') as f:
+                    f.write('chr\tstart\n' + ''.join(f'chr{i}\t{k}\n' for k in range(100)))
+
+            #   no room for any table : only the pinned one is kept, and it is the same DataFrame at each call
+            cache = TableCache(max_bytes=0)
+            df = cache.get(paths[0], pin='viewer', sep='\t')
+            self.assertEqual(len(cache.tables), 0)
+            self.assertIs(cache.get(paths[0], pin='viewer', sep='\t'), df)
+            self.assertIs(cache.get(paths[0], sep='\t'), df)
+            self.assertEqual((cache.hits, cache.misses), (2, 1))
+
+            #   another table pinned under the same name replaces it
+            cache.get(paths[1], pin='viewer', sep='\t')
+            self.assertIsNot(cache.get(paths[0], sep='\t'), df)
+            self.assertEqual(cache.misses, 3)
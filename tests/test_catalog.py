@@ -0,0 +1,50 @@
+import os
+import sys
+import tempfile
+from os.path import join
+from unittest import TestCase
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), 'sshic', 'core'))
+
+import utils
+from catalog import DataCatalog
+
+
+class Test(TestCase):
+    def test_catalog(self):
+        with tempfile.TemporaryDirectory() as data_dir:
+            os.makedirs(join(data_dir, 'samples'))
+            for name in ['AD1_S1_pcrfree.txt', 'AD1_S1_pcrdupkept.txt', 'AD2_S2.txt']:
+                open(join(data_dir, 'samples', name), 'w').close()
+            not_weighted = join(data_dir, 'outputs', 'AD1', 'pcrfree', 'not_weighted')
+            os.makedirs(not_weighted)
+            os.makedirs(join(data_dir, 'outputs', 'AD1', 'pcrfree', 'weighted_wt'))
+            os.makedirs(join(data_dir, 'outputs', 'AD1', 'inputs'))
+            df = pd.DataFrame({'chr': ['chr1'], 'start': [0], 'sizes': [100], '138': [1.], 'group_a': [2.]})
+            df.to_csv(join(not_weighted, 'AD1_unbinned_contacts.tsv'), sep='\t', index=False)
+            open(join(not_weighted, 'AD1_10kb_binned_contacts.tsv'), 'w').close()
+
+            catalog = DataCatalog(data_dir, max_age=0)
+            self.assertEqual(catalog.samples(), ['AD1', 'AD2'])
+            self.assertEqual(catalog.sample_files('ad1'), ['AD1_S1_pcrdupkept.txt', 'AD1_S1_pcrfree.txt'])
+            self.assertEqual(catalog.output_samples(), ['AD1'])
+            self.assertEqual(catalog.pcr_dirs('AD1'), ['pcrfree'])
+            self.assertEqual(catalog.weight_dirs('AD1', 'pcrfree'), ['not_weighted', 'weighted_wt'])
+            self.assertEqual(catalog.pcr_dirs('AD3'), [])
+
+            #   without index : from the file names and the header of the unbinned table
+            self.assertEqual(catalog.bin_sizes('AD1', 'pcrfree', 'not_weighted'), [10000])
+            self.assertEqual(catalog.probes('AD1', 'pcrfree', 'not_weighted'), ['138', 'group_a'])
+
+            #   a new directory and a new index are seen at the next call
+            os.makedirs(join(data_dir, 'outputs', 'AD1', 'pcrdupkept'))
+            self.assertEqual(catalog.pcr_dirs('AD1'), ['pcrdupkept', 'pcrfree'])
+            utils.index_table(df, join(not_weighted, 'AD1_unbinned_contacts.tsv'), 0, {'Probe_0': 138})
+            utils.index_table(df, join(not_weighted, 'AD1_1kb_binned_contacts.tsv'), 1000, {'Probe_0': 138})
+            self.assertEqual(catalog.bin_sizes('AD1', 'pcrfree', 'not_weighted'), [1000])
+
+            #   within max_age, the listings are not checked
+            catalog.max_age = 3600
+            os.makedirs(join(data_dir, 'outputs', 'AD1', 'pcrfree', 'weighted_wt2'))
+            self.assertEqual(catalog.weight_dirs('AD1', 'pcrfree'), ['not_weighted', 'weighted_wt'])
@@ -0,0 +1,36 @@
+import os
+import sys
+import json
+import tempfile
+from unittest import TestCase
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), 'sshic'))
+
+import cli
+
+
+class Test(TestCase):
+    def test_report(self):
+        sizes = np.full(3000, 100)
+        genome_start = np.r_[0, np.cumsum(sizes)[:-1]]
+        df = pd.DataFrame({'chr': 'chr1', 'start': genome_start, 'sizes': sizes, 'genome_start': genome_start,
+                           '1234': np.linspace(0, 1, 3000)})
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            frequencies = os.path.join(tmp_dir, 'AD1_unbinned_frequencies.tsv')
+            pyramid = os.path.join(tmp_dir, 'AD1_frequencies_pyramid.npz')
+            report_path = os.path.join(tmp_dir, 'report.json')
+            df.to_csv(frequencies, sep='\t', index=False)
+
+            cli.main(['--report', report_path, 'pyramid', '-i', frequencies, '-o', pyramid])
+            with open(report_path) as f:
+                report = json.load(f)
+            self.assertEqual(report["command"], "pyramid")
+            self.assertEqual(report["rows_in"], 3000)
+            self.assertGreaterEqual(report["bytes_in"], os.path.getsize(frequencies))
+            self.assertGreaterEqual(report["bytes_out"], os.path.getsize(pyramid))
+            self.assertGreater(report["wall_time"], 0)
+
+            self.assertEqual(cli.main(['--report']), 2)
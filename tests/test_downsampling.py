@@ -0,0 +1,31 @@
+import os
+import sys
+from unittest import TestCase
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), 'sshic', 'core'))
+
+from downsampling import minmax_downsample
+
+
+class Test(TestCase):
+    def test_minmax_downsample(self):
+        rng = np.random.default_rng(0)
+        x = np.arange(100000) * 120
+        y = rng.random(100000)
+        y[[123, 45678, 99998]] = [50., -3., 20.]
+        y[70000:70010] = np.nan
+
+        xs, ys = minmax_downsample(x, y, 500)
+        self.assertLessEqual(len(xs), 1000)
+        self.assertTrue(np.all(np.diff(xs) > 0))
+        #   the peaks and the dip are kept, on their own x
+        for i in [123, 45678, 99998]:
+            self.assertIn(x[i], xs)
+            self.assertEqual(ys[xs == x[i]][0], y[i])
+        self.assertEqual(np.nanmax(ys), 50.)
+
+        #   zoomed in : the points of the range at full resolution, plus one on each side
+        xs, ys = minmax_downsample(x, y, 500, x_range=[120 * 1000, 120 * 1500])
+        np.testing.assert_array_equal(xs, x[999:1502])
+        np.testing.assert_array_equal(ys, y[999:1502])
@@ -0,0 +1,137 @@
+import os
+import sys
+import tempfile
+from unittest import TestCase, mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), 'sshic', 'core'))
+
+import oligos_replacement as o
+
+genome = ">chr1 (16 bp)\nAAAAC\nCCCGG\nGGTTT\nT\n>chr2\nACGTA\nCGTAC\n"
+oligos = "chr,start,end,orientation,type,name,sequence_original,sequence_modified\n" \
+         "chr1,5,8,W,ss,Probe_1,CCCC,tttt\n" \
+         "chr2,3,4,C,ds,Probe_2,AC,GG\n"
+
+genome_correct = ">chr1 (16 bp)\nAAAAT\nTTTGG\nGGTTT\nT\n>chr2\nACGTA\nCGTAC\n" \
+                 ">chr_artificial  (8 bp)\nAACCC\nCGG\n"
+bed_correct = "chr1\t3\t4\tProbe_1_flank_5'\n" \
+              "chr1\t5\t8\tProbe_1\n" \
+              "chr1\t9\t10\tProbe_1_flank_3'\n" \
+              "chr_artificial\t1\t2\tProbe_1_flank_5'\n" \
+              "chr_artificial\t3\t6\tProbe_1\n" \
+              "chr_artificial\t7\t8\tProbe_1_flank_3'\n"
+
+
+class Test(TestCase):
+    def test_replacement(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            genome_path = os.path.join(tmp_dir, 'genome.fa')
+            oligos_path = os.path.join(tmp_dir, 'oligos.csv')
+            output_path = os.path.join(tmp_dir, 'genome_artificial.fa')
+            bed_path = os.path.join(tmp_dir, 'genome_artificial.bed')
+            with open(genome_path, 'w') as f:
+                f.write(genome)
+            with open(oligos_path, 'w') as f:
+                f.write(oligos)
+
+            o.replacement(genome_path, oligos_path, output_path, bed_path, 2)
+
+            with open(output_path, 'r') as f:
+                self.assertEqual(f.read(), genome_correct)
+            with open(bed_path, 'r') as f:
+                self.assertEqual(f.read(), bed_correct)
+
+    def test_replacement_without_index(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            genome_path = os.path.join(tmp_dir, 'genome.fa')
+            oligos_path = os.path.join(tmp_dir, 'oligos.csv')
+            output_path = os.path.join(tmp_dir, 'genome_artificial.fa')
+            bed_path = os.path.join(tmp_dir, 'genome_artificial.bed')
+            with open(genome_path, 'w') as f:
+                f.write(genome)
+            with open(oligos_path, 'w') as f:
+                f.write(oligos)
+
+            o.replacement(genome_path, oligos_path, output_path, bed_path, 2, use_index=False)
+
+            self.assertFalse(os.path.exists(genome_path + '.fai'))
+            with open(output_path, 'r') as f:
+                self.assertEqual(f.read(), genome_correct)
+
+    def test_fasta_index(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            genome_path = os.path.join(tmp_dir, 'genome.fa')
+            with open(genome_path, 'w') as f:
+                f.write(genome)
+
+            index = o.fasta_index(genome_path)
+            self.assertEqual(index['chr'].tolist(), ['chr1', 'chr2'])
+            self.assertEqual(index['length'].tolist(), [16, 10])
+            self.assertEqual(index['offset'].tolist(), [14, 40])
+            self.assertEqual(index['line_bases'].tolist(), [5, 5])
+            self.assertEqual(index['line_width'].tolist(), [6, 6])
+
+            with open(genome_path, 'rb') as f:
+                record = next(index.itertuples())
+                self.assertEqual(o.fetch_sequence(f, record, 3, 12), 'ACCCCGGGG')
+
+    def test_fasta_index_read_only(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            genome_path = os.path.join(tmp_dir, 'genome.fa')
+            with open(genome_path, 'w') as f:
+                f.write(genome)
+
+            #   the directory of the genome is not writable : the index is kept in memory
+            with mock.patch.object(o, 'atomic_write', side_effect=PermissionError):
+                index = o.fasta_index(genome_path)
+            self.assertFalse(os.path.exists(genome_path + '.fai'))
+            self.assertEqual(index['offset'].tolist(), [14, 40])
+            written_index = o.fasta_index(genome_path)
+            self.assertTrue(os.path.exists(genome_path + '.fai'))
+            self.assertTrue(index.equals(written_index))
+
+    def test_fasta_index_irregular_lines(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            genome_path = os.path.join(tmp_dir, 'genome.fa')
+            with open(genome_path, 'w') as f:
+                f.write(">chr1\nAAA\nAAAAA\n")
+            with self.assertRaises(ValueError):
+                o.fasta_index(genome_path)
+
+    def test_replacement_parallel(self):
+        for use_index in (True, False):
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                genome_path = os.path.join(tmp_dir, 'genome.fa')
+                oligos_path = os.path.join(tmp_dir, 'oligos.csv')
+                output_path = os.path.join(tmp_dir, 'genome_artificial.fa')
+                bed_path = os.path.join(tmp_dir, 'genome_artificial.bed')
+                with open(genome_path, 'w') as f:
+                    f.write(genome)
+                with open(oligos_path, 'w') as f:
+                    f.write(oligos.replace('chr2,3,4,C,ds', 'chr2,3,4,C,ss'))
+
+                o.replacement(genome_path, oligos_path, output_path, bed_path, 2, use_index=use_index, processes=2)
+
+                with open(output_path, 'r') as f:
+                    self.assertEqual(f.read(), ">chr1 (16 bp)\nAAAAT\nTTTGG\nGGTTT\nT\n>chr2\nACCCA\nCGTAC\n"
+                                               ">chr_artificial  (14 bp)\nAACCC\nCGGAC\nGTAC\n")
+
+    def test_oligo_correction(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            oligos_path = os.path.join(tmp_dir, 'oligos.csv')
+            with open(oligos_path, 'w') as f:
+                f.write("Chr,Start,End,Orientation,Type,Name,Sequence_Original,Sequence_Modified\n"
+                        "chr2,30,33,C,ss_neg,Probe_3,AACG,gtta\n"
+                        "chr2,3,4,C,ds,Probe_2,AC,GG\n"
+                        "chr1,5,8,W,ss,Probe_1,CCCC,tttt\n")
+
+            oligos_corrected = o.oligo_correction(oligos_path)
+            self.assertEqual(oligos_corrected['name'].tolist(), ['Probe_1', 'Probe_3'])
+            self.assertEqual(oligos_corrected['orientation'].tolist(), ['W', 'W'])
+            self.assertEqual(oligos_corrected['sequence_original'].tolist(), ['CCCC', 'CGTT'])
+            self.assertEqual(oligos_corrected['sequence_modified'].tolist(), ['TTTT', 'TAAC'])
+
+            index = o.oligo_index(oligos_corrected)
+            self.assertEqual(o.oligo_positions(">chr2 (10 bp)\n", index), [1])
+            self.assertEqual(o.oligo_positions(">chr1\n", index), [0])
+            self.assertEqual(o.oligo_positions(">chr10\n", index), [])
@@ -0,0 +1,50 @@
+import os
+import sys
+import tempfile
+from unittest import TestCase
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), 'sshic', 'core'))
+
+from hic_matrix import open_matrix
+
+
+class Test(TestCase):
+    def test_viewpoints(self):
+        rng = np.random.default_rng(0)
+        df_fragments = pd.DataFrame({'chr': ['chr1'] * 30 + ['chr2'] * 20 + ['chr3'] * 25,
+                                     'start_pos': np.r_[0:30, 0:20, 0:25] * 1000})
+        n = len(df_fragments)
+        upper = np.triu(rng.integers(0, 20, (n, n)))
+        mat = upper + np.triu(upper, 1).T
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            matrix_path = os.path.join(tmp_dir, 'AD1.txt')
+            pd.DataFrame(mat).to_csv(matrix_path, sep=' ', header=False, index=False)
+            hic = open_matrix(matrix_path, df_fragments)
+            self.assertEqual(hic.chromosomes, ['chr1', 'chr2', 'chr3'])
+
+            #   as the scratch analyses did it on the whole matrix : intra chromosomes masked,
+            #   chr3 excluded, columns normalized
+            masked = mat.astype(float)
+            for start, end in [(0, 30), (30, 50), (50, 75)]:
+                masked[start:end, start:end] = np.nan
+            kept = df_fragments.index[df_fragments['chr'] != 'chr3']
+            df = pd.DataFrame(masked).filter(items=kept, axis=0).filter(items=kept, axis=1)
+            df = df.div(df.sum(axis=0) + 1e-9)
+            rows, cols = kept[10:40], [3, 35, 36]
+            expected = df.filter(items=rows, axis=0).filter(items=cols, axis=1)
+
+            result = hic.viewpoints(rows=rows, cols=cols, norm_rows=kept)
+            pd.testing.assert_frame_equal(result, expected, check_dtype=False, check_index_type=False,
+                                          check_column_type=False)
+
+            #   the same matrix from the sparse format of hicstuff
+            sparse_path = os.path.join(tmp_dir, 'AD1_sparse.txt')
+            a, b = np.nonzero(upper)
+            with open(sparse_path, 'w') as f:
+                f.write(f"{n}\t{n}\t{len(a)}\n")
+                pd.DataFrame({'a': a, 'b': b, 'c': upper[a, b]}).to_csv(f, sep='\t', header=False, index=False)
+            hic_sparse = open_matrix(sparse_path, df_fragments, sparse=True)
+            np.testing.assert_array_equal(hic_sparse.matrix, mat)
@@ -0,0 +1,80 @@
+import os
+import sys
+from unittest import TestCase
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), 'sshic', 'core'))
+
+from intervals import contained_average, contained_coverage, coverage_by_chromosome
+
+
+class Test(TestCase):
+    def test_contained_average(self):
+        rng = np.random.default_rng(0)
+        #   overlapping and nested intervals, of very different lengths
+        starts = rng.integers(0, 100000, 3000)
+        ends = starts + np.where(rng.random(3000) < 0.05, rng.integers(0, 5000, 3000), rng.integers(0, 200, 3000))
+        scores = rng.random(3000)
+        bounds = np.sort(rng.choice(np.arange(1, 100000), 400, replace=False))
+        query_starts, query_ends = np.r_[0, bounds], np.r_[bounds - 1, 105000]
+
+        expected = []
+        for qs, qe in zip(query_starts, query_ends):
+            mask = (starts >= qs) & (ends <= qe)
+            expected.append(np.average(scores[mask]) if mask.any() else 0.)
+
+        np.testing.assert_allclose(contained_average(starts, ends, scores, query_starts, query_ends), expected)
+        np.testing.assert_array_equal(contained_average([], [], [], query_starts, query_ends), 0.)
+
+    def test_coverage_by_chromosome(self):
+        rng = np.random.default_rng(1)
+        #   regions of a bedgraph (adjacent, not nested) and genes, on two chromosomes
+        df_regions = pd.concat([
+            pd.DataFrame({'chr': c, 'start': np.r_[0:50000:50], 'end': np.r_[0:50000:50] + 49,
+                          'score': rng.random(1000)}) for c in ['chr1', 'chr2']])
+        starts = rng.integers(0, 49000, 200)
+        df_genes = pd.DataFrame({'chr': rng.choice(['chr1', 'chr2', 'chr3'], 200), 'start': starts,
+                                 'end': starts + rng.integers(0, 1000, 200)})
+
+        expected = []
+        for _, row in df_genes.iterrows():
+            sub_df = df_regions.loc[(df_regions['chr'] == row['chr']) & (df_regions['start'] >= row['start']) &
+                                    (df_regions['end'] <= row['end'])]
+            if len(sub_df) == 0:
+                expected.append(0.)
+            else:
+                expected.append(sub_df['score'].values.sum() / (sub_df.iloc[-1, 2] - sub_df.iloc[0, 1] + 1))
+
+        np.testing.assert_allclose(coverage_by_chromosome(df_genes, df_regions), expected)
+
+    def test_contained_coverage_nested(self):
+        rng = np.random.default_rng(2)
+        #   regions sharing their start (a region and its first half), and regions nested in longer ones
+        starts = np.repeat(np.r_[0:20000:100], 2)
+        ends = starts + np.tile([49, 99], 200)
+        df_regions = pd.DataFrame({'start': starts, 'end': ends, 'score': rng.random(400)})
+        nested = pd.DataFrame({'start': np.r_[20000:30000:500], 'end': np.r_[20000:30000:500] + 499,
+                               'score': rng.random(20)})
+        inner = nested.assign(start=nested['start'] + 100, end=nested['start'] + 199, score=rng.random(20))
+        df_regions = pd.concat([df_regions, nested, inner]).sort_values(['start', 'end'], ignore_index=True)
+        query_starts = rng.integers(0, 30000, 300)
+        query_ends = query_starts + rng.integers(0, 2000, 300)
+
+        def expected_coverage(span):
+            expected = []
+            for qs, qe in zip(query_starts, query_ends):
+                sub_df = df_regions.loc[(df_regions['start'] >= qs) & (df_regions['end'] <= qe)]
+                expected.append(sub_df['score'].values.sum() / span(sub_df) if len(sub_df) else 0.)
+            return expected
+
+        coverage = contained_coverage(df_regions['start'].to_numpy(), df_regions['end'].to_numpy(),
+                                      df_regions['score'].to_numpy(), query_starts, query_ends)
+        #   the loop replaced by coverage_by_chromosome, from the first region to the end of the last one
+        duplicates = query_ends < 20000
+        np.testing.assert_allclose(
+            coverage[duplicates],
+            np.array(expected_coverage(lambda df: df.iloc[-1, 1] - df.iloc[0, 0] + 1))[duplicates])
+        #   with nested regions, the last one in the file may end before the ones containing it
+        np.testing.assert_allclose(
+            coverage, expected_coverage(lambda df: df['end'].max() - df['start'].min() + 1))
@@ -0,0 +1,40 @@
+import os
+import sys
+import time
+import shutil
+import tempfile
+from unittest import TestCase
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), 'sshic', 'core'))
+
+from jobs import JobQueue
+
+
+class Test(TestCase):
+    def test_job_queue(self):
+        jobs = JobQueue(max_workers=2)
+        #   no process started before the first job
+        self.assertIsNone(jobs._executor)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            source = os.path.join(tmp_dir, 'a.txt')
+            with open(source, 'w') as f:
+                f.write('a')
+            done = jobs.submit("Copy", [
+                (os.makedirs, [os.path.join(tmp_dir, 'out')], {}),
+                (shutil.copy, [source, os.path.join(tmp_dir, 'out', 'b.txt')], {})
+            ], sample="AD1", message="copied")
+            failed = jobs.submit("Remove", [(os.remove, [os.path.join(tmp_dir, 'missing')], {})], sample="AD2")
+
+            t0 = time.time()
+            while any(jobs.status(j)["status"] in ("queued", "running") for j in (done, failed)):
+                self.assertLess(time.time() - t0, 30)
+                time.sleep(0.05)
+            jobs.shutdown()
+
+            self.assertEqual(jobs.status(done)["status"], "done")
+            self.assertEqual(jobs.status(done)["steps_done"], 2)
+            self.assertTrue(os.path.exists(os.path.join(tmp_dir, 'out', 'b.txt')))
+            self.assertTrue(jobs.describe(done).startswith("AD1 - Copy : copied"))
+            self.assertEqual(jobs.status(failed)["status"], "failed")
+            self.assertIn("FileNotFoundError", jobs.status(failed)["error"])
+            self.assertEqual([j["id"] for j in jobs.jobs(sample="AD2")], [failed])
@@ -0,0 +1,38 @@
+import os
+import sys
+from unittest import TestCase
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), 'sshic', 'core'))
+
+from paging import TablePager, split_filter_part
+
+
+class Test(TestCase):
+    def test_split_filter_part(self):
+        self.assertEqual(split_filter_part('{genome_bins} ge 500'), ('genome_bins', 'ge', 500.))
+        self.assertEqual(split_filter_part('{chr} = "chr 3"'), ('chr', 'eq', 'chr 3'))
+        self.assertEqual(split_filter_part('{chr} contains chr1'), ('chr', 'contains', 'chr1'))
+        self.assertEqual(split_filter_part('{chr} unknown chr1'), (None, None, None))
+
+    def test_page(self):
+        df = pd.DataFrame({
+            'chr': ['chr1', 'chr2', 'chr1', 'chr3', 'chr1', 'chr10'],
+            'start': [5, 4, 3, 2, 1, 0],
+            'sizes': [10., 20., 30., 40., 50., 60.]})
+        pager = TablePager()
+
+        page, page_count = pager.page(df, 1, 4)
+        self.assertEqual(page_count, 2)
+        self.assertEqual(page['start'].tolist(), [1, 0])
+
+        sort_by = [{'column_id': 'chr', 'direction': 'asc'}, {'column_id': 'start', 'direction': 'desc'}]
+        page, page_count = pager.page(df, 0, 3, sort_by, '{sizes} < 55 && {chr} contains chr1')
+        self.assertEqual(page_count, 1)
+        self.assertEqual(page['start'].tolist(), [5, 3, 1])
+
+        #   the order is kept for the next pages, and beyond the last page the last one is given
+        self.assertEqual(len(pager.orders), 2)
+        page, _ = pager.page(df, 5, 2, sort_by, '{sizes} < 55 && {chr} contains chr1')
+        self.assertEqual(page['start'].tolist(), [1])
+        self.assertEqual(len(pager.orders), 2)
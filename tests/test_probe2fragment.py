@@ -0,0 +1,70 @@
+import os
+import sys
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), 'sshic', 'core'))
+
+from utils import find_nearest
+from probe2fragment import associate_probes_to_fragments
+
+
+def make_inputs(tmp_dir):
+    rng = np.random.default_rng(0)
+    chr_rows = []
+    for chrom, length in [('chr1', 50000), ('chr2', 80000), ('chr_artificial', 3000)]:
+        cuts = np.unique(np.concatenate(([0], rng.integers(1, length, 60))))
+        ends = np.append(cuts[1:], length)
+        for s, e in zip(cuts, ends):
+            chr_rows.append((chrom, s, e))
+    #   fragments sharing a start : the first one of the list is kept
+    chr_rows.insert(5, chr_rows[4])
+    chr_rows.insert(70, chr_rows[69])
+    df_fragments = pd.DataFrame(chr_rows, columns=['chrom', 'start_pos', 'end_pos'])
+    df_fragments.insert(0, 'id', range(1, len(df_fragments) + 1))
+    df_fragments['size'] = df_fragments['end_pos'] - df_fragments['start_pos']
+    df_fragments['gc_content'] = 0.4
+
+    oligos_rows = []
+    for k in range(40):
+        chrom = ['chr1', 'chr2', 'chr_artificial'][k % 3]
+        start = int(rng.integers(1, 2900))
+        oligos_rows.append((chrom, start, start + 79, 'ss', f"Probe_{k}", 'ACGT'))
+    df_oligos = pd.DataFrame(oligos_rows, columns=['chr', 'start', 'end', 'type', 'name', 'sequence'])
+
+    fragments_path = os.path.join(tmp_dir, 'fragments_list.txt')
+    oligos_path = os.path.join(tmp_dir, 'capture_oligo_positions.csv')
+    df_fragments.to_csv(fragments_path, sep='\t', index=False)
+    df_oligos.to_csv(oligos_path, sep=',', index=False)
+    return df_fragments, df_oligos, fragments_path, oligos_path
+
+
+class Test(TestCase):
+    def test_fragments_match_find_nearest(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            df_fragments, df_oligos, fragments_path, oligos_path = make_inputs(tmp_dir)
+            output_path = os.path.join(tmp_dir, 'capture_oligo_positions_fragments.csv')
+            associate_probes_to_fragments(fragments_path, oligos_path, output_path)
+            df_res = pd.read_csv(output_path, sep=',')
+
+            expected = []
+            for _, row in df_oligos.iterrows():
+                sub_df = df_fragments[df_fragments['chrom'] == row['chr']]
+                middle = int(row['start'] + (row['end'] - row['start']) / 2)
+                nearest = find_nearest(array=sub_df['start_pos'], key=middle, mode='lower')
+                expected.append(sub_df.index[sub_df['start_pos'] == nearest].tolist()[0])
+
+            self.assertEqual(df_res['fragment'].tolist(), expected)
+            self.assertEqual(df_res['fragment_start'].tolist(), df_fragments.loc[expected, 'start_pos'].tolist())
+            self.assertEqual(df_res['fragment_end'].tolist(), df_fragments.loc[expected, 'end_pos'].tolist())
+            self.assertEqual(list(df_res.columns[5:8]), ['fragment', 'fragment_start', 'fragment_end'])
+            self.assertNotIn('fragment', pd.read_csv(oligos_path, sep=',').columns)
+
+    def test_in_place(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            _, _, fragments_path, oligos_path = make_inputs(tmp_dir)
+            associate_probes_to_fragments(fragments_path, oligos_path)
+            self.assertIn('fragment', pd.read_csv(oligos_path, sep=',').columns)
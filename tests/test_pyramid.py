@@ -0,0 +1,41 @@
+import os
+import sys
+import tempfile
+from unittest import TestCase
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), 'sshic', 'core'))
+
+from pyramid import build_pyramid, read_pyramid
+
+
+class Test(TestCase):
+    def test_pyramid(self):
+        rng = np.random.default_rng(0)
+        sizes = rng.integers(50, 500, 20000)
+        genome_start = np.r_[0, np.cumsum(sizes)[:-1]]
+        df = pd.DataFrame({
+            'chr': 'chr1', 'start': genome_start, 'sizes': sizes, 'genome_start': genome_start,
+            '1234': rng.random(20000), 'group_a': rng.random(20000)})
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'AD1_frequencies_pyramid.npz')
+            build_pyramid(df, path, base_resolution=128, tile_size=512)
+
+            #   whole genome : the coarsest level with at least 1000 bins, the frequencies are all there
+            x, y, resolution = read_pyramid(path, '1234', 1000)
+            self.assertGreaterEqual(len(x), 1000)
+            self.assertLess(len(x), 2000)
+            self.assertAlmostEqual(y.sum(), df['1234'].sum(), places=2)
+
+            #   a range : only its bins, summing the fragments that start in them
+            x, y, resolution = read_pyramid(path, 'group_a', 100, x_range=[100000, 200000])
+            self.assertEqual(resolution, 512)
+            self.assertLessEqual(x[0], 100000)
+            self.assertLessEqual(x[-1], 200000)
+            in_bin = (df['genome_start'] >= x[3]) & (df['genome_start'] < x[3] + resolution)
+            self.assertAlmostEqual(y[3], df.loc[in_bin, 'group_a'].sum(), places=5)
+
+            #   finer than the finest level
+            self.assertIsNone(read_pyramid(path, '1234', 1000, x_range=[0, 50000]))
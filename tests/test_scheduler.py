@@ -0,0 +1,170 @@
+import os
+import sys
+import tempfile
+from unittest import TestCase
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), 'sshic', 'core'))
+
+import pandas as pd
+from scheduler import Journal, Node, Scheduler
+from utils import TableWriter, read_table, write_table
+
+
+def concat(output_path, *input_paths, suffix=''):
+    with open(output_path, 'w') as out:
+        for p in input_paths:
+            with open(p, 'r') as f:
+                out.write(f.read())
+        out.write(suffix)
+
+
+def upper_in_place(path):
+    with open(path, 'r') as f:
+        content = f.read()
+    with open(path, 'w') as f:
+        f.write(content.upper())
+
+
+def build(tmp_dir, suffix_b='b', suffix_c='c'):
+    a, b, c, d = (os.path.join(tmp_dir, x + '.txt') for x in 'abcd')
+    scheduler = Scheduler(os.path.join(tmp_dir, 'manifest.json'))
+    #   added in reverse order on purpose, the scheduler sorts them
+    scheduler.add(Node("d", concat, inputs=[b, c], outputs=[d], args=[d, b, c]))
+    scheduler.add(Node("c", concat, inputs=[a], outputs=[c], args=[c, a], kwargs={'suffix': suffix_c}))
+    scheduler.add(Node("b", concat, inputs=[a], outputs=[b], args=[b, a], kwargs={'suffix': suffix_b}))
+    scheduler.add(Node("upper", upper_in_place, inputs=[a], outputs=[a], args=[a]))
+    return scheduler
+
+
+def make_table(output_path, n, writer=None):
+    df = pd.DataFrame({'x': range(n)}).convert_dtypes()
+    write_table(df, output_path, writer, sep='\t', index=False)
+    return df
+
+
+def double_table(output_path, input_table, writer=None):
+    df = read_table(input_table, sep='\t')
+    df['x'] *= 2
+    write_table(df, output_path, writer, sep='\t', index=False)
+    return df
+
+
+def build_in_memory(tmp_dir, n=3):
+    a, b = os.path.join(tmp_dir, 'a.tsv'), os.path.join(tmp_dir, 'b.tsv')
+    writer = TableWriter(skipped=[a])
+    scheduler = Scheduler(os.path.join(tmp_dir, 'manifest.json'), writer=writer)
+    scheduler.add(Node("double", double_table, inputs=[a], outputs=[b], args=[b, a]))
+    scheduler.add(Node("make", make_table, inputs=[], outputs=[a], args=[a, n]))
+    return scheduler, writer
+
+
+class Test(TestCase):
+    def test_only_invalidated_nodes_are_run(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            a = os.path.join(tmp_dir, 'a.txt')
+            with open(a, 'w') as f:
+                f.write('x')
+
+            self.assertEqual(build(tmp_dir).run(), ['upper', 'b', 'c', 'd'])
+            with open(os.path.join(tmp_dir, 'd.txt'), 'r') as f:
+                self.assertEqual(f.read(), 'XbXc')
+
+            self.assertEqual(build(tmp_dir).run(), [])
+
+            #   new modification time but same content
+            with open(a, 'w') as f:
+                f.write('X')
+            self.assertEqual(build(tmp_dir).run(), [])
+
+            self.assertEqual(build(tmp_dir, suffix_c='C').run(), ['c', 'd'])
+
+            os.remove(os.path.join(tmp_dir, 'b.txt'))
+            self.assertEqual(build(tmp_dir, suffix_c='C').run(), ['b'])
+
+            with open(a, 'w') as f:
+                f.write('y')
+            self.assertEqual(build(tmp_dir, suffix_c='C').run(), ['upper', 'b', 'c', 'd'])
+            with open(os.path.join(tmp_dir, 'd.txt'), 'r') as f:
+                self.assertEqual(f.read(), 'YbYC')
+
+    def test_cycle(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            a, b = os.path.join(tmp_dir, 'a.txt'), os.path.join(tmp_dir, 'b.txt')
+            scheduler = Scheduler(os.path.join(tmp_dir, 'manifest.json'))
+            scheduler.add(Node("a", concat, inputs=[b], outputs=[a], args=[a, b]))
+            scheduler.add(Node("b", concat, inputs=[a], outputs=[b], args=[b, a]))
+            with self.assertRaises(ValueError):
+                scheduler.run()
+
+    def test_in_memory(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            b = os.path.join(tmp_dir, 'b.tsv')
+            for n, expected in [(3, ['make', 'double']), (3, ['make']), (4, ['make', 'double'])]:
+                scheduler, writer = build_in_memory(tmp_dir, n)
+                self.assertEqual(scheduler.run(), expected)
+                writer.close()
+                self.assertFalse(os.path.exists(os.path.join(tmp_dir, 'a.tsv')))
+                self.assertEqual(pd.read_csv(b, sep='\t')['x'].tolist(), [2 * i for i in range(n)])
+                self.assertEqual(scheduler.objects, {})
+
+    def test_report(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            scheduler, writer = build_in_memory(tmp_dir, 5)
+            scheduler.run()
+            writer.close()
+            report = scheduler.report()
+            stages = {s["name"]: s for s in report["stages"]}
+            self.assertEqual(stages["make"]["rows_out"], 5)
+            self.assertEqual(stages["double"]["rows_in"], 5)
+            self.assertEqual(stages["double"]["rows_out"], 5)
+            #   b.tsv is written in background, a.tsv is not written
+            self.assertEqual(stages["double"]["bytes_out"], os.path.getsize(os.path.join(tmp_dir, 'b.tsv')))
+            self.assertEqual(stages["make"]["bytes_out"], 0)
+            self.assertEqual(stages["make"]["rows_in"], 0)
+            self.assertGreater(stages["double"]["peak_rss"], 0)
+            self.assertEqual(report["total"]["stages_run"], 2)
+
+            scheduler, writer = build_in_memory(tmp_dir, 5)
+            scheduler.run()
+            writer.close()
+            self.assertEqual(scheduler.report()["total"]["stages_up_to_date"], 1)
+
+    def test_report_files(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            a, b = os.path.join(tmp_dir, 'a.tsv'), os.path.join(tmp_dir, 'b.tsv')
+            pd.DataFrame({'x': range(1000)}).to_csv(a, sep='\t', index=False)
+            scheduler = Scheduler(os.path.join(tmp_dir, 'manifest.json'))
+            scheduler.add(Node("double", double_table, inputs=[a], outputs=[b], args=[b, a]))
+            scheduler.run()
+            stage, = scheduler.report()["stages"]
+            #   the rows of the file read are counted where it is parsed
+            self.assertEqual(stage["rows_in"], 1000)
+            self.assertEqual(stage["rows_out"], 1000)
+            self.assertGreaterEqual(stage["bytes_in"], os.path.getsize(a))
+            self.assertEqual(stage["bytes_out"], os.path.getsize(b))
+
+    def test_resume(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            a = os.path.join(tmp_dir, 'a.txt')
+            with open(a, 'w') as f:
+                f.write('x')
+            journal = Journal(os.path.join(tmp_dir, 'checkpoints.jsonl'))
+            journal.reset()
+
+            def crash(*args, **kwargs):
+                raise MemoryError
+
+            scheduler = build(tmp_dir)
+            scheduler.journal = journal
+            next(n for n in scheduler.nodes if n.name == 'c').func = crash
+            with self.assertRaises(MemoryError):
+                scheduler.run()
+            self.assertEqual(journal.completed(), {'upper', 'b'})
+            self.assertFalse(journal.is_complete())
+
+            scheduler = Scheduler(os.path.join(tmp_dir, 'manifest.json'), journal=journal, resume=True)
+            scheduler.nodes = build(tmp_dir).nodes
+            self.assertEqual(scheduler.run(), ['c', 'd'])
+            self.assertEqual([s["status"] for s in scheduler.stages], ['resumed', 'resumed', 'run', 'run'])
+            with open(os.path.join(tmp_dir, 'd.txt'), 'r') as f:
+                self.assertEqual(f.read(), 'XbXc')
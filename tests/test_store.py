@@ -0,0 +1,85 @@
+import os
+import sys
+import json
+import tempfile
+import threading
+from unittest import TestCase
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), 'sshic', 'core'))
+
+from store import check_object, ingest, link_inputs, object_path
+
+
+class Test(TestCase):
+    def test_link_inputs(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            store_dir = os.path.join(tmp_dir, 'store')
+            source = os.path.join(tmp_dir, 'fragments.txt')
+            with open(source, 'w') as f:
+                f.write('id\tchrom\n1\tchr1\n')
+
+            inputs_a, inputs_b = os.path.join(tmp_dir, 'a'), os.path.join(tmp_dir, 'b')
+            record, = link_inputs([source, None], store_dir, inputs_a)
+            link_inputs([source], store_dir, inputs_b)
+
+            #   the same object, and no copy of the content
+            for inputs_dir in [inputs_a, inputs_b]:
+                self.assertTrue(os.path.samefile(os.path.join(inputs_dir, 'fragments.txt'), record["object"]))
+            self.assertEqual(os.stat(source).st_nlink, 4)
+            with open(os.path.join(inputs_a, 'inputs_provenance.json')) as f:
+                provenance = json.load(f)
+            self.assertEqual(provenance['fragments.txt']['sha256'], record['sha256'])
+            self.assertEqual(provenance['fragments.txt']['source'], source)
+
+            #   the source is replaced by a new content : a new object, the old one is kept
+            os.remove(source)
+            with open(source, 'w') as f:
+                f.write('id\tchrom\n2\tchr2\n')
+            new_record, = link_inputs([source], store_dir, inputs_a)
+            self.assertNotEqual(new_record['object'], record['object'])
+            self.assertTrue(os.path.exists(record['object']))
+            with open(os.path.join(inputs_a, 'fragments.txt')) as f:
+                self.assertEqual(f.read(), 'id\tchrom\n2\tchr2\n')
+
+            #   the source is modified in place : the object named after the old content is replaced
+            with open(source, 'a') as f:
+                f.write('3\tchr3\n')
+            last_record, = link_inputs([source], store_dir, inputs_a)
+            self.assertFalse(os.path.exists(new_record['object']))
+            with open(last_record['object']) as f:
+                self.assertEqual(f.read(), 'id\tchrom\n2\tchr2\n3\tchr3\n')
+
+    def test_concurrent_ingest(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            store_dir = os.path.join(tmp_dir, 'store')
+            source = os.path.join(tmp_dir, 'oligos.csv')
+            with open(source, 'w') as f:
+                f.write('chr,start,end\nchr1,1,80\n')
+
+            #   an object whose sidecar is not written yet is being added : it is not valid, but kept
+            sha256 = ingest(source, store_dir)["sha256"]
+            obj = object_path(store_dir, sha256)
+            os.remove(obj + '.json')
+            self.assertFalse(check_object(obj))
+            self.assertTrue(os.path.exists(obj))
+            ingest(source, store_dir)
+            self.assertTrue(check_object(obj))
+
+            os.remove(obj)
+            os.remove(obj + '.json')
+            errors = []
+
+            def add():
+                try:
+                    ingest(source, store_dir)
+                except Exception as e:
+                    errors.append(e)
+
+            threads = [threading.Thread(target=add) for _ in range(8)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            self.assertEqual(errors, [])
+            self.assertTrue(check_object(obj))
+            self.assertEqual(sorted(os.listdir(os.path.dirname(obj))), [sha256, sha256 + '.json'])
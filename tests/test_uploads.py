@@ -0,0 +1,41 @@
+import io
+import os
+import sys
+import time
+import tempfile
+from unittest import TestCase
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), 'sshic', 'core'))
+
+from uploads import UploadDirectory
+
+
+class Test(TestCase):
+    def test_upload_directory(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            uploads = UploadDirectory(tmp_dir, max_bytes=25)
+
+            #   chunks in order, read by small blocks
+            self.assertIsNone(uploads.write_chunk('a1', 'a.tsv', 0, 20, io.BytesIO(b'x' * 12), block_size=5))
+            with self.assertRaises(ValueError):
+                uploads.write_chunk('a1', 'a.tsv', 4, 20, io.BytesIO(b'x' * 8))
+            path = uploads.write_chunk('a1', 'a.tsv', 12, 20, io.BytesIO(b'y' * 8), block_size=5)
+            self.assertEqual(path, os.path.join(tmp_dir, 'a.tsv'))
+            with open(path, 'rb') as f:
+                self.assertEqual(f.read(), b'x' * 12 + b'y' * 8)
+            self.assertEqual(os.listdir(uploads.partial_directory), [])
+
+            #   the names are kept in the directory
+            with self.assertRaises(ValueError):
+                uploads.write_chunk('../b', 'b.tsv', 0, 1, io.BytesIO(b'b'))
+            self.assertEqual(uploads.write_chunk('b1', '../b.tsv', 0, 1, io.BytesIO(b'b')),
+                             os.path.join(tmp_dir, 'b.tsv'))
+
+            #   above the budget, the least recently used file goes (a.tsv was opened after b.tsv)
+            time.sleep(0.01)
+            uploads.touch(path)
+            uploads.write_chunk('c1', 'c.tsv', 0, 5, io.BytesIO(b'c' * 5))
+            self.assertEqual(sorted(uploads.files()), ['a.tsv', 'c.tsv'])
+
+            uploads.clear()
+            self.assertEqual(uploads.files(), [])
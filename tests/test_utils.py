@@ -0,0 +1,54 @@
+import os
+import sys
+import tempfile
+import pandas as pd
+from unittest import TestCase
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), 'sshic', 'core'))
+
+import utils
+
+
+class Test(TestCase):
+    def tearDown(self):
+        utils.cache_references(False)
+
+    def test_read_reference(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'groups.tsv')
+            with open(path, 'w') as f:
+                f.write('name\tprobes\taction\ng1\tp1,p2\taverage\n')
+
+            utils.cache_references()
+            df = utils.read_reference(path, sep='\t')
+            #   a copy is returned, the cached table is not modified by the caller
+            df.loc[0, 'action'] = 'sum'
+            self.assertEqual(utils.read_reference(path, sep='\t').loc[0, 'action'], 'average')
+            self.assertEqual(len(utils._references_cache), 1)
+
+            #   the file changed : parsed again, the old version is dropped
+            with open(path, 'a') as f:
+                f.write('g2\tp3\tsum\n')
+            self.assertEqual(len(utils.read_reference(path, sep='\t')), 2)
+            self.assertEqual(len(utils._references_cache), 1)
+
+    def test_sample_name(self):
+        self.assertEqual(utils.sample_name('../data/samples/AD241_S0_pcrdupkept.txt'), 'AD241')
+        self.assertEqual(utils.sample_name('AD241_unbinned_contacts.tsv', 'AD241b'), 'AD241b')
+        self.assertEqual(utils.sample_name(pd.DataFrame(), 'AD241'), 'AD241')
+        #   a table handed over in memory has no file name
+        with self.assertRaises(ValueError):
+            utils.sample_name(pd.DataFrame())
+
+    def test_index_table(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            df = pd.DataFrame({'chr': ['chr1'], 'chr_bins': [0], 'genome_bins': [0], '138': [1.], 'group_a': [2.]})
+            utils.index_table(df, os.path.join(tmp_dir, 'AD1_10kb_binned_contacts.tsv'), 10000, {'Probe_0': 138})
+            utils.index_table(df, os.path.join(tmp_dir, 'AD1_10kb_binned_frequencies.tsv'), 10000, {'Probe_0': 138})
+
+            index = utils.read_tables_index(tmp_dir)
+            self.assertEqual(sorted(index), ['AD1_10kb_binned_contacts.tsv', 'AD1_10kb_binned_frequencies.tsv'])
+            self.assertEqual(index['AD1_10kb_binned_contacts.tsv'], {
+                'resolution': 10000, 'rows': 1, 'fragments': ['138'], 'groups': ['group_a'],
+                'probes': {'Probe_0': '138'}})
+            self.assertEqual(utils.read_tables_index(os.path.join(tmp_dir, 'missing')), {})